@@ -0,0 +1,147 @@
+"""
+JWT authentication for WebSocket connections.
+
+Browsers cannot set an ``Authorization`` header on WebSocket handshakes, so
+the access token is taken from:
+
+- the query string: ``ws://host/ws/devices/?token=<access>``
+- the subprotocol header: ``new WebSocket(url, ['bearer', '<access>'])``; the
+  token is removed from ``scope['subprotocols']`` and consumers accept the
+  connection with ``bearer`` (or the negotiated codec).
+
+Tokens are validated from their claims only (signature, expiry, ``user_id``
+and ``role``, see CustomTokenObtainPairSerializer), so connecting costs no
+database query and reconnect storms after a deploy never reach PostgreSQL.
+With WS_JWT_USER_CACHE_TTL > 0 the user is loaded instead, at most once per
+user and TTL thanks to the shared cache, so deactivated users are rejected
+within that TTL. Only USER_CACHE_FIELDS are cached (never the password
+hash); the other fields of the user are deferred.
+
+Connections without a valid token get an AnonymousUser, and are rejected
+with close code 4401 when WS_REQUIRE_AUTH is enabled (the default).
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+BEARER_SUBPROTOCOL: str = 'bearer'
+
+USER_CACHE_KEY: str = 'ws_user:{}'
+USER_CACHE_FIELDS: tuple[str, ...] = ('id', 'role', 'is_active')
+
+# Close code sent to unauthenticated connections when WS_REQUIRE_AUTH is set
+UNAUTHORIZED_CLOSE_CODE: int = 4401
+
+
+class ClaimsUser(TokenUser):
+    """Stateless user built from access token claims, including the custom ``role`` claim."""
+
+    @cached_property
+    def role(self) -> Optional[str]:
+        return self.token.get('role')
+
+
+def extract_token(scope: dict[str, Any]) -> tuple[Optional[str], list[str]]:
+    """
+    Find the access token of a WebSocket handshake.
+
+    Returns:
+        Tuple (token or None, subprotocols without the token).
+    """
+    subprotocols = list(scope.get('subprotocols') or [])
+    if BEARER_SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(BEARER_SUBPROTOCOL)
+        if index + 1 < len(subprotocols):
+            token = subprotocols.pop(index + 1)
+            return token, subprotocols
+
+    query = dict(parse_qsl(scope.get('query_string', b'').decode()))
+    return query.get('token') or None, subprotocols
+
+
+def _cache_ttl() -> int:
+    return settings.WS_JWT_USER_CACHE_TTL
+
+
+def _load_user(user_id) -> Optional[Any]:
+    """Return the active user with this id (USER_CACHE_FIELDS only), through the shared cache."""
+    User = get_user_model()
+    key = USER_CACHE_KEY.format(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*USER_CACHE_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(key, values, timeout=_cache_ttl())
+    if not values['is_active']:
+        return None
+    # from_db() expects the loaded fields in model order
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+
+
+load_user = database_sync_to_async(_load_user)
+
+
+async def authenticate(raw_token: Optional[str]) -> Any:
+    """Return the user of an access token, or an AnonymousUser."""
+    if not raw_token:
+        return AnonymousUser()
+    try:
+        token = AccessToken(raw_token)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError) as exc:
+        logger.info(f"Rejected WebSocket token: {exc}")
+        return AnonymousUser()
+
+    if _cache_ttl() <= 0:
+        return ClaimsUser(token)
+    user = await load_user(user_id)
+    return user if user is not None else AnonymousUser()
+
+
+async def _reject(scope, receive, send) -> None:
+    """Refuse the handshake (before accept, so clients see it as a failed connection)."""
+    message = await receive()
+    if message['type'] == 'websocket.connect':
+        await send({'type': 'websocket.close', 'code': UNAUTHORIZED_CLOSE_CODE})
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Populate ``scope['user']`` from a JWT access token.
+
+    Also sets ``scope['auth_subprotocol']`` to ``bearer`` when the token came
+    in the subprotocol header, so the consumer can echo it on accept.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'websocket':
+            return await super().__call__(scope, receive, send)
+
+        raw_token, subprotocols = extract_token(scope)
+        scope = dict(scope, subprotocols=subprotocols)
+        if raw_token and BEARER_SUBPROTOCOL in subprotocols:
+            scope['auth_subprotocol'] = BEARER_SUBPROTOCOL
+        scope['user'] = await authenticate(raw_token)
+
+        if settings.WS_REQUIRE_AUTH and not scope['user'].is_authenticated:
+            return await _reject(scope, receive, send)
+        return await super().__call__(scope, receive, send)
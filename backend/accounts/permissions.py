@@ -38,3 +38,10 @@ class IsAdminOrReadOnly(BasePermission):
         return getattr(user, 'role', None) == getattr(User, 'Role').ADMIN
 
 
+class IsAdminRole(BasePermission):
+    def has_permission(self, request, view) -> bool:
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        # leitura e escrita apenas admin (endpoints de diagnóstico)
+        return getattr(user, 'role', None) == getattr(User, 'Role').ADMIN
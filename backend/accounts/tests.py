@@ -4,11 +4,17 @@ Tests for accounts app.
 Following Django & Python best practices.
 Test coverage for User model and CustomTokenObtainPairSerializer.
 """
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from devices.routing import websocket_urlpatterns
+from .middleware import JWTAuthMiddleware
 from .serializers import CustomTokenObtainPairSerializer
 
 User = get_user_model()
@@ -218,3 +224,85 @@ class CustomTokenObtainPairSerializerTestCase(APITestCase):
         token = AccessToken(access_token)
         
         self.assertEqual(token['user_id'], self.user.id)
+
+
+class JWTAuthMiddlewareTestCase(TestCase):
+    """Test cases for JWT authentication of WebSocket connections."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='ws_user',
+            email='ws@example.com',
+            password='testpass123',
+            role=User.Role.ADMIN,
+        )
+        self.token = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.scopes = []
+
+    async def _capture(self, scope, receive, send):
+        """Inner ASGI app recording the scope it was called with."""
+        self.scopes.append(scope)
+        await receive()
+        await send({'type': 'websocket.accept', 'subprotocol': None})
+
+    async def _connect(self, application, path='/ws/', subprotocols=None):
+        communicator = WebsocketCommunicator(application, path, subprotocols=subprotocols)
+        result = await communicator.connect()
+        await communicator.disconnect()
+        return result
+
+    def test_query_token_is_validated_from_claims_without_queries(self):
+        with self.assertNumQueries(0):
+            async_to_sync(self._connect)(JWTAuthMiddleware(self._capture), f'/ws/?token={self.token}')
+        user = self.scopes[0]['user']
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(user.role, User.Role.ADMIN)
+
+    def test_subprotocol_token_is_removed_and_bearer_accepted(self):
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        connected, subprotocol = async_to_sync(self._connect)(
+            application, '/ws/devices/', ['bearer', self.token]
+        )
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, 'bearer')
+
+        async_to_sync(self._connect)(JWTAuthMiddleware(self._capture), '/ws/', ['bearer', self.token, 'json'])
+        self.assertEqual(self.scopes[0]['subprotocols'], ['bearer', 'json'])
+        self.assertEqual(self.scopes[0]['auth_subprotocol'], 'bearer')
+
+    @override_settings(WS_REQUIRE_AUTH=False)
+    def test_invalid_token_is_anonymous(self):
+        async_to_sync(self._connect)(JWTAuthMiddleware(self._capture), '/ws/?token=not-a-jwt')
+        self.assertFalse(self.scopes[0]['user'].is_authenticated)
+
+    @override_settings(WS_REQUIRE_AUTH=True)
+    def test_required_auth_rejects_anonymous_connections(self):
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        connected, code = async_to_sync(self._connect)(application, '/ws/devices/')
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+        connected, _ = async_to_sync(self._connect)(application, f'/ws/devices/?token={self.token}')
+        self.assertTrue(connected)
+
+    @override_settings(WS_JWT_USER_CACHE_TTL=30)
+    def test_user_cache_loads_each_user_once(self):
+        application = JWTAuthMiddleware(self._capture)
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                async_to_sync(self._connect)(application, f'/ws/?token={self.token}')
+        user = self.scopes[-1]['user']
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.role, User.Role.ADMIN)
+        # Only the fields needed for authorization are cached, never the password hash
+        self.assertEqual(set(cache.get(f'ws_user:{self.user.pk}')), {'id', 'role', 'is_active'})
+        self.assertIn('password', user.get_deferred_fields())
+
+        # Deactivated users are rejected once their cache entry expires
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        connected, code = async_to_sync(self._connect)(application, f'/ws/?token={self.token}')
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+        self.assertEqual(len(self.scopes), 3)
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the backend hot paths.
+
+Each module is runnable with ``python -m benchmarks.<module>`` from the
+backend directory and prints its results as JSON.
+"""
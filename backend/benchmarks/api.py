@@ -0,0 +1,224 @@
+"""
+Benchmark: HTTP hot paths through the full Django/DRF stack.
+
+Seeds a fresh test database (see common.isolated_database) and times
+requests sent with DRF's test client, JWT authentication included:
+
+- ``ingest_single``: POST /api/devices/{id}/measurements/ to one device
+  (serializer, catalog, snapshot, channel layer publish, threshold check).
+- ``ingest_fleet``: the same request spread round-robin over ``--devices``
+  devices, as a burst from many sensors (there is no batch endpoint).
+- ``aggregated_data``: GET /api/devices/{id}/aggregated-data/ on devices
+  holding each of ``--sizes`` measurements, for a few query shapes.
+- ``alerts_list``: GET /api/alerts/ over ``--alerts`` alerts with the
+  filters the dashboard uses.
+
+Each case reports latency percentiles, requests per second and the number
+of SQL queries of one request. Publishing goes to the configured channel
+layer: use ``config.settings_test`` (SQLite, in-memory layer) as a stand-in
+or a local PostgreSQL and Redis for representative numbers.
+
+Usage:
+  python -m benchmarks.api --requests 500 --sizes 1000,10000,100000
+"""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from benchmarks.common import base_parser, emit, isolated_database, latency, setup_django
+
+BATCH_SIZE: int = 5000
+
+METRICS: tuple[tuple[str, str], ...] = (('temperature', '°C'), ('humidity', '%'), ('pressure', 'hPa'))
+
+
+def _client():
+    """API client authenticated with a JWT access token of an admin user."""
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    user = get_user_model().objects.create_user(
+        username='bench', email='bench@example.com', password='bench-password', role='admin',
+    )
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def _devices(count: int, prefix: str) -> list:
+    from devices.models import Category, Device, MeasurementThreshold
+
+    category, _ = Category.objects.get_or_create(name='Benchmark')
+    devices = Device.objects.bulk_create(
+        Device(name=f'{prefix} {index}', status=Device.Status.ACTIVE, category=category)
+        for index in range(count)
+    )
+    # Every ingest runs the threshold check against a limit it stays within
+    MeasurementThreshold.objects.bulk_create(
+        MeasurementThreshold(device=device, metric_name='temperature', min_limit=-50, max_limit=150)
+        for device in devices
+    )
+    return devices
+
+
+def _seed_measurements(device, count: int, seed: int = 42) -> None:
+    """Insert ``count`` measurements, one per minute up to now, cycling through METRICS."""
+    from devices.models import Measurement, MetricDefinition
+
+    rng = random.Random(seed)
+    definitions = [MetricDefinition.objects.resolve(name, unit) for name, unit in METRICS]
+    end = datetime.now(timezone.utc)
+    rows = (
+        Measurement(
+            device=device,
+            definition=definitions[index % len(definitions)],
+            value=round(rng.gauss(25.0, 5.0), 4),
+            timestamp=end - timedelta(minutes=count - index),
+        )
+        for index in range(count)
+    )
+    batch: list = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            Measurement.objects.bulk_create(batch)
+            batch = []
+    Measurement.objects.bulk_create(batch)
+
+
+def _seed_alerts(devices: list, count: int, seed: int = 42) -> None:
+    from devices.models import Alert
+
+    rng = random.Random(seed)
+    severities = [choice for choice, _ in Alert.Severity.choices]
+    statuses = [choice for choice, _ in Alert.Status.choices]
+    Alert.objects.bulk_create(
+        (
+            Alert(
+                device=devices[index % len(devices)],
+                title=f'Alert {index}',
+                message='Threshold violation',
+                severity=rng.choice(severities),
+                status=rng.choice(statuses),
+            )
+            for index in range(count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def _case(client, method: str, path: Callable[[int], str], requests: int, payload: Optional[Callable[[int], dict]] = None) -> dict[str, Any]:
+    """Time ``requests`` calls and count the queries of one of them."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def call(index: int) -> None:
+        if method == 'post':
+            response = client.post(path(index), payload(index), format='json')
+        else:
+            response = client.get(path(index))
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {path(index)} returned {response.status_code}: {response.content[:200]!r}')
+
+    result = latency(call, requests)
+    with CaptureQueriesContext(connection) as queries:
+        call(0)
+    result['queries'] = len(queries)
+    return result
+
+
+def _reading(index: int) -> dict[str, Any]:
+    return {
+        'metric': 'temperature',
+        'value': f'{20 + (index % 100) / 10:.2f}',
+        'unit': '°C',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def run_ingest(client, requests: int, devices: int) -> dict[str, Any]:
+    fleet = _devices(devices, 'Ingest')
+    return {
+        'ingest_single': _case(
+            client, 'post', lambda index: f'/api/devices/{fleet[0].id}/measurements/', requests, _reading,
+        ),
+        'ingest_fleet': _case(
+            client, 'post', lambda index: f'/api/devices/{fleet[index % len(fleet)].id}/measurements/', requests, _reading,
+        ),
+    }
+
+
+def run_aggregated(client, requests: int, sizes: list[int]) -> dict[str, Any]:
+    queries = {
+        'latest_100': 'limit=100',
+        'metric_7d_1000': 'metric=temperature&period=last_7d&limit=1000',
+        'last_24h_500': 'period=last_24h&limit=500',
+    }
+    results: dict[str, Any] = {}
+    for size, device in zip(sizes, _devices(len(sizes), 'Aggregated')):
+        _seed_measurements(device, size)
+        results[size] = {
+            name: _case(client, 'get', lambda index, query=query: f'/api/devices/{device.id}/aggregated-data/?{query}', requests)
+            for name, query in queries.items()
+        }
+    return results
+
+
+def run_alerts(client, requests: int, alerts: int) -> dict[str, Any]:
+    devices = _devices(50, 'Alerting')
+    _seed_alerts(devices, alerts)
+    queries = {
+        'default': '',
+        'pending_high': 'status=pending&severity=high',
+        'unresolved_by_severity': 'unresolved_only=true&ordering=-severity',
+        'device': f'device={devices[0].id}',
+        'active_devices': 'device_status=active',
+    }
+    return {
+        name: _case(client, 'get', lambda index, query=query: f'/api/alerts/?{query}', requests)
+        for name, query in queries.items()
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per case')
+    parser.add_argument('--devices', type=int, default=100, help='Devices of the ingest_fleet case')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Measurements per device of the aggregated-data cases')
+    parser.add_argument('--alerts', type=int, default=10000, help='Alerts seeded for the listing cases')
+    parser.add_argument('--only', default='ingest,aggregated,alerts', help='Comma-separated subset of groups to run')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    groups = set(args.only.split(','))
+    results: dict[str, Any] = {}
+    with isolated_database():
+        client = _client()
+        if 'ingest' in groups:
+            results.update(run_ingest(client, args.requests, args.devices))
+        if 'aggregated' in groups:
+            results['aggregated_data'] = run_aggregated(client, args.requests, sizes)
+        if 'alerts' in groups:
+            results['alerts_list'] = run_alerts(client, args.requests, args.alerts)
+        report = emit(
+            'api',
+            {
+                'requests': args.requests,
+                'devices': args.devices,
+                'sizes': sizes,
+                'alerts': args.alerts,
+                'groups': sorted(groups),
+            },
+            results,
+            args.output,
+        )
+    return report
+
+
+if __name__ == '__main__':
+    main()
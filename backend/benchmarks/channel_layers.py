@@ -0,0 +1,145 @@
+"""
+Benchmark: channel layer backends for WebSocket fan-out.
+
+Runs the same workload against channels' InMemoryChannelLayer, the
+in-process core.layers.BoundedInMemoryChannelLayer and channels_redis'
+RedisChannelLayer: ``--receivers`` channels join one device group, each
+drained by its own task like a consumer, and ``--messages`` events shaped
+like a measurement broadcast are sent with group_send.
+Reports group_send latency and delivery throughput.
+
+The Redis run needs a local Redis stand-in (e.g. ``docker run --rm -p
+6379:6379 redis:7-alpine``); it is reported as unavailable when none
+answers on --redis-host/--redis-port.
+
+Usage:
+  python -m benchmarks.channel_layers --receivers 200 --messages 500 --redis-host localhost
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import time
+from typing import Any, Callable, Optional
+
+from benchmarks.common import base_parser, emit, setup_django
+from benchmarks.ws_encoding import _frames
+
+GROUP: str = 'device_550e8400-e29b-41d4-a716-446655440000'
+
+
+def _events(count: int) -> list[dict[str, Any]]:
+    """Channel layer events as published by publish_measurement()."""
+    from devices.encoding import broadcast_event
+
+    return [
+        broadcast_event(
+            'measurement_update', frame, device_id=frame['device_id'], metric=frame['measurement']['metric']
+        )
+        for frame in _frames(count)
+    ]
+
+
+async def run_fanout(layer, receivers: int, events: list[dict[str, Any]], group: str = GROUP) -> dict[str, Any]:
+    """Deliver every event to every receiver through ``layer`` and time it."""
+    channels = [await layer.new_channel() for _ in range(receivers)]
+    for channel in channels:
+        await layer.group_add(group, channel)
+
+    async def drain(channel: str) -> None:
+        for _ in events:
+            await layer.receive(channel)
+
+    tasks = [asyncio.create_task(drain(channel)) for channel in channels]
+    await asyncio.sleep(0)
+    send_times = []
+    start = time.perf_counter()
+    for event in events:
+        sent = time.perf_counter()
+        await layer.group_send(group, event)
+        send_times.append((time.perf_counter() - sent) * 1e6)
+        await asyncio.sleep(0)
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=300)
+    elapsed = time.perf_counter() - start
+
+    for channel in channels:
+        await layer.group_discard(group, channel)
+    delivered = receivers * len(events)
+    return {
+        'delivered': delivered,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'deliveries_per_s': round(delivered / elapsed),
+        'group_send_us_median': round(statistics.median(send_times), 1),
+        'group_send_us_p99': round(sorted(send_times)[int(len(send_times) * 0.99) - 1], 1),
+    }
+
+
+async def redis_available(host: str, port: int) -> bool:
+    """Return whether a Redis server answers on host:port."""
+    from redis.asyncio import Redis
+
+    client = Redis(host=host, port=port, socket_connect_timeout=1)
+    try:
+        return bool(await client.ping())
+    except Exception:
+        return False
+    finally:
+        await client.aclose()
+
+
+def _layers(capacity: int, redis_host: str, redis_port: int) -> dict[str, Callable[[], Any]]:
+    from channels.layers import InMemoryChannelLayer
+    from channels_redis.core import RedisChannelLayer
+
+    from core.layers import BoundedInMemoryChannelLayer
+
+    return {
+        'in_memory': lambda: InMemoryChannelLayer(capacity=capacity, expiry=60),
+        'bounded_in_memory': lambda: BoundedInMemoryChannelLayer(capacity=capacity, expiry=60),
+        'redis': lambda: RedisChannelLayer(hosts=[(redis_host, redis_port)], capacity=capacity, expiry=60),
+    }
+
+
+async def _run_layer(factory: Callable[[], Any], receivers: int, events: list[dict[str, Any]], repeat: int) -> dict[str, Any]:
+    runs = []
+    for _ in range(max(1, repeat)):
+        layer = factory()
+        try:
+            runs.append(await run_fanout(layer, receivers, events))
+        finally:
+            await layer.flush()
+            await layer.close()
+    return max(runs, key=lambda run: run['deliveries_per_s'])
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--receivers', type=int, default=200, help='Channels subscribed to the group')
+    parser.add_argument('--messages', type=int, default=500, help='group_send calls per run')
+    parser.add_argument('--redis-host', default=os.environ.get('REDIS_HOST', 'localhost'))
+    parser.add_argument('--redis-port', type=int, default=int(os.environ.get('REDIS_PORT', 6379)))
+    args = parser.parse_args(argv)
+
+    setup_django()
+    events = _events(args.messages)
+    # No run should drop messages: every receiver may fall behind by the whole run
+    layers = _layers(args.messages + 10, args.redis_host, args.redis_port)
+
+    results: dict[str, Any] = {}
+    for name, factory in layers.items():
+        if name == 'redis' and not asyncio.run(redis_available(args.redis_host, args.redis_port)):
+            results[name] = {'error': f'Redis unavailable at {args.redis_host}:{args.redis_port}'}
+            continue
+        results[name] = asyncio.run(_run_layer(factory, args.receivers, events, args.repeat))
+    return emit(
+        'channel_layers',
+        {'receivers': args.receivers, 'messages': args.messages, 'repeat': args.repeat},
+        results,
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Shared helpers for benchmark modules.
+
+Benchmarks run against the database configured by DJANGO_SETTINGS_MODULE
+(``config.settings`` by default, i.e. PostgreSQL). Use
+``DJANGO_SETTINGS_MODULE=config.settings_test`` for a quick SQLite run.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Optional
+
+
+def setup_django() -> None:
+    """Configure Django for a standalone benchmark process."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """Return an argument parser with the options shared by every benchmark."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='Number of timed repetitions per measurement (default: 5)',
+    )
+    parser.add_argument(
+        '--output',
+        default=None,
+        help='Write JSON results to this file instead of stdout',
+    )
+    return parser
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> dict[str, float]:
+    """
+    Time a callable several times.
+
+    Returns:
+        Dict with min/median/max wall time in milliseconds.
+    """
+    samples: list[float] = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Summarize latency samples in milliseconds (mean, p50, p95, p99, max)."""
+    ordered = sorted(samples)
+
+    def rank(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(rank(0.50), 3),
+        'p95_ms': round(rank(0.95), 3),
+        'p99_ms': round(rank(0.99), 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def latency(fn: Callable[[int], Any], count: int, warmup: int = 5) -> dict[str, float]:
+    """
+    Call ``fn(index)`` ``count`` times after ``warmup`` untimed calls.
+
+    Returns:
+        Latency percentiles (see percentiles()) plus calls per second.
+    """
+    for index in range(warmup):
+        fn(-1 - index)
+    samples: list[float] = []
+    start = time.perf_counter()
+    for index in range(max(1, count)):
+        sent = time.perf_counter()
+        fn(index)
+        samples.append((time.perf_counter() - sent) * 1000)
+    elapsed = time.perf_counter() - start
+    return {**percentiles(samples), 'per_s': round(len(samples) / elapsed, 1)}
+
+
+@contextmanager
+def isolated_database() -> Iterator[None]:
+    """
+    Run on a freshly migrated test database (``test_<NAME>``), dropped on exit.
+
+    Benchmarks seeding their own data use it so they never touch the
+    configured database's rows.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict[str, Any]:
+    """Describe the environment the benchmark ran in."""
+    from django.conf import settings
+    from django.db import connection
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+        'channel_layer': settings.CHANNEL_LAYERS.get('default', {}).get('BACKEND'),
+        'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+    }
+
+
+def emit(benchmark: str, params: dict[str, Any], results: dict[str, Any], output: Optional[str] = None) -> dict[str, Any]:
+    """Write a benchmark report as JSON to stdout or a file, and return it."""
+    report = {
+        'benchmark': benchmark,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': environment(),
+        'params': params,
+        'results': results,
+    }
+    payload = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w', encoding='utf-8') as handle:
+            handle.write(payload + '\n')
+    else:
+        sys.stdout.write(payload + '\n')
+    return report
@@ -0,0 +1,176 @@
+"""
+Benchmark: per-request cost of opening database connections.
+
+Sends requests through Django's real WSGI handler (as a gunicorn worker
+does), so ``request_started`` / ``request_finished`` close or keep the
+connection according to the settings under test, unlike the test client,
+which never closes it. Each mode is timed on the same seeded test database:
+
+- ``per_request``: CONN_MAX_AGE=0, a new connection for every request.
+- ``persistent``: CONN_MAX_AGE=60, the connection is reused.
+- ``persistent_health_checks``: the same plus CONN_HEALTH_CHECKS (one
+  liveness ping per request on the reused connection).
+- ``pgbouncer`` (with ``--pgbouncer HOST:PORT``): CONN_MAX_AGE=0 and
+  DISABLE_SERVER_SIDE_CURSORS, connecting through a PgBouncer in
+  transaction mode whose ``*`` database entry reaches the test database.
+
+Cases are measurement ingestion (POST) and the metrics listing of a device
+(GET). Every case reports latency percentiles, requests per second, the
+connections opened during the timed run and the mean difference with
+``per_request``. On SQLite a connection is a file open, so only PostgreSQL
+shows the handshake, authentication and backend start-up cost.
+
+Usage:
+  python -m benchmarks.db_connections --requests 500
+  python -m benchmarks.db_connections --requests 500 --pgbouncer localhost:6432
+"""
+from __future__ import annotations
+
+import io
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from benchmarks.common import base_parser, emit, isolated_database, latency, setup_django
+
+MODES: dict[str, dict[str, Any]] = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checks': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+class _Requester:
+    """Call a WSGI handler the way a WSGI server does, response close included."""
+
+    def __init__(self, handler, token: str):
+        self.handler = handler
+        self.token = token
+
+    def __call__(self, method: str, path: str, payload: Optional[dict[str, Any]] = None) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver',
+            'HTTP_AUTHORIZATION': f'Bearer {self.token}',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'wsgi.version': (1, 0),
+        }
+        statuses: list[str] = []
+        response = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            # Sends request_finished, where Django closes connections past CONN_MAX_AGE
+            response.close()
+        if int(statuses[0].split()[0]) >= 400:
+            raise RuntimeError(f'{method} {path} returned {statuses[0]}')
+
+
+def _reading(index: int) -> dict[str, Any]:
+    return {
+        'metric': 'temperature',
+        'value': f'{20 + (index % 100) / 10:.2f}',
+        'unit': '°C',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _configure(connection, options: dict[str, Any]) -> None:
+    # Settings are read when a connection opens
+    connection.close()
+    connection.settings_dict.update(options)
+
+
+def run_mode(request: _Requester, device_id: int, requests: int) -> dict[str, Any]:
+    from django.db.backends.signals import connection_created
+
+    opened = []
+
+    def count(sender, connection, **kwargs) -> None:
+        opened.append(connection.alias)
+
+    cases = {
+        'ingest': lambda index: request('POST', f'/api/devices/{device_id}/measurements/', _reading(index)),
+        'metrics': lambda index: request('GET', f'/api/devices/{device_id}/metrics/'),
+    }
+    results: dict[str, Any] = {}
+    for name, call in cases.items():
+        for index in range(5):
+            call(-1 - index)
+        opened.clear()
+        connection_created.connect(count)
+        try:
+            results[name] = latency(call, requests, warmup=0)
+        finally:
+            connection_created.disconnect(count)
+        results[name]['connections_opened'] = len(opened)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300, help='Timed requests per case and mode')
+    parser.add_argument('--pgbouncer', default='', help='HOST:PORT of a PgBouncer in front of the same server')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from devices.models import Device, MeasurementThreshold
+
+    modes = dict(MODES)
+    if args.pgbouncer:
+        host, _, port = args.pgbouncer.rpartition(':')
+        modes['pgbouncer'] = {
+            'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'DISABLE_SERVER_SIDE_CURSORS': True,
+            'HOST': host, 'PORT': int(port),
+        }
+
+    results: dict[str, Any] = {}
+    with isolated_database():
+        original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'DISABLE_SERVER_SIDE_CURSORS', 'HOST', 'PORT')}
+        user = get_user_model().objects.create_user(
+            username='bench', email='bench@example.com', password='bench-password', role='admin',
+        )
+        device = Device.objects.create(name='Connection Benchmark', status=Device.Status.ACTIVE)
+        MeasurementThreshold.objects.create(device=device, metric_name='temperature', min_limit=-50, max_limit=150)
+        request = _Requester(WSGIHandler(), str(AccessToken.for_user(user)))
+        try:
+            for name, options in modes.items():
+                _configure(connection, {**original, **options})
+                results[name] = run_mode(request, device.id, args.requests)
+        finally:
+            _configure(connection, original)
+
+        for name, cases in results.items():
+            for case, result in cases.items():
+                result['mean_delta_ms'] = round(result['mean_ms'] - results['per_request'][case]['mean_ms'], 3)
+        report = emit(
+            'db_connections',
+            {'requests': args.requests, 'pgbouncer': args.pgbouncer or None, 'modes': modes},
+            results,
+            args.output,
+        )
+    return report
+
+
+if __name__ == '__main__':
+    main()
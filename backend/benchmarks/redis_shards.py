@@ -0,0 +1,153 @@
+"""
+Benchmark: sharding the Redis channel layer over several hosts.
+
+Two parts:
+
+- distribution (no Redis needed): for 1..N shards, how evenly
+  ``device_<public_id>`` groups and consumer channel names spread over the
+  shards, and which fraction of them moves to another shard when one shard
+  is added, for channels_redis' CRC range split vs the hash ring of
+  core.redis_layers.
+- throughput: for n = 1..len(--redis-hosts), ``--senders`` concurrent tasks
+  group_send ``--messages`` measurement events over
+  ``--groups`` device groups (one receiver each) through
+  ShardedRedisChannelLayer(hosts[:n]), and report group_send throughput.
+
+The throughput part needs one local Redis per shard, e.g.
+``for p in 6379 6380 6381 6382; do docker run -d --rm -p $p:6379 redis:7-alpine; done``;
+it is reported as unavailable when a host does not answer.
+
+Usage:
+  python -m benchmarks.redis_shards --redis-hosts localhost:6379,localhost:6380,localhost:6381,localhost:6382
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from benchmarks.channel_layers import _events, redis_available
+from benchmarks.common import base_parser, emit, setup_django
+
+
+def _parse_hosts(value: str) -> list[tuple[str, int]]:
+    hosts = []
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        host, _, port = entry.partition(':')
+        hosts.append((host, int(port or 6379)))
+    return hosts
+
+
+def _keys(groups: int) -> list[str]:
+    """Device group names plus one consumer channel name per group."""
+    names = [f'device_{uuid.uuid4()}' for _ in range(groups)]
+    names += [f'specific.{uuid.uuid4().hex[:8]}!{uuid.uuid4().hex[:12]}' for _ in range(groups)]
+    return names
+
+
+def _mappers(shards: int) -> dict[str, Callable[[str], int]]:
+    from channels_redis.utils import _consistent_hash
+
+    from core.redis_layers import HashRing
+
+    ring = HashRing([f'redis-{index}:6379/0' for index in range(shards)])
+    return {
+        'crc_range': lambda key: _consistent_hash(key, shards),
+        'hash_ring': ring.node,
+    }
+
+
+def distribution(keys: list[str], max_shards: int) -> dict[str, Any]:
+    """Per shard count: load imbalance and keys moved from n-1 shards, per strategy."""
+    results: dict[str, Any] = {'crc_range': {}, 'hash_ring': {}}
+    previous: dict[str, list[int]] = {}
+    for shards in range(1, max_shards + 1):
+        for name, mapper in _mappers(shards).items():
+            placement = [mapper(key) for key in keys]
+            counts = Counter(placement)
+            loads = [counts.get(index, 0) for index in range(shards)]
+            row = {
+                'max_over_mean': round(max(loads) / (len(keys) / shards), 3),
+                'stdev_pct': round(100 * statistics.pstdev(loads) / (len(keys) / shards), 1),
+            }
+            if name in previous:
+                moved = sum(a != b for a, b in zip(previous[name], placement))
+                row['moved_pct'] = round(100 * moved / len(keys), 1)
+            previous[name] = placement
+            results[name][shards] = row
+    return results
+
+
+async def run_sharded(hosts: list[tuple[str, int]], groups: int, senders: int, events: list[dict[str, Any]]) -> dict[str, Any]:
+    """group_send every event to a round-robin group from ``senders`` concurrent tasks."""
+    from core.redis_layers import ShardedRedisChannelLayer
+
+    layer = ShardedRedisChannelLayer(hosts=hosts, capacity=len(events) + 10, expiry=60)
+    try:
+        names = [f'device_{uuid.uuid4()}' for _ in range(groups)]
+        for name in names:
+            await layer.group_add(name, await layer.new_channel())
+
+        async def send(offset: int) -> None:
+            for index in range(offset, len(events), senders):
+                await layer.group_send(names[index % groups], events[index])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(offset) for offset in range(senders)))
+        elapsed = time.perf_counter() - start
+        return {
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'group_sends_per_s': round(len(events) / elapsed),
+        }
+    finally:
+        await layer.flush()
+        await layer.close()
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--redis-hosts', default='localhost:6379', help='Comma-separated host:port shards')
+    parser.add_argument('--max-shards', type=int, default=8, help='Shard counts of the distribution part')
+    parser.add_argument('--groups', type=int, default=2000, help='Device groups (and receiver channels)')
+    parser.add_argument('--messages', type=int, default=5000, help='group_send calls per throughput run')
+    parser.add_argument('--senders', type=int, default=32, help='Concurrent publishing tasks')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    hosts = _parse_hosts(args.redis_hosts)
+    results: dict[str, Any] = {'distribution': distribution(_keys(args.groups), args.max_shards)}
+
+    down = [f'{host}:{port}' for host, port in hosts if not asyncio.run(redis_available(host, port))]
+    if down:
+        results['throughput'] = {'error': f"Redis unavailable at {', '.join(down)}"}
+    else:
+        events = _events(args.messages)
+        throughput = {}
+        for shards in range(1, len(hosts) + 1):
+            runs = [
+                asyncio.run(run_sharded(hosts[:shards], args.groups, args.senders, events))
+                for _ in range(max(1, args.repeat))
+            ]
+            throughput[shards] = max(runs, key=lambda run: run['group_sends_per_s'])
+        results['throughput'] = throughput
+
+    return emit(
+        'redis_shards',
+        {
+            'hosts': [f'{host}:{port}' for host, port in hosts],
+            'groups': args.groups,
+            'messages': args.messages,
+            'senders': args.senders,
+            'repeat': args.repeat,
+        },
+        results,
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
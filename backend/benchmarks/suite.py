@@ -0,0 +1,127 @@
+"""
+Benchmark suite: run the hot-path benchmarks and compare with a baseline.
+
+Runs ``api`` (ingest, aggregated data, alerts listing), ``ws_fanout``
+(DeviceConsumer fan-out) and ``channel_layers`` with one set of parameters,
+writes each report plus a combined ``suite.json`` to ``--output-dir``, and,
+given ``--baseline`` (a previous ``suite.json``), lists every central
+latency (mean, median, p50, p95, CPU) or throughput (``*per_s``) figure
+that moved by more than ``--tolerance``; maxima and p99 are too noisy to
+compare. With ``--fail-on-regression`` the exit status is 1 when
+anything got worse, so the suite can gate a CI job.
+
+Usage:
+  python -m benchmarks.suite --output-dir bench-results/$(git rev-parse --short HEAD)
+  python -m benchmarks.suite --quick --baseline bench-results/main/suite.json --fail-on-regression
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+from typing import Any, Iterator, Optional
+
+# Benchmark module -> arguments (full run, --quick run)
+SUITE: dict[str, tuple[list[str], list[str]]] = {
+    'api': (
+        ['--requests', '300', '--sizes', '1000,10000,100000', '--alerts', '10000'],
+        ['--requests', '50', '--sizes', '1000,10000', '--alerts', '2000', '--devices', '20'],
+    ),
+    'ws_fanout': (
+        ['--consumers', '1000', '--messages', '200', '--repeat', '3'],
+        ['--consumers', '200', '--messages', '50', '--repeat', '1'],
+    ),
+    'channel_layers': (
+        ['--receivers', '200', '--messages', '500', '--repeat', '3'],
+        ['--receivers', '50', '--messages', '100', '--repeat', '1'],
+    ),
+}
+
+# Figures compared with the baseline; lower is better except for throughput
+COMPARED_SUFFIXES: tuple[str, ...] = ('mean_ms', 'median_ms', 'p50_ms', 'p95_ms', 'cpu_ms', 'per_s')
+
+
+def _figures(node: Any, path: tuple[str, ...] = ()) -> Iterator[tuple[str, float]]:
+    """Yield (dotted path, value) of every compared figure of a report."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _figures(value, path + (str(key),))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool) and path:
+        if path[-1].endswith(COMPARED_SUFFIXES):
+            yield '.'.join(path), float(node)
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> dict[str, list[dict[str, Any]]]:
+    """
+    Compare two suite reports.
+
+    Returns:
+        Dict with the 'regressions' and 'improvements' beyond ``tolerance``
+        (a fraction), each entry giving the figure, both values and the change.
+    """
+    before = dict(_figures(baseline.get('results', {})))
+    changes: dict[str, list[dict[str, Any]]] = {'regressions': [], 'improvements': []}
+    for name, value in _figures(current.get('results', {})):
+        previous = before.get(name)
+        if not previous:
+            continue
+        change = value / previous - 1
+        if abs(change) <= tolerance:
+            continue
+        worse = change < 0 if name.endswith('per_s') else change > 0
+        changes['regressions' if worse else 'improvements'].append({
+            'figure': name,
+            'baseline': previous,
+            'current': value,
+            'change_pct': round(change * 100, 1),
+        })
+    return changes
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output-dir', default='bench-results', help='Directory receiving the JSON reports')
+    parser.add_argument('--only', default=','.join(SUITE), help='Comma-separated subset of benchmarks')
+    parser.add_argument('--quick', action='store_true', help='Small parameters (seconds instead of minutes)')
+    parser.add_argument('--baseline', default=None, help='Previous suite.json to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Relative change ignored by the comparison')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    reports: dict[str, Any] = {}
+    for name in filter(None, args.only.split(',')):
+        if name not in SUITE:
+            parser.error(f"unknown benchmark '{name}' (expected one of {', '.join(SUITE)})")
+        full, quick = SUITE[name]
+        output = os.path.join(args.output_dir, f'{name}.json')
+        module = importlib.import_module(f'benchmarks.{name}')
+        reports[name] = module.main((quick if args.quick else full) + ['--output', output])
+        sys.stderr.write(f'{name}: {output}\n')
+
+    environment = next(iter(reports.values()))['environment'] if reports else {}
+    suite = {
+        'benchmark': 'suite',
+        'environment': environment,
+        'params': {'quick': args.quick, 'benchmarks': list(reports)},
+        'results': {name: report['results'] for name, report in reports.items()},
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            suite['comparison'] = compare(suite, json.load(handle), args.tolerance)
+
+    path = os.path.join(args.output_dir, 'suite.json')
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(json.dumps(suite, indent=2, default=str) + '\n')
+    sys.stdout.write(json.dumps(suite.get('comparison', {'suite': path}), indent=2) + '\n')
+
+    if args.fail_on_regression and suite.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+    return suite
+
+
+if __name__ == '__main__':
+    main()
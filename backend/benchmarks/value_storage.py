@@ -0,0 +1,135 @@
+"""
+Benchmark: Decimal(20, 10) vs float8 storage for Measurement.value.
+
+Creates two scratch tables shaped like ``measurements`` (one per storage
+mode), then compares insert throughput, table size, aggregate speed, read
+cost and DRF serialization cost. The scratch tables are dropped afterwards.
+
+Usage:
+  python -m benchmarks.value_storage --rows 200000
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from benchmarks.common import base_parser, emit, measure, setup_django
+
+BATCH_SIZE: int = 5000
+
+
+def _scratch_model(storage: str):
+    """Build an unmanaged model class with a value column pinned to a storage."""
+    from django.db import models
+    from devices.fields import MeasurementValueField
+
+    meta = type('Meta', (), {
+        'app_label': 'devices',
+        'db_table': f'bench_measurements_{storage}',
+        'managed': False,
+    })
+    attrs = {
+        '__module__': __name__,
+        'Meta': meta,
+        'device_id': models.BigIntegerField(),
+        'definition_id': models.IntegerField(),
+        'value': MeasurementValueField(max_digits=20, decimal_places=10, storage=storage),
+        'timestamp': models.DateTimeField(),
+    }
+    return type(f'BenchMeasurement{storage.title()}', (models.Model,), attrs)
+
+
+def _table_size(table: str) -> Optional[int]:
+    """Return the on-disk size of a table (with indexes) in bytes, when available."""
+    from django.db import DatabaseError, connection
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [table])
+                return cursor.fetchone()[0]
+            except DatabaseError:
+                return None
+    return None
+
+
+def _rows(model, count: int, seed: int = 42) -> list:
+    """Generate deterministic sensor-like rows."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        model(
+            device_id=(i % 100) + 1,
+            definition_id=(i % 5) + 1,
+            value=round(rng.gauss(25.0, 5.0), 4),
+            timestamp=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def _serialize(values: list, storage: str) -> str:
+    """Serialize values the way MeasurementSerializer does for the storage mode."""
+    from rest_framework import serializers
+
+    if storage == 'float':
+        field = serializers.FloatField()
+    else:
+        field = serializers.DecimalField(max_digits=20, decimal_places=10)
+    return json.dumps([field.to_representation(value) for value in values])
+
+
+def run_storage(storage: str, rows: int, repeat: int) -> dict[str, Any]:
+    """Run every measurement for one storage mode."""
+    from django.db import connection
+    from django.db.models import Avg, Max, Min
+
+    model = _scratch_model(storage)
+    table = model._meta.db_table
+    with connection.schema_editor() as editor:
+        editor.create_model(model)
+    try:
+        objs = _rows(model, rows)
+        start = time.perf_counter()
+        model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        insert_seconds = time.perf_counter() - start
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+        values = list(model.objects.values_list('value', flat=True))
+        return {
+            'insert_rows_per_s': round(rows / insert_seconds, 1) if insert_seconds else None,
+            'table_bytes': _table_size(table),
+            'aggregate': measure(
+                lambda: model.objects.aggregate(avg=Avg('value'), max=Max('value'), min=Min('value')),
+                repeat,
+            ),
+            'read': measure(lambda: list(model.objects.values_list('value', flat=True)), repeat),
+            'serialize': measure(lambda: _serialize(values, storage), repeat),
+        }
+    finally:
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='Rows inserted per storage mode')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    results = {storage: run_storage(storage, args.rows, args.repeat) for storage in ('decimal', 'float')}
+    return emit('value_storage', {'rows': args.rows, 'repeat': args.repeat}, results, args.output)
+
+
+if __name__ == '__main__':
+    main()
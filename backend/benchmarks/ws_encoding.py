@@ -0,0 +1,101 @@
+"""
+Benchmark: JSON vs MessagePack vs CBOR WebSocket frames.
+
+Encodes realistic measurement_update frames (single and batched) with every
+available codec and reports bytes on the wire and encode/decode CPU time
+per message. No database access is needed.
+
+Usage:
+  python -m benchmarks.ws_encoding --messages 20000 --batch-size 50
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from benchmarks.common import base_parser, emit, setup_django
+
+
+def _frames(count: int, seed: int = 42) -> list[dict[str, Any]]:
+    """Generate measurement_update frames shaped like the ingestion broadcast."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    metrics = (('temperature', '°C'), ('humidity', '%'), ('pressure', 'hPa'), ('voltage', 'V'))
+    frames = []
+    for i in range(count):
+        metric, unit = metrics[i % len(metrics)]
+        frames.append({
+            'type': 'measurement_update',
+            'device_id': '550e8400-e29b-41d4-a716-446655440000',
+            'seq': i + 1,
+            'measurement': {
+                'id': 1000000 + i,
+                'device': 1,
+                'metric': metric,
+                'value': f'{rng.gauss(25.0, 5.0):.10f}',
+                'unit': unit,
+                'timestamp': (start + timedelta(milliseconds=20 * i)).isoformat().replace('+00:00', 'Z'),
+            },
+        })
+    return frames
+
+
+def _time_per_message(fn, items: list, repeat: int) -> float:
+    """Return the best per-item time in microseconds over ``repeat`` passes."""
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 3)
+
+
+def _size(payload: Any) -> int:
+    return len(payload.encode('utf-8')) if isinstance(payload, str) else len(payload)
+
+
+def run_codec(codec, frames: list[dict[str, Any]], batch_size: int, repeat: int) -> dict[str, Any]:
+    """Measure one codec on single and batched frames."""
+    batches = [
+        {'type': 'measurement_batch', 'updates': frames[i:i + batch_size]}
+        for i in range(0, len(frames), batch_size)
+    ]
+    results = {}
+    for label, items in (('single', frames), ('batch', batches)):
+        encoded = [codec.encode(item) for item in items]
+        total_bytes = sum(_size(payload) for payload in encoded)
+        results[label] = {
+            'messages': len(items),
+            'bytes_per_message': round(total_bytes / len(items), 1),
+            'bytes_per_measurement': round(total_bytes / len(frames), 1),
+            'encode_us_per_message': _time_per_message(codec.encode, items, repeat),
+            'decode_us_per_message': _time_per_message(codec.decode, encoded, repeat),
+        }
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000, help='Measurement frames encoded per codec')
+    parser.add_argument('--batch-size', type=int, default=50, help='Updates per measurement_batch frame')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from devices.encoding import CODECS
+
+    frames = _frames(args.messages)
+    results = {name: run_codec(codec, frames, args.batch_size, args.repeat) for name, codec in CODECS.items()}
+    return emit(
+        'ws_encoding',
+        {'messages': args.messages, 'batch_size': args.batch_size, 'repeat': args.repeat},
+        results,
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: WebSocket fan-out with per-consumer encoding vs shared encodings.
+
+Broadcasts measurement updates to many local DeviceConsumer instances
+subscribed to the same device, once as plain events (the legacy shape:
+every consumer serializes the frame itself) and once as published by
+publish_measurement() (frame encoded once per codec and process). Each
+consumer receives its own copy of the event through the channels_redis
+message serializer, as it would from Redis, and its frames go to a sink
+counting bytes, so the numbers isolate serialization CPU from the network
+and the ASGI server. No database or Redis access is needed.
+
+Usage:
+  python -m benchmarks.ws_fanout --consumers 1000 --messages 200 --codec msgpack
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Optional
+
+from benchmarks.common import base_parser, emit, setup_django
+from benchmarks.ws_encoding import _frames
+
+PUBLIC_ID: str = '550e8400-e29b-41d4-a716-446655440000'
+
+
+async def _consumers(count: int, codec, messages: int) -> tuple[list, list[int]]:
+    """Build consumers ready to handle measurement_update events, with a byte-counting sink."""
+    from devices.consumers import DeviceConsumer
+
+    sent = [0]
+
+    async def sink(text_data=None, bytes_data=None, close=False):
+        sent[0] += len(bytes_data) if bytes_data is not None else len(text_data)
+
+    consumers = []
+    for _ in range(count):
+        consumer = DeviceConsumer()
+        consumer.scope = {'type': 'websocket', 'subprotocols': []}
+        consumer.codec = codec
+        consumer.public_id = PUBLIC_ID
+        consumer.init_delivery()
+        consumer.init_send_queue()
+        # Room for every frame: nothing is dropped while the writer tasks catch up
+        consumer.send_queue.max_frames = messages + 1
+        consumer.send_queue.max_bytes = 1 << 40
+        consumer.send = sink
+        consumers.append(consumer)
+    return consumers, sent
+
+
+def _events(mode: str, frames: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Return the channel layer events carrying each frame."""
+    from devices.encoding import broadcast_event
+
+    if mode == 'per_consumer':
+        return frames
+    return [
+        broadcast_event(
+            'measurement_update', frame, device_id=frame['device_id'], metric=frame['measurement']['metric']
+        )
+        for frame in frames
+    ]
+
+
+async def _run(mode: str, consumers: int, frames: list[dict[str, Any]], codec) -> dict[str, Any]:
+    from channels_redis.serializers import registry
+
+    serializer = registry.get_serializer('msgpack')
+    receivers, sent = await _consumers(consumers, codec, len(frames))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    publish_start = time.process_time()
+    messages = [serializer.serialize(event) for event in _events(mode, frames)]
+    publish_cpu = time.process_time() - publish_start
+    for message in messages:
+        for consumer in receivers:
+            await consumer.measurement_update(serializer.deserialize(message))
+    while any(consumer.send_queue for consumer in receivers):
+        await asyncio.sleep(0)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    for consumer in receivers:
+        await consumer.stop_send_queue()
+    delivered = consumers * len(frames)
+    return {
+        'delivered_frames': delivered,
+        'bytes_sent': sent[0],
+        'channel_message_bytes': round(sum(len(message) for message in messages) / len(messages), 1),
+        'publish_cpu_ms': round(publish_cpu * 1000, 2),
+        'cpu_ms': round(cpu * 1000, 1),
+        'wall_ms': round(wall * 1000, 1),
+        'cpu_us_per_delivered_frame': round(cpu / delivered * 1e6, 3),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """Entry point."""
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--consumers', type=int, default=1000, help='Local consumers subscribed to the device')
+    parser.add_argument('--messages', type=int, default=200, help='Updates broadcast to the group')
+    parser.add_argument('--codec', default='json', help='Codec negotiated by every consumer (json, msgpack, cbor)')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from devices.encoding import CODECS
+
+    if args.codec not in CODECS:
+        parser.error(f"codec '{args.codec}' is not available (installed: {', '.join(CODECS)})")
+
+    frames = _frames(args.messages)
+    results: dict[str, Any] = {}
+    for mode in ('per_consumer', 'shared'):
+        runs = [
+            asyncio.run(_run(mode, args.consumers, frames, CODECS[args.codec]))
+            for _ in range(max(1, args.repeat))
+        ]
+        results[mode] = min(runs, key=lambda run: run['cpu_ms'])
+    results['cpu_saved_pct'] = round(
+        100 * (1 - results['shared']['cpu_ms'] / results['per_consumer']['cpu_ms']), 1
+    )
+    return emit(
+        'ws_fanout',
+        {'consumers': args.consumers, 'messages': args.messages, 'codec': args.codec, 'repeat': args.repeat},
+        results,
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -21,14 +20,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django_asgi_app = get_asgi_application()
 
 # Import routing configuration
-from devices.routing import websocket_urlpatterns
+from accounts.middleware import JWTAuthMiddleware  # noqa: E402
+from devices.routing import websocket_urlpatterns  # noqa: E402
 
 application = ProtocolTypeRouter({
     # Django's ASGI application to handle traditional HTTP requests
     "http": django_asgi_app,
     
-    # WebSocket handler
-    "websocket": AuthMiddlewareStack(
+    # WebSocket handler, authenticated with JWT access tokens (see accounts.middleware)
+    "websocket": JWTAuthMiddleware(
         URLRouter(websocket_urlpatterns)
     ),
 })
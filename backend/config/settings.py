@@ -45,6 +45,7 @@ INSTALLED_APPS: List[str] = [
     'channels',
     
     # Local apps
+    'core',
     'accounts',
     'devices',
     
@@ -56,6 +57,12 @@ INSTALLED_APPS: List[str] = [
 ]
 
 MIDDLEWARE: List[str] = [
+    # /healthz e /readyz respondidos antes do restante da pilha (sem sessão, CSRF, JWT ou DRF)
+    'core.health.HealthCheckMiddleware',
+    # Requisições de leitura da API vão para uma réplica (apenas com DB_REPLICA_HOSTS)
+    'core.replicas.ReplicaRoutingMiddleware',
+    # Contagem/tempo de queries por requisição (apenas com QUERY_INSTRUMENTATION=True)
+    'core.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS deve vir antes de CommonMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -64,6 +71,8 @@ MIDDLEWARE: List[str] = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Perfil de uma requisição sob demanda (X-Profile / ?_profile=, apenas admins)
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF: str = 'config.urls'
@@ -102,9 +111,45 @@ DATABASES = {
         'OPTIONS': {
             'connect_timeout': 10,
         },
+        # Persistent connections (opt-in): reused by the requests and consumer events of the same
+        # thread for up to DB_CONN_MAX_AGE seconds; 0 (default): one connection per request
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        # Ping a reused connection before the first query of a request (drops dead sockets)
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        # Behind PgBouncer in transaction pooling mode (POSTGRES_HOST/PORT pointing at it),
+        # cursors cannot outlive a transaction: QuerySet.iterator() falls back to client-side cursors
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
     }
 }
 
+# Under Daphne (ASGI, the docker-compose setup) Django runs each HTTP request's sync code in a
+# thread of its own, so a persistent connection does not outlive the request and Django advises
+# against them: keep DB_CONN_MAX_AGE=0 and pool with PgBouncer (DB_PGBOUNCER=True), whose
+# connection is local and cheap while its server connections persist. Set DB_CONN_MAX_AGE (e.g. 60)
+# for WSGI workers (gunicorn).
+
+# Read replicas (core.replicas): host[:port] of each streaming replica, added as replica_1, replica_2...
+# Read-only requests under DB_REPLICA_PATH_PREFIXES and WebSocket snapshot rebuilds read from a
+# replica lagging at most DB_REPLICA_MAX_LAG (DB_REPLICA_SNAPSHOT_MAX_LAG) seconds, else the primary
+DB_REPLICA_HOSTS: list = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+for _index, _host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host.split(':')[0],
+        'PORT': int(_host.split(':')[1]) if ':' in _host else DATABASES['default']['PORT'],
+        # An unreachable replica is skipped quickly and rechecked later
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'connect_timeout': 3},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS: List[str] = [f'replica_{index}' for index in range(1, len(DB_REPLICA_HOSTS) + 1)]
+DATABASE_ROUTERS: List[str] = ['core.replicas.ReplicaRouter']
+DB_REPLICA_PATH_PREFIXES: list = config('DB_REPLICA_PATH_PREFIXES', default='/api/', cast=Csv())
+DB_REPLICA_MAX_LAG: float = config('DB_REPLICA_MAX_LAG', default=5.0, cast=float)
+DB_REPLICA_SNAPSHOT_MAX_LAG: float = config('DB_REPLICA_SNAPSHOT_MAX_LAG', default=1.0, cast=float)
+DB_REPLICA_LAG_CHECK_INTERVAL: float = config('DB_REPLICA_LAG_CHECK_INTERVAL', default=5.0, cast=float)
+# After a mutating request, its caller reads from the primary for this many seconds
+DB_READ_YOUR_WRITES_SECONDS: float = config('DB_READ_YOUR_WRITES_SECONDS', default=10.0, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -241,27 +286,145 @@ CORS_ALLOW_HEADERS: List[str] = [
 ]
 
 
+# Measurement storage
+# 'decimal' keeps Measurement.value as NUMERIC(20, 10); 'float' stores it as float8.
+# Switching an existing database requires: python manage.py convert_measurement_storage
+
+MEASUREMENT_VALUE_STORAGE: str = config('MEASUREMENT_VALUE_STORAGE', default='decimal')
+
+# Create BRIN indexes on measurements(timestamp) and (device_id, timestamp) when migrating (PostgreSQL only)
+MEASUREMENT_BRIN_INDEXES: bool = config('MEASUREMENT_BRIN_INDEXES', default=False, cast=bool)
+
+# Cold tier: closed ranges older than the hot retention are exported to Parquet and
+# deleted from the database by: python manage.py archive_measurements
+# The root may be a local directory or an S3-compatible URI (s3://bucket/prefix).
+MEASUREMENT_ARCHIVE_ROOT: str = config('MEASUREMENT_ARCHIVE_ROOT', default=str(BASE_DIR / 'archive'))
+MEASUREMENT_HOT_RETENTION_DAYS: int = config('MEASUREMENT_HOT_RETENTION_DAYS', default=90, cast=int)
+
+
 # Django Channels Configuration
 # https://channels.readthedocs.io/en/stable/topics/channel_layers.html
 
 # Usa Redis como Channel Layer para escalabilidade de WebSockets
 # Em desenvolvimento local sem Docker, use 'localhost', no Docker use 'redis'
+# Instâncias com um único processo ASGI podem usar
+# CHANNEL_LAYER_BACKEND=core.layers.BoundedInMemoryChannelLayer (sem Redis)
+CHANNEL_LAYER_BACKEND: str = config(
+    'CHANNEL_LAYER_BACKEND',
+    default='channels_redis.core.RedisChannelLayer'
+)
+
+CHANNEL_LAYER_CONFIG: dict = {
+    # Configurações adicionais para melhor performance
+    "capacity": config('CHANNEL_LAYER_CAPACITY', default=1500, cast=int),  # Número máximo de mensagens em um canal
+    "expiry": config('CHANNEL_LAYER_EXPIRY', default=10, cast=int),  # Tempo de expiração das mensagens em segundos
+}
+
+# Vários shards Redis: CHANNEL_LAYER_REDIS_HOSTS=redis://r1:6379/0,redis://r2:6379/0 (ou host:porta)
+# com CHANNEL_LAYER_BACKEND=core.redis_layers.ShardedRedisChannelLayer (hash consistente)
+# ou core.redis_layers.ShardedRedisPubSubChannelLayer (apenas broadcast, sem filas)
+CHANNEL_LAYER_REDIS_HOSTS: list = [
+    entry if '://' in entry else (entry.rsplit(':', 1)[0], int(entry.rsplit(':', 1)[1]) if ':' in entry else 6379)
+    for entry in config('CHANNEL_LAYER_REDIS_HOSTS', default='', cast=Csv())
+] or [
+    (
+        config('REDIS_HOST', default='redis'),
+        config('REDIS_PORT', default=6379, cast=int)
+    )
+]
+
+if CHANNEL_LAYER_BACKEND.startswith(('channels_redis.', 'core.redis_layers.')):
+    CHANNEL_LAYER_CONFIG["hosts"] = CHANNEL_LAYER_REDIS_HOSTS
+elif CHANNEL_LAYER_BACKEND == 'core.layers.BoundedInMemoryChannelLayer':
+    # drop_oldest: a full channel (stalled client) loses its oldest message, not the newest
+    CHANNEL_LAYER_CONFIG["overflow"] = config('CHANNEL_LAYER_OVERFLOW', default='drop_oldest')
+
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': config(
-            'CHANNEL_LAYER_BACKEND',
-            default='channels_redis.core.RedisChannelLayer'
-        ),
-        'CONFIG': {
-            "hosts": [
-                (
-                    config('REDIS_HOST', default='redis'),
-                    config('REDIS_PORT', default=6379, cast=int)
-                )
-            ],
-            # Configurações adicionais para melhor performance
-            "capacity": 1500,  # Número máximo de mensagens em um canal
-            "expiry": 10,  # Tempo de expiração das mensagens em segundos
-        },
+        'BACKEND': CHANNEL_LAYER_BACKEND,
+        'CONFIG': CHANNEL_LAYER_CONFIG,
     },
 }
+
+
+# WebSocket streams
+
+# Maximum number of devices a multiplexed connection (ws/devices/) may subscribe to
+WS_MAX_SUBSCRIPTIONS: int = config('WS_MAX_SUBSCRIPTIONS', default=500, cast=int)
+
+# Points kept in the cached per-device snapshot sent on connect, and its lifetime (seconds)
+WS_SNAPSHOT_POINTS: int = config('WS_SNAPSHOT_POINTS', default=50, cast=int)
+WS_SNAPSHOT_TTL: int = config('WS_SNAPSHOT_TTL', default=86400, cast=int)
+
+# Reject WebSocket handshakes without a valid JWT access token (close code 4401).
+# Disable only for local experiments: device streams are otherwise public.
+WS_REQUIRE_AUTH: bool = config('WS_REQUIRE_AUTH', default=True, cast=bool)
+
+# Seconds a WebSocket user is cached after loading it from the database; 0 trusts the token claims alone
+WS_JWT_USER_CACHE_TTL: int = config('WS_JWT_USER_CACHE_TTL', default=0, cast=int)
+
+# Binary subprotocols offered besides JSON; frames are encoded once per codec and process
+WS_CODECS: list = config('WS_CODECS', default='msgpack,cbor', cast=Csv())
+
+# Per-connection send queue of measurement frames, and what happens when a slow client fills it:
+# drop_oldest, coalesce (latest value per metric) or disconnect (close code 4008, client resyncs)
+WS_SEND_QUEUE_MAX_FRAMES: int = config('WS_SEND_QUEUE_MAX_FRAMES', default=256, cast=int)
+WS_SEND_QUEUE_MAX_BYTES: int = config('WS_SEND_QUEUE_MAX_BYTES', default=1048576, cast=int)
+WS_SEND_QUEUE_POLICY: str = config('WS_SEND_QUEUE_POLICY', default='drop_oldest')
+# Bytes Daphne may hold unsent for a connection before its send queue stops draining (0 disables;
+# Daphne's send() never waits for the socket, see devices.backpressure)
+WS_SEND_QUEUE_TRANSPORT_MAX_BYTES: int = config('WS_SEND_QUEUE_TRANSPORT_MAX_BYTES', default=262144, cast=int)
+
+
+# SQL instrumentation (core.instrumentation): query count, DB time, duplicated and
+# slowest statements per request (Server-Timing header + JSON log) and per WebSocket event
+QUERY_INSTRUMENTATION: bool = config('QUERY_INSTRUMENTATION', default=False, cast=bool)
+QUERY_INSTRUMENTATION_SLOWEST: int = config('QUERY_INSTRUMENTATION_SLOWEST', default=3, cast=int)
+
+# Runtime metrics exported on /metrics (core.metrics, devices.metrics)
+# Bearer token required to scrape /metrics (empty: /metrics answers 404 unless DEBUG)
+METRICS_BEARER_TOKEN: str = config('METRICS_BEARER_TOKEN', default='')
+# Directory shared by the worker processes of a container so /metrics reports all of them
+# (empty: single process); emptied when the container starts
+METRICS_MULTIPROCESS_DIR: str = config('METRICS_MULTIPROCESS_DIR', default='')
+METRICS_FLUSH_INTERVAL: float = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+# One ws_group_subscribers series per channel layer group (one per watched device)
+METRICS_WS_GROUP_LABELS: bool = config('METRICS_WS_GROUP_LABELS', default=False, cast=bool)
+
+# On-demand profiling (core.profiling): admins add X-Profile: collapsed|cprofile|pyinstrument
+# (or ?_profile=) to a request, or ?_profile=collapsed to a WebSocket URL; a debugging tool,
+# off unless a deployment turns it on
+PROFILER_ENABLED: bool = config('PROFILER_ENABLED', default=False, cast=bool)
+# Sampling interval (seconds) of the collapsed-stack and pyinstrument profilers
+PROFILER_INTERVAL: float = config('PROFILER_INTERVAL', default=0.001, cast=float)
+PROFILER_CPROFILE_LINES: int = config('PROFILER_CPROFILE_LINES', default=60, cast=int)
+# Profiles are also written here (empty: not stored; WebSocket profiles need it)
+PROFILER_OUTPUT_DIR: str = config('PROFILER_OUTPUT_DIR', default=str(BASE_DIR / 'profiles'))
+
+# Readiness probe /readyz (core.health): database, cache and channel layer Redis checks,
+# cached per worker for READINESS_CACHE_TTL seconds; READINESS_TIMEOUT bounds each Redis ping
+READINESS_CACHE_TTL: float = config('READINESS_CACHE_TTL', default=5.0, cast=float)
+READINESS_TIMEOUT: float = config('READINESS_TIMEOUT', default=2.0, cast=float)
+
+# Slow-query capture (core.slow_queries): statements slower than the threshold are logged and
+# kept in a per-worker ring buffer served to admins on /api/diagnostics/slow-queries/ (0: off)
+SLOW_QUERY_THRESHOLD_MS: float = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+SLOW_QUERY_BUFFER_SIZE: int = config('SLOW_QUERY_BUFFER_SIZE', default=100, cast=int)
+# Fraction of slow SELECTs whose plan is captured (plain EXPLAIN: planned, not executed)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = config('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', default=0.1, cast=float)
+# Opt-in EXPLAIN (ANALYZE, BUFFERS) on PostgreSQL: actual row counts and buffers, but the sampled
+# statement runs a second time, adding load when the database is already slow
+SLOW_QUERY_EXPLAIN_ANALYZE: bool = config('SLOW_QUERY_EXPLAIN_ANALYZE', default=False, cast=bool)
+
+# Cache (shared by every worker; holds WebSocket snapshots and sequence numbers)
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': config(
+            'CACHE_LOCATION',
+            default=f"redis://{config('REDIS_HOST', default='redis')}:{config('REDIS_PORT', default=6379, cast=int)}/1"
+        ),
+    }
+}
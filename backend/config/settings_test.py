@@ -14,6 +14,9 @@ DATABASES = {
     }
 }
 
+# No read replicas in tests (routing is exercised with overridden DATABASE_REPLICAS)
+DATABASE_REPLICAS = []
+
 # Use in-memory channel layer for tests (no Redis required)
 CHANNEL_LAYERS = {
     'default': {
@@ -21,6 +24,13 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Use local memory cache for tests (no Redis required)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
 # Speed up tests: simpler password hashing
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
@@ -15,6 +15,7 @@ from rest_framework_simplejwt.views import (
 )
 from accounts.serializers import CustomTokenObtainPairSerializer
 from accounts.views import register_user, get_current_user
+from core.views import metrics, SlowQueryListView
 from devices.views import CategoryViewSet, DeviceViewSet, MeasurementIngestionView, DeviceAggregatedDataView, DeviceMetricsView, AlertViewSet, ThresholdViewSet
 from typing import List
 
@@ -26,6 +27,9 @@ router.register(r'alerts', AlertViewSet, basename='alert')
 
 urlpatterns: List = [
     path('admin/', admin.site.urls),
+
+    # Prometheus metrics (plain Django view, outside DRF authentication)
+    path('metrics', metrics, name='metrics'),
     
     # JWT Authentication endpoints
     path('api/token/', TokenObtainPairView.as_view(serializer_class=CustomTokenObtainPairSerializer), name='token_obtain_pair'),
@@ -37,6 +41,9 @@ urlpatterns: List = [
     
     # Current user endpoint
     path('api/me/', get_current_user, name='current_user'),
+
+    # Slow queries captured by this worker (admin only)
+    path('api/diagnostics/slow-queries/', SlowQueryListView.as_view(), name='slow_queries'),
     
     # API endpoints
     path('api/', include(router.urls)),
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from typing import Final
+
+
+class CoreConfig(AppConfig):
+    default_auto_field: Final[str] = 'django.db.models.BigAutoField'
+    name: Final[str] = 'core'
+    verbose_name: Final[str] = 'Core'
+
+    def ready(self) -> None:
+        # Share this worker's metrics with the others (METRICS_MULTIPROCESS_DIR)
+        from core.metrics import start_flusher
+        start_flusher()
+
+        # Capture statements slower than SLOW_QUERY_THRESHOLD_MS on every connection
+        from core.slow_queries import install_all
+        install_all()
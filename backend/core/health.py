@@ -0,0 +1,125 @@
+"""
+Liveness and readiness probes.
+
+HealthCheckMiddleware sits first in MIDDLEWARE and answers two paths
+before the rest of the stack (sessions, CSRF, authentication, DRF, host
+validation) runs:
+
+- ``/healthz``: the process is up and serving requests; touches nothing.
+- ``/readyz``: the dependencies answer: the database (``SELECT 1``), the
+  cache and the Redis servers of the channel layer. The result is kept for
+  READINESS_CACHE_TTL seconds per process, so frequent probes (Docker,
+  Kubernetes, load balancers) cost a dictionary lookup most of the time;
+  503 when a check fails.
+
+Both answer GET and HEAD with a small JSON body and ``Cache-Control:
+no-store``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpRequest, JsonResponse
+
+LIVENESS_PATH: str = '/healthz'
+READINESS_PATH: str = '/readyz'
+
+_lock = threading.Lock()
+_readiness: dict[str, Any] = {}
+_redis_clients: dict[str, Any] = {}
+
+
+def check_database() -> None:
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_cache() -> None:
+    # A miss is fine: the round trip is what matters
+    cache.get('readyz-probe')
+
+
+def _redis_client(host: Any):
+    import redis
+
+    key = repr(host)
+    client = _redis_clients.get(key)
+    if client is None:
+        timeout = settings.READINESS_TIMEOUT
+        if isinstance(host, dict):
+            host = host.get('address', host)
+        if isinstance(host, str):
+            client = redis.Redis.from_url(host, socket_timeout=timeout, socket_connect_timeout=timeout)
+        else:
+            client = redis.Redis(host=host[0], port=host[1], socket_timeout=timeout, socket_connect_timeout=timeout)
+        _redis_clients[key] = client
+    return client
+
+
+def check_channel_layer() -> None:
+    """PING every Redis server of the channel layer (nothing to check for in-memory layers)."""
+    for host in settings.CHANNEL_LAYERS['default'].get('CONFIG', {}).get('hosts', []):
+        _redis_client(host).ping()
+
+
+CHECKS: dict[str, Callable[[], None]] = {
+    'database': check_database,
+    'cache': check_cache,
+    'channel_layer': check_channel_layer,
+}
+
+
+def run_checks() -> dict[str, Any]:
+    """Run every check; return the overall status and the duration (or error) of each."""
+    results: dict[str, Any] = {}
+    for name, check in CHECKS.items():
+        started = time.perf_counter()
+        try:
+            check()
+        except Exception as exc:
+            results[name] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        else:
+            results[name] = {'ok': True, 'ms': round((time.perf_counter() - started) * 1000, 2)}
+    return {'ready': all(result['ok'] for result in results.values()), 'checks': results, 'checked_at': time.time()}
+
+
+def readiness() -> dict[str, Any]:
+    """Result of ``run_checks()``, at most READINESS_CACHE_TTL seconds old."""
+    with _lock:
+        if not _readiness or time.monotonic() - _readiness['monotonic'] >= settings.READINESS_CACHE_TTL:
+            _readiness.update(run_checks(), monotonic=time.monotonic())
+        return {key: value for key, value in _readiness.items() if key != 'monotonic'}
+
+
+def reset() -> None:
+    """Forget the cached readiness (tests)."""
+    with _lock:
+        _readiness.clear()
+
+
+def _response(payload: dict[str, Any], status: int) -> JsonResponse:
+    response = JsonResponse(payload, status=status)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class HealthCheckMiddleware:
+    """Answer the liveness and readiness probes before any other middleware runs."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        path = request.path_info.rstrip('/')
+        if path not in (LIVENESS_PATH, READINESS_PATH) or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        if path == LIVENESS_PATH:
+            return _response({'status': 'ok'}, 200)
+        result = readiness()
+        return _response({'status': 'ok' if result['ready'] else 'unavailable', **result}, 200 if result['ready'] else 503)
@@ -0,0 +1,185 @@
+"""
+Per-request and per-WebSocket-event SQL instrumentation.
+
+Enabled with QUERY_INSTRUMENTATION, it records for each HTTP request and
+each consumer event (connect, receive, group message) the number of
+queries, the total database time, the statements executed more than once
+(the usual symptom of an N+1 or of a queryset evaluated twice) and the
+QUERY_INSTRUMENTATION_SLOWEST slowest statements.
+
+- HTTP: QueryInstrumentationMiddleware adds a ``Server-Timing`` header
+  (``db`` and ``app`` durations, readable in the browser dev tools) and
+  logs one JSON line per request on the ``core.instrumentation`` logger,
+  with the same payload in ``extra={'query_stats': ...}`` for structured
+  log handlers.
+- WebSocket: QueryStatsConsumerMixin logs the same payload for every
+  consumer event that ran queries.
+
+Statements are captured by a ``connection.execute_wrapper`` installed on
+every database connection; the active QueryRecorder travels in a context
+variable, so queries run through ``database_sync_to_async`` are attributed
+to the event that awaited them. Without an active recorder the wrapper
+only reads that variable.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Characters of SQL kept for each of the slowest statements
+SQL_PREVIEW_LENGTH: int = 500
+
+_recorder: ContextVar[Optional['QueryRecorder']] = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Query count, database time, duplicates and slowest statements of one unit of work."""
+
+    def __init__(self, slowest: int = 3):
+        self.slowest = slowest
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+        self._slowest: list[tuple[float, int, str, str]] = []
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, time.perf_counter() - started, context['connection'].alias)
+
+    def add(self, sql: str, duration: float, alias: str = 'default') -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[sql] += 1
+        if self.slowest:
+            entry = (duration, self.count, alias, sql)
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def duplicates(self) -> dict[str, int]:
+        """SQL executed more than once (parameters excluded) -> number of executions."""
+        return {sql: times for sql, times in self.statements.items() if times > 1}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'queries': self.count,
+            'db_ms': round(self.duration * 1000, 3),
+            'duplicated_queries': sum(times - 1 for times in self.duplicates.values()),
+            'slowest': [
+                {'ms': round(duration * 1000, 3), 'alias': alias, 'sql': sql[:SQL_PREVIEW_LENGTH]}
+                for duration, _, alias, sql in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+def _execute_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection) -> None:
+    """Add the recording wrapper to a connection (idempotent)."""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _install_on_connect(sender, connection, **kwargs) -> None:
+    install(connection)
+
+
+connection_created.connect(_install_on_connect, dispatch_uid='core.instrumentation')
+
+
+def start(slowest: Optional[int] = None) -> tuple[QueryRecorder, Any]:
+    """Activate a new recorder in the current context; returns it and the token for ``stop``."""
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    recorder = QueryRecorder(settings.QUERY_INSTRUMENTATION_SLOWEST if slowest is None else slowest)
+    return recorder, _recorder.set(recorder)
+
+
+def stop(token) -> None:
+    _recorder.reset(token)
+
+
+def server_timing(recorder: QueryRecorder, total: float) -> str:
+    """``Server-Timing`` value with the database and the remaining application time."""
+    db_ms = recorder.duration * 1000
+    return (
+        f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+        f'app;dur={max(0.0, total * 1000 - db_ms):.1f}'
+    )
+
+
+def log(payload: dict[str, Any]) -> None:
+    logger.info(json.dumps(payload, default=str), extra={'query_stats': payload})
+
+
+class QueryInstrumentationMiddleware:
+    """Record the queries of each request; add ``Server-Timing`` and log them."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        recorder, token = start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop(token)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(recorder, total)
+        log({
+            'type': 'http',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            **recorder.as_dict(),
+        })
+        return response
+
+
+class QueryStatsConsumerMixin:
+    """Log the queries run by each event of an async consumer (with QUERY_INSTRUMENTATION)."""
+
+    async def dispatch(self, message):
+        if not settings.QUERY_INSTRUMENTATION:
+            return await super().dispatch(message)
+        started = time.perf_counter()
+        recorder, token = start()
+        try:
+            return await super().dispatch(message)
+        finally:
+            stop(token)
+            if recorder.count:
+                log({
+                    'type': 'websocket',
+                    'consumer': type(self).__name__,
+                    'event': message.get('type'),
+                    'path': self.scope.get('path'),
+                    'total_ms': round((time.perf_counter() - started) * 1000, 3),
+                    **recorder.as_dict(),
+                })
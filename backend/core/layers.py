@@ -0,0 +1,249 @@
+"""
+In-process channel layer for single-node deployments.
+
+When a site runs a single ASGI process, every ``group_send`` going through
+Redis is pure overhead. BoundedInMemoryChannelLayer keeps channels and
+groups in process memory, with the behaviour a production layer needs:
+
+- bounded per-channel queues (``capacity`` / ``channel_capacity``);
+- an overflow policy: ``drop_oldest`` (default) evicts the oldest queued
+  message so a stalled client always gets the freshest data, ``drop_newest``
+  refuses the new message (ChannelFull, like channels_redis);
+- message expiry checked lazily on receive, plus a periodic sweep that
+  forgets channels nobody has read for ``expiry`` seconds (closed sockets)
+  and removes them from their groups;
+- counters exposed by ``metrics()``.
+
+Unlike ``channels.layers.InMemoryChannelLayer`` it does not deep-copy
+messages nor scan every channel on each send: a group_send costs one
+shallow copy and one queue append per member. Handlers must therefore not
+mutate nested values of received messages.
+
+Select it with ``CHANNEL_LAYER_BACKEND=core.layers.BoundedInMemoryChannelLayer``.
+It only connects consumers of the same process; use Redis as soon as there
+is more than one worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import secrets
+import time
+from collections import deque
+from typing import Any, Optional
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+DROP_OLDEST: str = 'drop_oldest'
+DROP_NEWEST: str = 'drop_newest'
+
+OVERFLOW_POLICIES: tuple[str, ...] = (DROP_OLDEST, DROP_NEWEST)
+
+
+class _Channel:
+    """Queued messages of one channel and the receivers waiting on it."""
+
+    __slots__ = ('messages', 'waiters', 'capacity', 'last_active')
+
+    def __init__(self, capacity: int, now: float):
+        self.messages: deque = deque()
+        self.waiters: deque = deque()
+        self.capacity = capacity
+        self.last_active = now
+
+
+class BoundedInMemoryChannelLayer(BaseChannelLayer):
+    """Process-local channel layer with bounded queues, drop-oldest overflow and metrics."""
+
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self,
+        expiry: int = 60,
+        group_expiry: int = 86400,
+        capacity: int = 100,
+        channel_capacity: Optional[dict] = None,
+        overflow: str = DROP_OLDEST,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}' (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.overflow = overflow
+        self.group_expiry = group_expiry
+        self._channels: dict[str, _Channel] = {}
+        self._groups: dict[str, dict[str, float]] = {}
+        self._memberships: dict[str, set[str]] = {}
+        self._next_sweep = time.monotonic() + self.expiry
+        self._counters = dict.fromkeys(
+            ('sent', 'received', 'group_sends', 'dropped_overflow', 'dropped_expired', 'channels_expired'), 0
+        )
+
+    # Channel layer API
+
+    async def send(self, channel: str, message: dict[str, Any]) -> None:
+        """Queue a message on a channel (raises ChannelFull under drop_newest)."""
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        if not self._put(channel, dict(message), now):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel: str) -> dict[str, Any]:
+        """Wait for the next unexpired message of a channel."""
+        self.require_valid_channel_name(channel)
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            state = self._channel(channel, now)
+            state.last_active = now
+            while state.messages:
+                expires, message = state.messages.popleft()
+                if expires >= now:
+                    self._counters['received'] += 1
+                    return message
+                self._counters['dropped_expired'] += 1
+            waiter = loop.create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+                try:
+                    state.waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    async def new_channel(self, prefix: str = 'specific.') -> str:
+        """Return a new process-local channel name."""
+        return f'{prefix}.bounded!{secrets.token_hex(8)}'
+
+    # Groups extension
+
+    async def group_add(self, group: str, channel: str) -> None:
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        self._groups.setdefault(group, {})[channel] = time.monotonic()
+        self._memberships.setdefault(channel, set()).add(group)
+
+    async def group_discard(self, group: str, channel: str) -> None:
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        self._discard(group, channel)
+
+    async def group_send(self, group: str, message: dict[str, Any]) -> None:
+        """Queue a message on every member of a group; full channels drop per the overflow policy."""
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        self._counters['group_sends'] += 1
+        members = self._groups.get(group)
+        if not members:
+            return
+        joined_after = now - self.group_expiry
+        for channel, joined in list(members.items()):
+            if joined < joined_after:
+                self._discard(group, channel)
+                continue
+            self._put(channel, dict(message), now)
+
+    # Flush extension
+
+    async def flush(self) -> None:
+        for state in self._channels.values():
+            for waiter in state.waiters:
+                if not waiter.done():
+                    waiter.cancel()
+        self._channels.clear()
+        self._groups.clear()
+        self._memberships.clear()
+
+    async def close(self) -> None:
+        pass
+
+    # Metrics
+
+    def metrics(self) -> dict[str, int]:
+        """Return counters plus the current number of channels, groups and queued messages."""
+        depths = [len(state.messages) for state in self._channels.values()]
+        return {
+            **self._counters,
+            'channels': len(self._channels),
+            'groups': len(self._groups),
+            'queued': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+        }
+
+    # Internals
+
+    def _channel(self, channel: str, now: float) -> _Channel:
+        state = self._channels.get(channel)
+        if state is None:
+            state = self._channels[channel] = _Channel(self.get_capacity(channel), now)
+        return state
+
+    def _put(self, channel: str, message: dict[str, Any], now: float) -> bool:
+        """Queue a message, applying the overflow policy; return False when it was refused."""
+        state = self._channel(channel, now)
+        if len(state.messages) >= state.capacity:
+            self._counters['dropped_overflow'] += 1
+            if self.overflow == DROP_NEWEST:
+                return False
+            state.messages.popleft()
+        state.messages.append((now + self.expiry, message))
+        self._counters['sent'] += 1
+        while state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                _wake(waiter)
+                break
+        return True
+
+    def _discard(self, group: str, channel: str) -> None:
+        members = self._groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                self._groups.pop(group, None)
+        groups = self._memberships.get(channel)
+        if groups is not None:
+            groups.discard(group)
+            if not groups:
+                self._memberships.pop(channel, None)
+
+    def _maybe_sweep(self, now: float) -> None:
+        """Forget channels without receivers that nobody read for ``expiry`` seconds."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.expiry
+        idle_before = now - self.expiry
+        for channel, state in list(self._channels.items()):
+            if state.waiters or state.last_active >= idle_before:
+                continue
+            self._counters['dropped_expired'] += len(state.messages)
+            self._counters['channels_expired'] += 1
+            del self._channels[channel]
+            for group in list(self._memberships.get(channel, ())):
+                self._discard(group, channel)
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    """Resolve a receive waiter, from its own event loop or any other thread."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    loop = waiter.get_loop()
+    if running is loop:
+        waiter.set_result(None)
+    else:
+        loop.call_soon_threadsafe(_resolve, waiter)
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
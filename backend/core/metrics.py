@@ -0,0 +1,378 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are plain in-memory objects guarded by a
+lock, cheap enough for the ingestion and WebSocket hot paths:
+
+    INGESTED = Counter('measurements_ingested_total', 'Measurements received', ['result'])
+    INGESTED.inc(result='created')
+
+    CHECK_SECONDS = Histogram('alert_check_seconds', 'Threshold check duration')
+    with CHECK_SECONDS.time():
+        ...
+
+Values computed on demand (queue depths, totals kept elsewhere) are
+registered with ``register_callback``.
+
+Several worker processes: with METRICS_MULTIPROCESS_DIR set, every process
+writes a JSON snapshot of its registry to ``<dir>/<host>_<pid>.json``
+every METRICS_FLUSH_INTERVAL seconds (and at exit), and ``render()`` merges
+all snapshots, so whichever worker answers ``/metrics`` reports the whole
+container. Counters and histograms are summed over every file, including
+those of exited workers, so they never go backwards; gauges are summed over
+live processes only. Empty the directory when the container starts.
+"""
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Any, Callable, Iterable, Optional, Union
+
+from django.conf import settings
+
+COUNTER: str = 'counter'
+GAUGE: str = 'gauge'
+HISTOGRAM: str = 'histogram'
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported metric name
+NAMESPACE: str = 'fronthub'
+
+
+class Registry:
+    """Set of metrics exported together."""
+
+    def __init__(self):
+        self._metrics: dict[str, '_Metric'] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric') -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional['_Metric']:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serializable state of every metric of this process."""
+        return {name: metric.describe() for name, metric in sorted(self._metrics.items())}
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind: str = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Optional[Registry] = None):
+        self.name = f'{NAMESPACE}_{name}'
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[list]:
+        with self._lock:
+            return [[list(key), _copy(value)] for key, value in self._values.items()]
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'doc': self.documentation,
+            'labels': list(self.labelnames),
+            'samples': self.samples(),
+        }
+
+    def remove(self, **labels) -> None:
+        """Forget the series of these labels."""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def value(self, **labels) -> Any:
+        """Current value for these labels (tests and callbacks)."""
+        with self._lock:
+            return _copy(self._values.get(self._key(labels)))
+
+
+def _copy(value: Any) -> Any:
+    return list(value) if isinstance(value, list) else value
+
+
+class Counter(_Metric):
+    """Monotonic count; the name should end in ``_total``."""
+
+    kind = COUNTER
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError('Counters can only increase')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (open connections, subscriptions)."""
+
+    kind = GAUGE
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class _Timer(ContextDecorator):
+    """Observe the elapsed seconds of a block or of each call of a function."""
+
+    def __init__(self, histogram: 'Histogram', labels: dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # One timer per call, so a decorated function may run concurrently
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values; each sample is [bucket counts..., sum, count]."""
+
+    kind = HISTOGRAM
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = next((position for position, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def describe(self) -> dict[str, Any]:
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+class _Callback(_Metric):
+    def __init__(self, name, documentation, kind, function, labelnames=(), registry=None):
+        self.kind = kind
+        self.function = function
+        super().__init__(name, documentation, labelnames, registry)
+
+    def samples(self) -> list[list]:
+        values = self.function()
+        if not isinstance(values, dict):
+            return [[[], values]]
+        return [[list(key) if isinstance(key, tuple) else [key], value] for key, value in values.items()]
+
+
+def register_callback(
+    name: str,
+    documentation: str,
+    function: Callable[[], Union[float, dict[Any, float]]],
+    kind: str = GAUGE,
+    labelnames: Iterable[str] = (),
+    registry: Optional[Registry] = None,
+) -> _Metric:
+    """
+    Export a value computed at collection time.
+
+    ``function`` returns a number, or, with ``labelnames``, a dict mapping
+    label values (a tuple, or a plain value for one label) to numbers.
+    """
+    return _Callback(name, documentation, kind, function, labelnames, registry)
+
+
+# Worker processes
+
+def _directory() -> str:
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', '')
+
+
+def _process_file(directory: str) -> str:
+    return os.path.join(directory, f'{socket.gethostname()}_{os.getpid()}.json')
+
+
+def flush(registry: Registry = REGISTRY) -> None:
+    """Write this process' snapshot to METRICS_MULTIPROCESS_DIR (no-op when unset)."""
+    directory = _directory()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _process_file(directory)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(registry.snapshot(), handle)
+    os.replace(temporary, path)
+
+
+def _alive(path: str) -> bool:
+    host, _, pid = os.path.basename(path)[:-len('.json')].rpartition('_')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+def merge(snapshots: Iterable[tuple[dict[str, Any], bool]]) -> dict[str, Any]:
+    """Merge (snapshot, process alive) pairs: sum counters and histograms, and gauges of live processes."""
+    merged: dict[str, Any] = {}
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'samples': {}})
+            if metric['kind'] == GAUGE and not alive:
+                continue
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = _copy(value)
+                elif isinstance(value, list):
+                    target['samples'][key] = [left + right for left, right in zip(current, value)]
+                else:
+                    target['samples'][key] = current + value
+    for metric in merged.values():
+        metric['samples'] = [[list(key), value] for key, value in metric['samples'].items()]
+    return merged
+
+
+def collect(registry: Registry = REGISTRY) -> dict[str, Any]:
+    """Metrics of this process, or of every process sharing METRICS_MULTIPROCESS_DIR."""
+    directory = _directory()
+    if not directory:
+        return registry.snapshot()
+    flush(registry)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                snapshots.append((json.load(handle), _alive(path)))
+        except (OSError, ValueError):
+            continue
+    return merge(snapshots)
+
+
+# Text exposition format
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    """Prometheus text format (version 0.0.4) of ``collect()``."""
+    lines: list[str] = []
+    for name, metric in sorted(collect(registry).items()):
+        lines.append(f'# HELP {name} {metric["doc"]}')
+        lines.append(f'# TYPE {name} {metric["kind"]}')
+        for labels, value in sorted(metric['samples'], key=lambda sample: sample[0]):
+            if metric['kind'] != HISTOGRAM:
+                lines.append(f'{name}{_labels(metric["labels"], labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + [float('inf')], value[:-2]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{name}_bucket{_labels(metric["labels"], labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric["labels"], labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(metric["labels"], labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+_flusher: Optional[threading.Thread] = None
+
+
+def _flush_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def start_flusher() -> None:
+    """Flush this process' snapshot periodically (and at exit) when METRICS_MULTIPROCESS_DIR is set."""
+    global _flusher
+    if not _directory() or (_flusher is not None and _flusher.is_alive()):
+        return
+    _flusher = threading.Thread(
+        target=_flush_loop, args=(settings.METRICS_FLUSH_INTERVAL,), name='metrics-flush', daemon=True
+    )
+    _flusher.start()
+
+
+def _after_fork() -> None:
+    # Workers forked from a preloaded master start empty, with their own file and thread
+    global _flusher
+    _flusher = None
+    for metric in list(REGISTRY._metrics.values()):
+        metric._lock = threading.Lock()
+        metric._values.clear()
+    start_flusher()
+
+
+def _flush_at_exit() -> None:
+    if settings.configured and _directory():
+        flush()
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
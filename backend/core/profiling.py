@@ -0,0 +1,269 @@
+"""
+On-demand profiling of a single request or WebSocket connection.
+
+A debugging tool, off unless PROFILER_ENABLED is set. An admin
+(``role == 'admin'``) adds ``X-Profile: <format>`` or ``?_profile=<format>``
+to a request; ProfilingMiddleware runs the view under a profiler and
+answers with the profile instead of the normal body (the original status
+goes in ``X-Profiled-Status``). A copy is written to
+PROFILER_OUTPUT_DIR and its file name returned in ``X-Profile-File``.
+Formats:
+
+- ``collapsed`` (default, ``1``): a sampling profiler reading the stack of
+  the request thread every PROFILER_INTERVAL seconds; one
+  ``frame;frame;frame count`` line per stack, the input of flamegraph.pl,
+  inferno or speedscope.
+- ``cprofile``: cProfile statistics sorted by cumulative time.
+- ``pyinstrument``: pyinstrument's HTML report, when it is installed.
+
+WebSocket consumers with ProfilingConsumerMixin do the same for an admin
+connecting with ``?_profile=collapsed``: the event handlers of that
+connection are sampled until it closes, and the profile is written to
+PROFILER_OUTPUT_DIR. The event loop is shared, so samples also include
+other tasks that ran while a handler was awaiting.
+
+Requests without the header or parameter only pay for its lookup; the JWT
+of the caller is decoded only when profiling is requested, and requests
+from anyone but an admin are served normally.
+"""
+from __future__ import annotations
+
+import cProfile
+import importlib.util
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER: str = 'X-Profile'
+PROFILE_PARAM: str = '_profile'
+
+COLLAPSED: str = 'collapsed'
+CPROFILE: str = 'cprofile'
+PYINSTRUMENT: str = 'pyinstrument'
+
+FORMATS: tuple[str, ...] = (COLLAPSED, CPROFILE, PYINSTRUMENT)
+
+# Frames kept per sampled stack (deep recursion would bloat the output)
+MAX_DEPTH: int = 128
+
+
+class ProfilerError(Exception):
+    """Raised when a profile cannot be taken (unknown format, profiler busy or missing)."""
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', os.path.basename(code.co_filename))
+    return f'{module}:{code.co_name}'
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled from a background thread while ``active``."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.active = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profile in one of FORMATS, covering the ``with profile:`` blocks run so far."""
+
+    def __init__(self, fmt: str, thread_id: Optional[int] = None):
+        if fmt not in FORMATS:
+            raise ProfilerError(f"Unknown profile format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        if fmt == PYINSTRUMENT and importlib.util.find_spec('pyinstrument') is None:
+            raise ProfilerError('pyinstrument is not installed')
+        self.format = fmt
+        self.elapsed = 0.0
+        if fmt == COLLAPSED:
+            self._profiler: Any = StackSampler(thread_id or threading.get_ident(), settings.PROFILER_INTERVAL).start()
+        elif fmt == CPROFILE:
+            self._profiler = cProfile.Profile()
+        else:
+            from pyinstrument import Profiler
+            self._profiler = Profiler(interval=settings.PROFILER_INTERVAL, async_mode='disabled')
+
+    def __enter__(self) -> 'Profile':
+        try:
+            if self.format == COLLAPSED:
+                self._profiler.active += 1
+            elif self.format == CPROFILE:
+                self._profiler.enable()
+            else:
+                self._profiler.start()
+        except (ValueError, RuntimeError) as exc:
+            # Another profiler already holds the interpreter hooks
+            self.close()
+            raise ProfilerError(f'Profiler busy: {exc}') from exc
+        self._entered = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.elapsed += time.perf_counter() - self._entered
+        if self.format == COLLAPSED:
+            self._profiler.active -= 1
+        elif self.format == CPROFILE:
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        return False
+
+    def close(self) -> None:
+        if self.format == COLLAPSED:
+            self._profiler.stop()
+
+    def render(self) -> tuple[str, str]:
+        """Return (content type, report)."""
+        self.close()
+        if self.format == COLLAPSED:
+            header = f'# {self._profiler.samples} samples every {settings.PROFILER_INTERVAL * 1000:g} ms over {self.elapsed * 1000:.1f} ms\n'
+            return 'text/plain; charset=utf-8', header + self._profiler.collapsed()
+        if self.format == CPROFILE:
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats('cumulative').print_stats(settings.PROFILER_CPROFILE_LINES)
+            return 'text/plain; charset=utf-8', output.getvalue()
+        return 'text/html; charset=utf-8', self._profiler.output_html()
+
+    def save(self, label: str, report: str) -> Optional[str]:
+        """Write the report to PROFILER_OUTPUT_DIR; return the file name."""
+        directory = settings.PROFILER_OUTPUT_DIR
+        if not directory:
+            return None
+        extension = 'html' if self.format == PYINSTRUMENT else 'txt'
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{label}-{self.format}-{uuid.uuid4().hex[:8]}.{extension}"
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as handle:
+            handle.write(report)
+        return name
+
+
+def is_admin(user) -> bool:
+    return bool(user is not None and user.is_authenticated and getattr(user, 'role', None) == get_user_model().Role.ADMIN)
+
+
+def _request_user(request):
+    """Session user, or the user of the request's JWT access token."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return authenticated[0] if authenticated else None
+
+
+def _label(path: str) -> str:
+    return ''.join(char if char.isalnum() else '_' for char in path.strip('/'))[:60] or 'root'
+
+
+class ProfilingMiddleware:
+    """Profile a request of an admin asking for it with ``X-Profile`` or ``?_profile=``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        if not requested or not settings.PROFILER_ENABLED or not is_admin(_request_user(request)):
+            return self.get_response(request)
+
+        try:
+            profile = Profile(COLLAPSED if requested == '1' else requested)
+            with profile:
+                response = self.get_response(request)
+        except ProfilerError as exc:
+            response = self.get_response(request)
+            response['X-Profile-Error'] = str(exc)
+            return response
+
+        content_type, report = profile.render()
+        profiled = HttpResponse(report, content_type=content_type)
+        profiled['X-Profiled-Status'] = str(response.status_code)
+        name = profile.save(f'{request.method}-{_label(request.path)}', report)
+        if name:
+            profiled['X-Profile-File'] = name
+        logger.info(f"Profiled {request.method} {request.path} ({profile.format}, {profile.elapsed * 1000:.1f} ms): {name}")
+        return profiled
+
+
+class ProfilingConsumerMixin:
+    """Sample the event handlers of an admin's connection opened with ``?_profile=collapsed``."""
+
+    _profile: Optional[Profile] = None
+
+    async def websocket_connect(self, message):
+        query = dict(parse_qsl(self.scope.get('query_string', b'').decode()))
+        requested = query.get(PROFILE_PARAM)
+        if requested and settings.PROFILER_ENABLED and is_admin(self.scope.get('user')):
+            try:
+                # Sampling is the only format that tolerates other connections interleaving
+                self._profile = Profile(COLLAPSED if requested in ('1', COLLAPSED) else requested)
+                if self._profile.format != COLLAPSED:
+                    self._profile.close()
+                    self._profile = None
+                    logger.warning(f"Only '{COLLAPSED}' profiles are supported on WebSocket connections")
+            except ProfilerError as exc:
+                logger.warning(f"WebSocket profile not started: {exc}")
+        return await super().websocket_connect(message)
+
+    async def dispatch(self, message):
+        if self._profile is None:
+            return await super().dispatch(message)
+        with self._profile:
+            return await super().dispatch(message)
+
+    async def websocket_disconnect(self, message):
+        try:
+            await super().websocket_disconnect(message)
+        finally:
+            profile, self._profile = self._profile, None
+            if profile is not None:
+                _, report = profile.render()
+                name = profile.save(f'ws-{_label(self.scope.get("path", ""))}', report)
+                logger.info(f"Profiled WebSocket {self.scope.get('path')} ({profile.elapsed * 1000:.1f} ms in handlers): {name}")
@@ -0,0 +1,104 @@
+"""
+Redis channel layers sharded with consistent hashing.
+
+channels_redis already spreads groups and channels over several ``hosts``,
+but maps them by splitting a CRC range evenly between the hosts, so adding
+or removing a shard moves most groups (and live consumers' channels) to
+another server. The layers below use a hash ring with virtual nodes keyed
+by host address instead: each ``device_<public_id>`` group and channel name
+always lands on the same shard, load is even, and changing the shard count
+only moves about ``1/n`` of the keys.
+
+- ShardedRedisChannelLayer: drop-in for RedisChannelLayer (lists + groups
+  stored in Redis, capacity/expiry honoured).
+- ShardedRedisPubSubChannelLayer: drop-in for RedisPubSubChannelLayer, for
+  pure broadcast traffic where missed messages need not be queued.
+
+Every process must use the same backend and host list, in any order.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from bisect import bisect
+from functools import lru_cache
+from typing import Any, Union
+
+from channels_redis.core import RedisChannelLayer
+from channels_redis.pubsub import RedisPubSubChannelLayer, RedisPubSubLoopLayer
+from channels_redis.utils import _wrap_close, decode_hosts
+
+# Points per host on the ring; more points, more even distribution
+RING_REPLICAS: int = 160
+
+
+def _hash(value: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+def host_label(host: dict[str, Any]) -> str:
+    """Return a stable identity of a decoded channels_redis host entry."""
+    if 'address' in host:
+        return str(host['address'])
+    if 'master_name' in host:
+        return f"sentinel:{host['master_name']}"
+    return f"{host.get('host', 'localhost')}:{host.get('port', 6379)}/{host.get('db', 0)}"
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to node indexes."""
+
+    def __init__(self, labels: list[str], replicas: int = RING_REPLICAS):
+        if not labels:
+            raise ValueError('A hash ring needs at least one node')
+        points = sorted(
+            (_hash(f'{label}#{replica}'.encode()), index)
+            for index, label in enumerate(labels)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [index for _, index in points]
+        self.size = len(labels)
+        self.node = lru_cache(maxsize=65536)(self._node)
+
+    def _node(self, value: Union[str, bytes]) -> int:
+        if self.size == 1:
+            return 0
+        if isinstance(value, str):
+            value = value.encode('utf8')
+        position = bisect(self._hashes, _hash(value))
+        return self._nodes[position % len(self._nodes)]
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """RedisChannelLayer placing groups and channels on shards with a hash ring."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = HashRing([host_label(host) for host in self.hosts])
+
+    def consistent_hash(self, value) -> int:
+        return self.ring.node(value)
+
+
+class _ShardedPubSubLoopLayer(RedisPubSubLoopLayer):
+    def __init__(self, hosts=None, *args, **kwargs):
+        super().__init__(hosts, *args, **kwargs)
+        self.ring = HashRing([host_label(host) for host in decode_hosts(hosts)])
+
+    def _get_shard(self, channel_or_group_name):
+        return self._shards[self.ring.node(channel_or_group_name)]
+
+
+class ShardedRedisPubSubChannelLayer(RedisPubSubChannelLayer):
+    """RedisPubSubChannelLayer placing groups and channels on shards with a hash ring."""
+
+    def _get_layer(self):
+        loop = asyncio.get_running_loop()
+        try:
+            layer = self._layers[loop]
+        except KeyError:
+            layer = _ShardedPubSubLoopLayer(*self._args, **self._kwargs, channel_layer=self)
+            self._layers[loop] = layer
+            _wrap_close(self, loop)
+        return layer
@@ -0,0 +1,231 @@
+"""
+Read-replica routing.
+
+With DB_REPLICA_HOSTS set, settings add one ``replica_<n>`` database per
+host (DATABASE_REPLICAS) and ReplicaRouter sends reads there, but only
+inside a ``read_from_replica()`` block; everything else, and every write,
+uses ``default``:
+
+- HTTP: ReplicaRoutingMiddleware opens the block for GET/HEAD/OPTIONS
+  requests under DB_REPLICA_PATH_PREFIXES (the read-only API views:
+  lists, details, aggregated data, metrics).
+- WebSocket: snapshot rebuilds (devices.services.snapshot) open it with
+  the stricter DB_REPLICA_SNAPSHOT_MAX_LAG.
+
+Reads stay on the primary, whatever the block says, when:
+
+- no replica lags less than the block's maximum: each process measures
+  the lag of every replica at most every DB_REPLICA_LAG_CHECK_INTERVAL
+  seconds (``pg_last_xact_replay_timestamp()``), and an unreachable
+  replica counts as infinitely late;
+- the request wrote, or runs inside a transaction on ``default``;
+- the caller changed data recently: every mutating request pins its user
+  (JWT ``user_id``, or session) to the primary for
+  DB_READ_YOUR_WRITES_SECONDS, so a client reloading a list after a POST
+  sees its own write. ``X-Read-Primary: 1`` forces the primary for one
+  request; ``use_primary()`` does the same in code.
+
+Replica lag per alias is exported as ``db_replica_lag_seconds``.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.http import HttpRequest
+
+from core.metrics import register_callback
+
+PRIMARY: str = 'default'
+PRIMARY_HEADER: str = 'X-Read-Primary'
+PIN_KEY: str = 'db_primary_pin:{}'
+SAFE_METHODS: tuple[str, ...] = ('GET', 'HEAD', 'OPTIONS')
+
+LAG_SQL: str = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class _Reads:
+    """Replica reads allowed in the current context, up to ``max_lag`` seconds behind."""
+
+    def __init__(self, max_lag: float):
+        self.max_lag = max_lag
+        self.wrote = False
+
+
+_reads: ContextVar[Optional[_Reads]] = ContextVar('replica_reads', default=None)
+
+# alias -> (lag in seconds or None when unreachable, time.monotonic() of the check)
+_lags: dict[str, tuple[Optional[float], float]] = {}
+_lag_lock = threading.Lock()
+
+
+def _measure_lag(alias: str) -> Optional[float]:
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        # Reconnect on the next check
+        connection.close()
+        return None
+
+
+def replica_lag(alias: str) -> Optional[float]:
+    """
+    Lag of a replica in seconds (None: unreachable or not measured yet).
+
+    Refreshed when older than DB_REPLICA_LAG_CHECK_INTERVAL; while one
+    thread measures, the others use the previous value.
+    """
+    lag, checked = _lags.get(alias, (None, float('-inf')))
+    if time.monotonic() - checked < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+    if not _lag_lock.acquire(blocking=False):
+        return lag
+    try:
+        lag = _measure_lag(alias)
+        _lags[alias] = (lag, time.monotonic())
+        return lag
+    finally:
+        _lag_lock.release()
+
+
+def choose_replica(max_lag: float) -> Optional[str]:
+    """A random replica lagging at most ``max_lag`` seconds, or None."""
+    candidates = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            candidates.append(alias)
+    return random.choice(candidates) if candidates else None
+
+
+class read_from_replica(ContextDecorator):
+    """Allow the reads of a block (or of each call of a function) to go to a replica."""
+
+    def __init__(self, max_lag: Optional[float] = None):
+        self.max_lag = max_lag
+
+    def _recreate_cm(self):
+        # One context per call, so a decorated function may run concurrently
+        return read_from_replica(self.max_lag)
+
+    def __enter__(self):
+        max_lag = settings.DB_REPLICA_MAX_LAG if self.max_lag is None else self.max_lag
+        self._token = _reads.set(_Reads(max_lag) if settings.DATABASE_REPLICAS else None)
+        return self
+
+    def __exit__(self, *exc):
+        _reads.reset(self._token)
+        return False
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Read from the primary inside the block, even within ``read_from_replica()``."""
+    token = _reads.set(None)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+class ReplicaRouter:
+    """Database router sending reads of ``read_from_replica()`` blocks to a replica."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        reads = _reads.get()
+        if reads is None or reads.wrote:
+            return PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from where their instance came from
+            return instance._state.db
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return choose_replica(reads.max_lag) or PRIMARY
+
+    def db_for_write(self, model, **hints) -> str:
+        reads = _reads.get()
+        if reads is not None:
+            # Later reads of this request must see the write
+            reads.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> Optional[bool]:
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+def request_identity(request: HttpRequest) -> Optional[str]:
+    """User id of the request's JWT access token, or its session key; no database access."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        from rest_framework_simplejwt.exceptions import TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+        try:
+            return f'user:{AccessToken(header[len("Bearer "):])[api_settings.USER_ID_CLAIM]}'
+        except (TokenError, KeyError):
+            return None
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f'session:{session_key}' if session_key else None
+
+
+def pin_primary(identity: str) -> None:
+    """Send the reads of ``identity`` to the primary for DB_READ_YOUR_WRITES_SECONDS."""
+    cache.set(PIN_KEY.format(identity), 1, timeout=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+def is_pinned(identity: Optional[str]) -> bool:
+    return identity is not None and cache.get(PIN_KEY.format(identity)) is not None
+
+
+class ReplicaRoutingMiddleware:
+    """Read-only API requests read from a replica; mutating requests pin their caller to the primary."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        if not settings.DATABASE_REPLICAS or not request.path_info.startswith(tuple(settings.DB_REPLICA_PATH_PREFIXES)):
+            return self.get_response(request)
+
+        identity = request_identity(request)
+        if request.method not in SAFE_METHODS:
+            try:
+                return self.get_response(request)
+            finally:
+                if identity is not None:
+                    pin_primary(identity)
+
+        if request.headers.get(PRIMARY_HEADER) == '1' or is_pinned(identity):
+            return self.get_response(request)
+        with read_from_replica():
+            return self.get_response(request)
+
+
+def _lag_samples() -> dict[str, float]:
+    return {alias: float('inf') if lag is None else lag for alias, (lag, _) in _lags.items()}
+
+
+register_callback('db_replica_lag_seconds', 'Replication lag of each read replica (+Inf: unreachable)',
+                  _lag_samples, labelnames=['alias'])
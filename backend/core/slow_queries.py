@@ -0,0 +1,181 @@
+"""
+Slow-query capture with sampled execution plans.
+
+Every database connection gets an execute wrapper timing its statements.
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged (WARNING on the
+``core.slow_queries`` logger) and kept in a per-process ring buffer of
+SLOW_QUERY_BUFFER_SIZE entries holding:
+
+- the SQL and its parameters (long values truncated);
+- the duration, database alias and the project code line that issued it
+  (``origin``), which points at the ORM call behind the statement;
+- for a SLOW_QUERY_EXPLAIN_SAMPLE_RATE fraction of slow SELECTs, the
+  plan: ``EXPLAIN`` on PostgreSQL (estimates only), or, with the opt-in
+  SLOW_QUERY_EXPLAIN_ANALYZE, ``EXPLAIN (ANALYZE, BUFFERS)``, which runs
+  the statement a second time; ``EXPLAIN QUERY PLAN`` on SQLite.
+
+The buffer is served to admins by ``/api/diagnostics/slow-queries/`` (see
+core.views). Each worker keeps its own buffer; the log lines cover all of
+them. SLOW_QUERY_THRESHOLD_MS = 0 disables the capture.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Limits of what is kept from each statement
+MAX_SQL_LENGTH: int = 10000
+MAX_PARAMS: int = 50
+MAX_PARAM_LENGTH: int = 200
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_buffer: deque = deque(maxlen=100)
+
+# Set while this module runs its own EXPLAIN, so the plan query is not captured
+_explaining: ContextVar[bool] = ContextVar('slow_query_explaining', default=False)
+
+_PROJECT_ROOT: str = str(settings.BASE_DIR) + os.sep
+_THIS_FILE: str = os.path.abspath(__file__)
+
+
+def _param(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '…'
+
+
+def _params(params: Any) -> Any:
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _param(value) for key, value in itertools.islice(params.items(), MAX_PARAMS)}
+    return [_param(value) for value in itertools.islice(params, MAX_PARAMS)]
+
+
+def _origin() -> Optional[str]:
+    """Innermost frame of project code (outside this module) on the current stack."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE and os.sep + 'site-packages' + os.sep not in filename:
+            return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _is_select(sql: str) -> bool:
+    return sql.lstrip().lower().startswith(('select', 'with'))
+
+
+def explain(connection, sql: str, params: Any) -> list[str]:
+    """Plan of a statement with its parameters, inside a savepoint so a failure never aborts the transaction."""
+    options = {}
+    if connection.vendor == 'postgresql' and settings.SLOW_QUERY_EXPLAIN_ANALYZE:
+        options = {'analyze': True, 'buffers': True}
+    prefix = connection.ops.explain_query_prefix(**options)
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        _explaining.reset(token)
+
+
+def record(connection, sql: str, params: Any, many: bool, duration: float) -> dict[str, Any]:
+    """Add a slow statement to the buffer (with its plan when sampled) and log it."""
+    entry: dict[str, Any] = {
+        'id': next(_ids),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'alias': connection.alias,
+        'vendor': connection.vendor,
+        'sql': sql[:MAX_SQL_LENGTH],
+        'params': None if many else _params(params),
+        'many': many,
+        'origin': _origin(),
+        'plan': None,
+    }
+    if not many and _is_select(sql) and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        try:
+            entry['plan'] = explain(connection, sql, params)
+        except DatabaseError as exc:
+            entry['plan_error'] = str(exc)
+
+    global _buffer
+    with _lock:
+        if _buffer.maxlen != settings.SLOW_QUERY_BUFFER_SIZE:
+            _buffer = deque(_buffer, maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        _buffer.append(entry)
+    logger.warning(
+        f"Slow query ({entry['duration_ms']} ms, {entry['origin'] or 'unknown origin'}): {entry['sql'][:500]}",
+        extra={'slow_query': entry},
+    )
+    return entry
+
+
+def _execute_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold <= 0 or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= threshold:
+        try:
+            record(context['connection'], sql, params, many, duration)
+        except Exception:
+            logger.exception('Could not record a slow query')
+    return result
+
+
+def install(connection) -> None:
+    """Add the slow-query wrapper to a connection (idempotent)."""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _install_on_connect(sender, connection, **kwargs) -> None:
+    install(connection)
+
+
+connection_created.connect(_install_on_connect, dispatch_uid='core.slow_queries')
+
+
+def install_all() -> None:
+    """Also cover the connections opened before this module was imported."""
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+def entries() -> list[dict[str, Any]]:
+    """Captured statements of this process, newest first."""
+    with _lock:
+        return list(reversed(_buffer))
+
+
+def clear() -> None:
+    with _lock:
+        _buffer.clear()
+
+
+def process_label() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
@@ -0,0 +1,49 @@
+"""
+Test helpers asserting query budgets.
+
+Unlike ``assertNumQueries``, a budget is an upper bound, so a test does not
+break when a query is optimised away, and duplicated statements (the same
+SQL run several times in one request, i.e. an N+1 or a queryset evaluated
+twice) are reported separately:
+
+    class DeviceQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+        def test_list(self):
+            with self.assertQueryBudget(4):
+                self.client.get('/api/devices/')
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from core.instrumentation import QueryRecorder, start, stop
+
+
+@contextmanager
+def query_budget(max_queries: int, max_duplicates: int = 0) -> Iterator[QueryRecorder]:
+    """
+    Fail with AssertionError when the block runs more than ``max_queries``
+    queries or more than ``max_duplicates`` repeated statements.
+    """
+    recorder, token = start(slowest=0)
+    try:
+        yield recorder
+    finally:
+        stop(token)
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries executed, budget is {max_queries}')
+    duplicated = sum(times - 1 for times in recorder.duplicates.values())
+    if duplicated > max_duplicates:
+        problems.append(f'{duplicated} duplicated queries, budget is {max_duplicates}')
+    if problems:
+        lines = [f'{times}x {sql}' for sql, times in recorder.statements.items()]
+        raise AssertionError('; '.join(problems) + '\n' + '\n'.join(lines))
+
+
+class QueryBudgetMixin:
+    """Adds ``assertQueryBudget`` to a TestCase."""
+
+    def assertQueryBudget(self, max_queries: int, max_duplicates: int = 0):
+        return query_budget(max_queries, max_duplicates)
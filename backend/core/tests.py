@@ -0,0 +1,594 @@
+"""
+Tests for core app.
+
+Cross-cutting infrastructure: channel layers (in-process and sharded Redis),
+SQL instrumentation, the metrics registry and on-demand profiling.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.middleware import JWTAuthMiddleware
+from accounts.serializers import CustomTokenObtainPairSerializer
+from devices.models import Device
+from devices.routing import websocket_urlpatterns
+from devices.services.realtime import publish_measurement
+
+from . import health, metrics, replicas, slow_queries
+from .instrumentation import QueryRecorder
+from .layers import DROP_NEWEST, BoundedInMemoryChannelLayer
+from .redis_layers import HashRing, ShardedRedisChannelLayer, ShardedRedisPubSubChannelLayer
+
+BOUNDED_LAYER = {
+    'default': {
+        'BACKEND': 'core.layers.BoundedInMemoryChannelLayer',
+        'CONFIG': {'capacity': 100, 'expiry': 10},
+    },
+}
+
+
+class BoundedInMemoryChannelLayerTestCase(TestCase):
+    """Test cases for the in-process channel layer."""
+
+    def test_group_send_reaches_every_member(self):
+        async_to_sync(self._check_group_send)()
+
+    async def _check_group_send(self):
+        layer = BoundedInMemoryChannelLayer()
+        channels = [await layer.new_channel() for _ in range(3)]
+        for channel in channels:
+            await layer.group_add('device_1', channel)
+        await layer.group_discard('device_1', channels[2])
+
+        await layer.group_send('device_1', {'type': 'measurement.update', 'value': 1})
+        for channel in channels[:2]:
+            self.assertEqual((await layer.receive(channel))['value'], 1)
+        self.assertEqual(layer.metrics()['queued'], 0)
+        self.assertEqual(layer.metrics()['sent'], 2)
+
+    def test_receive_waits_for_a_message(self):
+        async_to_sync(self._check_waiting_receive)()
+
+    async def _check_waiting_receive(self):
+        layer = BoundedInMemoryChannelLayer()
+        channel = await layer.new_channel()
+        receiver = asyncio.create_task(layer.receive(channel))
+        await asyncio.sleep(0)
+        await layer.send(channel, {'type': 'hello'})
+        self.assertEqual((await asyncio.wait_for(receiver, 1))['type'], 'hello')
+
+        # A cancelled receive leaves no stale waiter behind
+        cancelled = asyncio.create_task(layer.receive(channel))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await layer.send(channel, {'type': 'again'})
+        self.assertEqual((await layer.receive(channel))['type'], 'again')
+
+    def test_drop_oldest_keeps_the_newest_messages(self):
+        async_to_sync(self._check_drop_oldest)()
+
+    async def _check_drop_oldest(self):
+        layer = BoundedInMemoryChannelLayer(capacity=3)
+        channel = await layer.new_channel()
+        await layer.group_add('device_1', channel)
+        for value in range(5):
+            await layer.group_send('device_1', {'type': 'update', 'value': value})
+        self.assertEqual([(await layer.receive(channel))['value'] for _ in range(3)], [2, 3, 4])
+        self.assertEqual(layer.metrics()['dropped_overflow'], 2)
+
+    def test_drop_newest_raises_channel_full_on_send(self):
+        async_to_sync(self._check_drop_newest)()
+
+    async def _check_drop_newest(self):
+        layer = BoundedInMemoryChannelLayer(capacity=1, overflow=DROP_NEWEST)
+        channel = await layer.new_channel()
+        await layer.send(channel, {'type': 'first'})
+        with self.assertRaises(ChannelFull):
+            await layer.send(channel, {'type': 'second'})
+        self.assertEqual((await layer.receive(channel))['type'], 'first')
+
+    def test_expired_messages_and_idle_channels_are_dropped(self):
+        async_to_sync(self._check_expiry)()
+
+    async def _check_expiry(self):
+        clock = [1000.0]
+        with mock.patch('core.layers.time.monotonic', side_effect=lambda: clock[0]):
+            layer = BoundedInMemoryChannelLayer(expiry=10)
+            reader, idle = await layer.new_channel(), await layer.new_channel()
+            await layer.group_add('device_1', reader)
+            await layer.group_add('device_1', idle)
+            await layer.group_send('device_1', {'type': 'old'})
+            self.assertEqual((await layer.receive(reader))['type'], 'old')
+
+            clock[0] += 5
+            await layer.send(reader, {'type': 'stale'})
+            clock[0] += 11
+            # The reader skips its expired message and waits; the idle channel is swept
+            receiver = asyncio.create_task(layer.receive(reader))
+            await asyncio.sleep(0)
+            await layer.group_send('device_1', {'type': 'fresh'})
+            self.assertEqual((await asyncio.wait_for(receiver, 1))['type'], 'fresh')
+
+            metrics = layer.metrics()
+            self.assertEqual(metrics['channels_expired'], 1)
+            self.assertEqual(metrics['dropped_expired'], 2)
+            self.assertEqual(layer._groups['device_1'].keys(), {reader})
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            BoundedInMemoryChannelLayer(overflow='drop_all')
+
+    @override_settings(CHANNEL_LAYERS=BOUNDED_LAYER)
+    def test_websocket_updates_through_bounded_layer(self):
+        cache.clear()
+        self.assertIsInstance(get_channel_layer(), BoundedInMemoryChannelLayer)
+        device = Device.objects.create(name='Single Node Sensor', status=Device.Status.ACTIVE)
+        async_to_sync(self._check_websocket)(device)
+
+    async def _check_websocket(self, device):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/devices/')
+        self.assertTrue((await communicator.connect())[0])
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'subscribe', 'devices': [str(device.public_id)]})
+        await communicator.receive_json_from()
+
+        await database_sync_to_async(publish_measurement)(
+            device.public_id, {'metric': 'temperature', 'value': '21.0', 'timestamp': '2024-01-01T00:00:00Z'}
+        )
+        update = await communicator.receive_json_from()
+        self.assertEqual(update['measurement']['value'], '21.0')
+        await communicator.disconnect()
+
+
+class ShardedRedisChannelLayerTestCase(TestCase):
+    """Test cases for consistent hashing of Redis shards (no Redis connection needed)."""
+
+    HOSTS = ['redis://redis-0:6379/0', 'redis://redis-1:6379/0', 'redis://redis-2:6379/0']
+    KEYS = [f'device_{index:08d}' for index in range(3000)]
+
+    def test_ring_is_deterministic_and_balanced(self):
+        ring = HashRing(self.HOSTS)
+        placement = [ring.node(key) for key in self.KEYS]
+        self.assertEqual(placement, [HashRing(list(self.HOSTS)).node(key) for key in self.KEYS])
+        for shard in range(3):
+            self.assertGreater(placement.count(shard), len(self.KEYS) / 3 * 0.8)
+
+    def test_adding_a_shard_moves_about_one_key_in_n(self):
+        before = HashRing(self.HOSTS)
+        after = HashRing(self.HOSTS + ['redis://redis-3:6379/0'])
+        moved = [key for key in self.KEYS if before.node(key) != after.node(key)]
+        self.assertLess(len(moved), len(self.KEYS) * 0.35)
+        # Keys only ever move to the new shard
+        self.assertEqual({after.node(key) for key in moved}, {3})
+
+    def test_empty_ring(self):
+        with self.assertRaises(ValueError):
+            HashRing([])
+
+    def test_layer_places_groups_and_channels_on_the_ring(self):
+        layer = ShardedRedisChannelLayer(hosts=self.HOSTS)
+        self.assertEqual(layer.ring.size, 3)
+        for key in self.KEYS[:50]:
+            self.assertEqual(layer.consistent_hash(key), layer.ring.node(key))
+        self.assertEqual(ShardedRedisChannelLayer(hosts=self.HOSTS[:1]).consistent_hash('device_1'), 0)
+
+    def test_pubsub_layer_uses_the_ring(self):
+        async_to_sync(self._check_pubsub)()
+
+    async def _check_pubsub(self):
+        layer = ShardedRedisPubSubChannelLayer(hosts=self.HOSTS)
+        loop_layer = layer._get_layer()
+        for key in self.KEYS[:50]:
+            self.assertIs(loop_layer._get_shard(key), loop_layer._shards[loop_layer.ring.node(key)])
+
+
+class QueryInstrumentationTestCase(TestCase):
+    """Test cases for the per-request SQL instrumentation."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='timing', email='timing@example.com', password='testpass123', role='admin')
+        Device.objects.create(name='Timed Sensor')
+        self.token = str(RefreshToken.for_user(user).access_token)
+
+    def _get(self, path='/api/devices/'):
+        # A new client loads the middleware with the current settings
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return client.get(path)
+
+    def test_disabled_by_default(self):
+        with self.assertNoLogs('core.instrumentation'):
+            response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(QUERY_INSTRUMENTATION=True, QUERY_INSTRUMENTATION_SLOWEST=2)
+    def test_server_timing_header_and_log(self):
+        with self.assertLogs('core.instrumentation', level='INFO') as logs:
+            response = self._get()
+        payload = logs.records[0].query_stats
+        self.assertEqual(payload['type'], 'http')
+        self.assertEqual((payload['method'], payload['path'], payload['status']), ('GET', '/api/devices/', 200))
+        self.assertEqual(payload['queries'], 3)
+        self.assertEqual(len(payload['slowest']), 2)
+        self.assertIn('SELECT', payload['slowest'][0]['sql'])
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+$')
+
+    def test_recorder_counts_duplicates_and_keeps_slowest(self):
+        recorder = QueryRecorder(slowest=2)
+        for sql, duration in (('SELECT 1', 0.001), ('SELECT 2', 0.005), ('SELECT 1', 0.003), ('SELECT 3', 0.002)):
+            recorder.add(sql, duration)
+        stats = recorder.as_dict()
+        self.assertEqual(stats['queries'], 4)
+        self.assertEqual(stats['db_ms'], 11.0)
+        self.assertEqual(stats['duplicated_queries'], 1)
+        self.assertEqual([entry['ms'] for entry in stats['slowest']], [5.0, 3.0])
+
+
+class MetricsRegistryTestCase(TestCase):
+    """Test cases for the metrics registry and its Prometheus exposition."""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.requests = metrics.Counter('requests_total', 'Requests', ['method'], registry=self.registry)
+        self.open = metrics.Gauge('open', 'Open things', registry=self.registry)
+        self.latency = metrics.Histogram('latency_seconds', 'Latency', buckets=(0.1, 1), registry=self.registry)
+
+    def test_render_text_format(self):
+        self.requests.inc(method='GET')
+        self.requests.inc(2, method='POST')
+        self.open.set(3)
+        self.open.dec()
+        for value in (0.05, 0.5, 5):
+            self.latency.observe(value)
+        text = metrics.render(self.registry)
+        self.assertIn('# TYPE fronthub_requests_total counter\n', text)
+        self.assertIn('fronthub_requests_total{method="GET"} 1\n', text)
+        self.assertIn('fronthub_requests_total{method="POST"} 2\n', text)
+        self.assertIn('fronthub_open 2\n', text)
+        self.assertIn('fronthub_latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('fronthub_latency_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('fronthub_latency_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn('fronthub_latency_seconds_sum 5.55\n', text)
+        self.assertIn('fronthub_latency_seconds_count 3\n', text)
+
+    def test_labels_are_validated_and_escaped(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(verb='GET')
+        with self.assertRaises(ValueError):
+            self.requests.inc(-1, method='GET')
+        with self.assertRaises(ValueError):
+            metrics.Counter('requests_total', 'Duplicate', registry=self.registry)
+        self.requests.inc(method='a"b\\c')
+        self.assertIn('{method="a\\"b\\\\c"}', metrics.render(self.registry))
+
+    def test_timer_and_callback(self):
+        @self.latency.time()
+        def work():
+            return 'done'
+
+        self.assertEqual(work(), 'done')
+        with self.latency.time():
+            pass
+        self.assertEqual(self.latency.value()[-1], 2)
+        metrics.register_callback('depth', 'Depth', lambda: {'a': 1, 'b': 2}, labelnames=['queue'], registry=self.registry)
+        text = metrics.render(self.registry)
+        self.assertIn('fronthub_depth{queue="a"} 1\n', text)
+        self.assertIn('fronthub_depth{queue="b"} 2\n', text)
+
+    def test_workers_are_merged(self):
+        self.requests.inc(method='GET')
+        self.open.set(1)
+        self.latency.observe(0.5)
+        other = metrics.Registry()
+        metrics.Counter('requests_total', 'Requests', ['method'], registry=other).inc(4, method='GET')
+        metrics.Gauge('open', 'Open things', registry=other).set(10)
+        metrics.Histogram('latency_seconds', 'Latency', buckets=(0.1, 1), registry=other).observe(0.05)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            host = socket.gethostname()
+            # An exited worker on this host and a worker of another host
+            for name in (f'{host}_999999999.json', 'elsewhere_1.json'):
+                with open(os.path.join(directory, name), 'w') as handle:
+                    json.dump(other.snapshot(), handle)
+            text = metrics.render(self.registry)
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{host}_{os.getpid()}.json')))
+        self.assertIn('fronthub_requests_total{method="GET"} 9\n', text)
+        self.assertIn('fronthub_open 11\n', text)
+        self.assertIn('fronthub_latency_seconds_bucket{le="0.1"} 2\n', text)
+        self.assertIn('fronthub_latency_seconds_count 3\n', text)
+
+    @override_settings(DEBUG=True)
+    def test_endpoint(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE fronthub_measurements_ingested_total counter', response.content)
+        self.assertEqual(self.client.post('/metrics').status_code, 405)
+
+    @override_settings(METRICS_BEARER_TOKEN='scrape-secret')
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_BEARER_TOKEN='', DEBUG=False)
+    def test_endpoint_hidden_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class ProfilingTestCase(TestCase):
+    """Test cases for on-demand request and WebSocket profiling."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_user(username='profiler', email='profiler@example.com', password='testpass123', role='admin')
+        self.operator = User.objects.create_user(username='viewer', email='viewer@example.com', password='testpass123', role='operator')
+        self.device = Device.objects.create(name='Profiled Sensor')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        override = override_settings(PROFILER_ENABLED=True, PROFILER_OUTPUT_DIR=self.directory.name, PROFILER_INTERVAL=0.0005)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _token(self, user):
+        # Tokens issued by /api/token/ carry the role claim read by WebSocket connections
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def _get(self, user, path='/api/devices/', **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self._token(user)}')
+        return client.get(path, **headers)
+
+    def test_only_admins_can_profile(self):
+        response = self._get(self.operator, HTTP_X_PROFILE='collapsed')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_collapsed_stacks(self):
+        response = self._get(self.admin, HTTP_X_PROFILE='1')
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertRegex(body.splitlines()[0], r'^# \d+ samples every 0.5 ms over [\d.]+ ms$')
+        for line in body.splitlines()[1:]:
+            self.assertRegex(line, r'^\S+ \d+$')
+        self.assertEqual(os.listdir(self.directory.name), [response['X-Profile-File']])
+
+    def test_cprofile_via_query_parameter(self):
+        response = self._get(self.admin, '/api/devices/?_profile=cprofile')
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        self.assertIn('function calls', response.content.decode())
+        self.assertIn('-cprofile-', response['X-Profile-File'])
+
+    def test_unknown_format_serves_the_request(self):
+        response = self._get(self.admin, HTTP_X_PROFILE='flame')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertIn("Unknown profile format 'flame'", response['X-Profile-Error'])
+
+    @override_settings(PROFILER_ENABLED=False)
+    def test_disabled(self):
+        response = self._get(self.admin, HTTP_X_PROFILE='collapsed')
+        self.assertNotIn('X-Profiled-Status', response)
+
+    async def test_websocket_connection_profile(self):
+        token = await database_sync_to_async(self._token)(self.admin)
+        communicator = WebsocketCommunicator(
+            JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+            f'/ws/device/{self.device.public_id}/?token={token}&_profile=collapsed',
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+        files = os.listdir(self.directory.name)
+        self.assertEqual(len(files), 1)
+        self.assertIn('-ws-ws_device_', files[0])
+        with open(os.path.join(self.directory.name, files[0])) as handle:
+            self.assertTrue(handle.readline().startswith('# '))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1.0)
+class SlowQueryCaptureTestCase(TestCase):
+    """Test cases for slow-query capture and its admin endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Every statement is "slow" here; keep the warnings out of the test output
+        for patch in (mock.patch.object(slow_queries.logger, 'handlers', [logging.NullHandler()]),
+                      mock.patch.object(slow_queries.logger, 'propagate', False)):
+            patch.start()
+            cls.addClassCleanup(patch.stop)
+        super().setUpClass()
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_user(username='dba', email='dba@example.com', password='testpass123', role='admin')
+        self.operator = User.objects.create_user(username='ops', email='ops@example.com', password='testpass123', role='operator')
+        Device.objects.create(name='Boiler Sensor')
+        slow_queries.clear()
+        self.addCleanup(slow_queries.clear)
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}')
+        return client
+
+    def test_captures_statement_params_origin_and_plan(self):
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.assertEqual(len(Device.objects.filter(name__icontains='boiler')), 1)
+        [entry] = slow_queries.entries()
+        self.assertIn('FROM "devices"', entry['sql'])
+        self.assertEqual(entry['params'], ['%boiler%'])
+        self.assertTrue(entry['origin'].startswith('core/tests.py:'))
+        self.assertTrue(entry['plan'])
+        self.assertNotIn('plan_error', entry)
+
+    def test_no_plan_for_writes(self):
+        Device.objects.create(name='Pump Sensor')
+        self.assertTrue(slow_queries.entries())
+        self.assertIsNone(slow_queries.entries()[0]['plan'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_disabled(self):
+        list(Device.objects.all())
+        self.assertEqual(slow_queries.entries(), [])
+
+    @override_settings(SLOW_QUERY_BUFFER_SIZE=2)
+    def test_ring_buffer_keeps_newest(self):
+        for name in ('a', 'b', 'c'):
+            list(Device.objects.filter(name=name))
+        self.assertEqual([entry['params'] for entry in slow_queries.entries()], [['c'], ['b']])
+
+    def test_endpoint_is_admin_only(self):
+        self.assertEqual(self._client(self.operator).get('/api/diagnostics/slow-queries/').status_code, 403)
+        self.assertEqual(APIClient().get('/api/diagnostics/slow-queries/').status_code, 401)
+
+        list(Device.objects.filter(name='Boiler Sensor'))
+        client = self._client(self.admin)
+        response = client.get('/api/diagnostics/slow-queries/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['process'], slow_queries.process_label())
+        self.assertTrue(any(entry['params'] == ['Boiler Sensor'] for entry in response.json()['results']))
+
+        self.assertEqual(client.delete('/api/diagnostics/slow-queries/').status_code, 204)
+        self.assertEqual(slow_queries.entries(), [])
+
+
+class HealthCheckTestCase(TestCase):
+    """Test cases for the /healthz and /readyz probes."""
+
+    def setUp(self):
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_liveness_skips_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    @override_settings(ALLOWED_HOSTS=['example.com'])
+    def test_probes_bypass_authentication_and_host_validation(self):
+        self.assertEqual(self.client.get('/readyz/', HTTP_HOST='10.0.0.7').status_code, 200)
+        self.assertEqual(self.client.head('/healthz', HTTP_HOST='10.0.0.7').status_code, 200)
+
+    def test_readiness_is_cached(self):
+        with self.assertNumQueries(1):
+            first = self.client.get('/readyz').json()
+            second = self.client.get('/readyz').json()
+        self.assertEqual(first['status'], 'ok')
+        self.assertEqual(set(first['checks']), {'database', 'cache', 'channel_layer'})
+        self.assertEqual(first['checked_at'], second['checked_at'])
+
+    @override_settings(READINESS_CACHE_TTL=0)
+    def test_failing_dependency(self):
+        with mock.patch.dict(health.CHECKS, cache=mock.Mock(side_effect=ConnectionError('refused'))):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        body = response.json()
+        self.assertEqual(body['status'], 'unavailable')
+        self.assertEqual(body['checks']['cache'], {'ok': False, 'error': 'ConnectionError: refused'})
+        self.assertTrue(body['checks']['database']['ok'])
+        self.assertEqual(self.client.get('/readyz').status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], DB_REPLICA_MAX_LAG=5.0, DB_REPLICA_SNAPSHOT_MAX_LAG=1.0,
+                   DB_REPLICA_LAG_CHECK_INTERVAL=60.0)
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """Test cases for read-replica routing (no replica database: routing decisions only)."""
+
+    def setUp(self):
+        replicas._lags.clear()
+        self.addCleanup(replicas._lags.clear)
+        cache.clear()
+        patch = mock.patch.object(replicas, '_measure_lag', return_value=0.5)
+        self.measure = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_reads_use_replica_only_inside_block(self):
+        self.assertEqual(router.db_for_read(Device), 'default')
+        with replicas.read_from_replica():
+            self.assertEqual(router.db_for_read(Device), 'replica_1')
+            with replicas.use_primary():
+                self.assertEqual(router.db_for_read(Device), 'default')
+        self.assertEqual(router.db_for_write(Device), 'default')
+
+    def test_lagging_or_unreachable_replica_falls_back_to_primary(self):
+        self.measure.return_value = 7.0
+        with replicas.read_from_replica():
+            self.assertEqual(router.db_for_read(Device), 'default')
+        replicas._lags.clear()
+        self.measure.return_value = None
+        with replicas.read_from_replica():
+            self.assertEqual(router.db_for_read(Device), 'default')
+        self.assertEqual(replicas._lag_samples(), {'replica_1': float('inf')})
+
+    def test_lag_is_measured_once_per_interval(self):
+        with replicas.read_from_replica():
+            router.db_for_read(Device)
+            router.db_for_read(Device)
+        self.measure.assert_called_once_with('replica_1')
+
+    def test_writes_and_transactions_pin_the_primary(self):
+        with replicas.read_from_replica():
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(router.db_for_read(Device), 'default')
+            router.db_for_write(Device)
+            self.assertEqual(router.db_for_read(Device), 'default')
+
+    def test_snapshot_rebuilds_use_the_stricter_lag(self):
+        from devices.services import snapshot
+
+        routed = []
+
+        def build(public_id):
+            routed.append(router.db_for_read(Device))
+            return {'seq': 0, 'latest': {}, 'recent': []}
+
+        with mock.patch.object(snapshot, 'build_snapshot', side_effect=build):
+            snapshot.get_snapshots(['a'])
+            replicas._lags.clear()
+            self.measure.return_value = 2.0
+            snapshot.get_snapshots(['b'])
+        self.assertEqual(routed, ['replica_1', 'default'])
+
+    def test_middleware_routes_safe_requests_and_pins_writers(self):
+        factory = RequestFactory()
+        routed = []
+        middleware = replicas.ReplicaRoutingMiddleware(lambda request: routed.append(router.db_for_read(Device)))
+        user = get_user_model()(id=41, username='reader', role='operator')
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'}
+
+        middleware(factory.get('/api/devices/', **auth))
+        middleware(factory.get('/api/devices/', HTTP_X_READ_PRIMARY='1', **auth))
+        middleware(factory.get('/admin/', **auth))
+        middleware(factory.post('/api/devices/', **auth))
+        middleware(factory.get('/api/devices/', **auth))
+        middleware(factory.get('/api/devices/'))
+        self.assertEqual(routed, ['replica_1', 'default', 'default', 'default', 'default', 'replica_1'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with replicas.read_from_replica():
+            self.assertEqual(router.db_for_read(Device), 'default')
+        self.measure.assert_not_called()
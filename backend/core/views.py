@@ -0,0 +1,60 @@
+"""
+Operational endpoints: plain Django views outside DRF authentication
+(probes, metrics scraping) and admin-only diagnostics behind the API's
+JWT authentication.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdminRole
+from core import slow_queries
+from core.metrics import render
+
+PROMETHEUS_CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Prometheus text exposition of every worker's metrics (see core.metrics).
+
+    Requires METRICS_BEARER_TOKEN; without one the endpoint only exists
+    with DEBUG.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class SlowQueryListView(APIView):
+    """
+    Statements captured by core.slow_queries in the worker answering (newest first).
+
+    GET lists them with their sampled plans; DELETE empties the buffer.
+    """
+
+    permission_classes: list = [IsAdminRole]
+
+    def get(self, request: Request) -> Response:
+        return Response({
+            'process': slow_queries.process_label(),
+            'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+            'explain_sample_rate': settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            'results': slow_queries.entries(),
+        })
+
+    def delete(self, request: Request) -> Response:
+        slow_queries.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Device, Measurement, Alert
+from .models import Category, Device, Measurement, Alert, DeviceMetric, MetricDefinition, MeasurementArchive
 
 
 @admin.register(Category)
@@ -59,14 +59,14 @@ class MeasurementAdmin(admin.ModelAdmin):
     Admin configuration for Measurement model.
     """
     list_display: list[str] = ['id', 'device', 'metric', 'value', 'unit', 'timestamp']
-    list_filter: list[str] = ['metric', 'unit', 'timestamp', 'device']
-    search_fields: list[str] = ['metric', 'device__name', 'device__public_id']
+    list_filter: list[str] = ['definition', 'timestamp', 'device']
+    search_fields: list[str] = ['definition__name', 'device__name', 'device__public_id']
     readonly_fields: list[str] = ['id']
     date_hierarchy: str = 'timestamp'
     
     fieldsets = (
         ('Medição', {
-            'fields': ('device', 'metric', 'value', 'unit', 'timestamp')
+            'fields': ('device', 'definition', 'value', 'timestamp')
         }),
         ('Identificador', {
             'fields': ('id',)
@@ -76,7 +76,17 @@ class MeasurementAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimize queryset with select_related to avoid N+1 queries."""
         qs = super().get_queryset(request)
-        return qs.select_related('device')
+        return qs.select_related('device', 'definition')
+
+
+@admin.register(MetricDefinition)
+class MetricDefinitionAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for MetricDefinition model.
+    """
+    list_display: list[str] = ['id', 'name', 'unit']
+    search_fields: list[str] = ['name', 'unit']
+    readonly_fields: list[str] = ['id']
 
 
 @admin.register(Alert)
@@ -110,3 +120,30 @@ class AlertAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         return qs.select_related('device')
 
+
+
+@admin.register(DeviceMetric)
+class DeviceMetricAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for DeviceMetric model.
+    """
+    list_display: list[str] = ['id', 'device', 'metric', 'unit', 'sample_count', 'first_seen', 'last_seen']
+    list_filter: list[str] = ['metric', 'unit']
+    search_fields: list[str] = ['metric', 'device__name', 'device__public_id']
+    readonly_fields: list[str] = ['id', 'device', 'metric', 'unit', 'sample_count', 'first_seen', 'last_seen']
+    
+    def get_queryset(self, request):
+        """Optimize queryset with select_related to avoid N+1 queries."""
+        qs = super().get_queryset(request)
+        return qs.select_related('device')
+
+
+@admin.register(MeasurementArchive)
+class MeasurementArchiveAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for MeasurementArchive model.
+    """
+    list_display: list[str] = ['id', 'period_start', 'period_end', 'row_count', 'size_bytes', 'path', 'created_at']
+    list_filter: list[str] = ['created_at']
+    search_fields: list[str] = ['path']
+    readonly_fields: list[str] = ['id', 'period_start', 'period_end', 'path', 'row_count', 'size_bytes', 'created_at']
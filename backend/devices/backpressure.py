@@ -0,0 +1,276 @@
+"""
+Per-connection send queues for WebSocket measurement pushes.
+
+Channel layer messages are handled one at a time by a consumer; when its
+``send()`` stalls (a frozen browser tab, a congested mobile link), every
+update for that connection piles up in the channel layer until its
+``capacity`` is reached, growing Redis memory and then losing messages
+silently. SendQueueMixin decouples the two: handlers only append encoded
+frames to a bounded in-process queue, and a writer task drains it to the
+socket. When the queue exceeds WS_SEND_QUEUE_MAX_FRAMES or
+WS_SEND_QUEUE_MAX_BYTES, WS_SEND_QUEUE_POLICY applies:
+
+- ``drop_oldest`` (default): the oldest queued update is discarded.
+- ``coalesce``: a queued update of the same series (subscription and
+  metric) is replaced by the new one; the oldest update is discarded when
+  the queue is still full.
+- ``disconnect``: the connection is closed with RESYNC_CLOSE_CODE; the
+  client reconnects and gets a fresh snapshot.
+
+Only measurement updates go through the queue; control frames (replies,
+snapshots) are sent directly. Dropped, coalesced and evicted counts are
+kept per connection and per process (see ``metrics()``).
+
+The queue only fills if the writer is held back by a slow client:
+
+- Servers whose ASGI ``send()`` waits for the socket to drain (e.g.
+  uvicorn) hold the writer back themselves.
+- Daphne's ``send()`` returns as soon as the frame is handed to Twisted,
+  whose transport buffers without limit. Without a check, frames would
+  pile up there, out of reach of the policy. The writer therefore reads
+  the transport write buffer (``transport_backlog()``) and pauses while
+  it holds more than WS_SEND_QUEUE_TRANSPORT_MAX_BYTES.
+- Other servers that return from ``send()`` immediately are not covered.
+  Their write buffers are not visible to the application.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import weakref
+from collections import deque
+from typing import Any, Hashable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST: str = 'drop_oldest'
+POLICY_COALESCE: str = 'coalesce'
+POLICY_DISCONNECT: str = 'disconnect'
+
+POLICIES: tuple[str, ...] = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_DISCONNECT)
+
+# Close code telling a client it fell too far behind and must resynchronize
+RESYNC_CLOSE_CODE: int = 4008
+
+# Seconds between two reads of the transport write buffer while it is over the limit
+TRANSPORT_POLL_INTERVAL: float = 0.01
+
+_COUNTERS: tuple[str, ...] = ('queued', 'sent', 'dropped', 'coalesced', 'evicted')
+
+# Totals of every connection of this process
+_totals: dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+_queues: weakref.WeakSet = weakref.WeakSet()
+
+
+class _Entry:
+    __slots__ = ('key', 'payload', 'size')
+
+    def __init__(self, key: Optional[Hashable], payload: Any):
+        self.key = key
+        self.payload = payload
+        self.size = len(payload)
+
+
+class SendQueue:
+    """
+    Bounded FIFO of encoded frames with an overflow policy.
+
+    ``key`` identifies the series of a frame for coalescing; frames without
+    a key (batches, flushed buffers) are never coalesced.
+    """
+
+    def __init__(self, max_frames: int, max_bytes: int, policy: str = POLICY_DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown send queue policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries: deque[_Entry] = deque()
+        self._by_key: dict[Hashable, _Entry] = {}
+        self.bytes = 0
+        self.max_depth = 0
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        _queues.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, payload: Any, key: Optional[Hashable] = None) -> bool:
+        """
+        Queue a frame.
+
+        Returns:
+            False when the queue overflowed under the disconnect policy (the
+            frame is not queued), True otherwise.
+        """
+        self._count('queued')
+        if self.policy == POLICY_COALESCE and key is not None:
+            pending = self._by_key.get(key)
+            if pending is not None:
+                self.bytes += len(payload) - pending.size
+                pending.payload, pending.size = payload, len(payload)
+                self._count('coalesced')
+                return True
+
+        entry = _Entry(key, payload)
+        if self._overflows(entry.size):
+            if self.policy == POLICY_DISCONNECT:
+                return False
+            while self._entries and self._overflows(entry.size):
+                self._drop(self._entries.popleft())
+                self._count('dropped')
+
+        self._entries.append(entry)
+        self.bytes += entry.size
+        if key is not None:
+            self._by_key[key] = entry
+        self.max_depth = max(self.max_depth, len(self._entries))
+        return True
+
+    def get(self) -> Any:
+        """Pop the oldest frame (the queue must not be empty)."""
+        entry = self._entries.popleft()
+        self._drop(entry)
+        self._count('sent')
+        return entry.payload
+
+    def clear(self) -> int:
+        """Discard every queued frame, returning how many there were."""
+        discarded = len(self._entries)
+        self._entries.clear()
+        self._by_key.clear()
+        self.bytes = 0
+        return discarded
+
+    def stats(self) -> dict[str, int]:
+        """Return the counters and current depth of this queue."""
+        return {**self.counters, 'depth': len(self._entries), 'bytes': self.bytes, 'max_depth': self.max_depth}
+
+    def _overflows(self, size: int) -> bool:
+        return len(self._entries) >= self.max_frames or self.bytes + size > self.max_bytes
+
+    def _drop(self, entry: _Entry) -> None:
+        self.bytes -= entry.size
+        if entry.key is not None and self._by_key.get(entry.key) is entry:
+            del self._by_key[entry.key]
+
+    def _count(self, counter: str) -> None:
+        self.counters[counter] += 1
+        _totals[counter] += 1
+
+
+def metrics() -> dict[str, int]:
+    """Return send queue totals of this process plus the live connections and queued frames."""
+    queues = list(_queues)
+    return {
+        **_totals,
+        'connections': len(queues),
+        'depth': sum(len(queue) for queue in queues),
+        'bytes': sum(queue.bytes for queue in queues),
+    }
+
+
+def transport_backlog(send: Any) -> Optional[int]:
+    """
+    Return the bytes the server holds unsent for a connection, when it exposes them.
+
+    Daphne passes ``partial(server.handle_reply, protocol)`` as the ASGI
+    ``send``; the write buffer of the protocol's Twisted transport is read
+    from it. None for other servers and for wrapped (TLS) transports.
+    """
+    protocol = send.args[0] if isinstance(send, functools.partial) and send.args else None
+    transport = getattr(protocol, 'transport', None)
+    try:
+        return len(transport.dataBuffer) - transport.offset + transport._tempDataLen
+    except (AttributeError, TypeError):
+        return None
+
+
+class SendQueueMixin:
+    """
+    Consumer mixin sending measurement frames through a SendQueue.
+
+    Overrides ``send_update()`` / ``send_batch()`` of
+    devices.delivery.DeliveryMixin, so it must come before it in the bases.
+    The consumer calls ``init_send_queue()`` on connect and
+    ``stop_send_queue()`` on disconnect.
+    """
+
+    def init_send_queue(self) -> None:
+        self.send_queue = SendQueue(
+            settings.WS_SEND_QUEUE_MAX_FRAMES,
+            settings.WS_SEND_QUEUE_MAX_BYTES,
+            settings.WS_SEND_QUEUE_POLICY,
+        )
+        self._send_ready = asyncio.Event()
+        self._send_task: Optional[asyncio.Task] = None
+        self._evicted = False
+
+    async def send_update(self, item: Any, key: Optional[Hashable] = None) -> None:
+        """Queue one encoded update frame."""
+        await self.enqueue(item, key)
+
+    async def send_batch(self, items: list[Any]) -> None:
+        """Queue several encoded update frames as one array frame."""
+        await self.enqueue(self.codec.encode_batch(items))
+
+    async def enqueue(self, payload: Any, key: Optional[Hashable] = None) -> None:
+        """Queue a frame for the writer task, applying the overflow policy."""
+        if self._evicted:
+            return
+        if self.send_queue.put(payload, key):
+            if self._send_task is None or self._send_task.done():
+                self._send_task = asyncio.create_task(self._send_loop())
+            self._send_ready.set()
+            return
+        await self.evict()
+
+    async def evict(self) -> None:
+        """Close a connection that fell too far behind (disconnect policy)."""
+        self._evicted = True
+        self.send_queue._count('evicted')
+        discarded = self.send_queue.clear()
+        logger.warning(
+            f"Closing slow WebSocket consumer {getattr(self, 'channel_name', '')} "
+            f"({discarded} frames pending)"
+        )
+        await self.stop_send_queue()
+        await self.close(code=RESYNC_CLOSE_CODE)
+
+    async def stop_send_queue(self) -> None:
+        """Cancel the writer task; queued frames are discarded."""
+        task = getattr(self, '_send_task', None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._send_task = None
+        queue = getattr(self, 'send_queue', None)
+        if queue is not None:
+            queue.clear()
+
+    async def wait_for_transport(self) -> None:
+        """Pause while the server buffers more than WS_SEND_QUEUE_TRANSPORT_MAX_BYTES for this connection."""
+        limit = settings.WS_SEND_QUEUE_TRANSPORT_MAX_BYTES
+        while limit > 0:
+            backlog = transport_backlog(getattr(self, 'base_send', None))
+            if backlog is None or backlog <= limit:
+                return
+            await asyncio.sleep(TRANSPORT_POLL_INTERVAL)
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._send_ready.wait()
+            self._send_ready.clear()
+            while self.send_queue:
+                # Frames wait in the queue, where the overflow policy applies
+                await self.wait_for_transport()
+                try:
+                    await self.send_encoded(self.send_queue.get())
+                except Exception:
+                    logger.exception("Failed to send queued WebSocket frame")
@@ -6,21 +6,58 @@ and proper error handling.
 """
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.core.exceptions import ValidationError
-import json
+from django.db.models import Q
+from typing import Optional
+from urllib.parse import parse_qsl
+import asyncio
 import logging
+import uuid
 
+from accounts.middleware import UNAUTHORIZED_CLOSE_CODE
+from core.instrumentation import QueryStatsConsumerMixin
+from core.profiling import ProfilingConsumerMixin
+
+from .backpressure import SendQueueMixin
+from .delivery import DeliveryMixin, DeliveryPolicy
+from .encoding import CodecMixin
+from .fleet import FLEET_GROUP, FleetFilter
+from .metrics import ConnectionMetricsMixin, observe_delivery
 from .models import Device
+from .services.realtime import device_group_name
+from .services.snapshot import get_snapshots
 
 logger = logging.getLogger(__name__)
 
+# Snapshot reads may hit the database on a cache miss
+load_snapshots = database_sync_to_async(get_snapshots)
+
 
-class DeviceConsumer(AsyncWebsocketConsumer):
+class DeviceConsumer(ProfilingConsumerMixin, QueryStatsConsumerMixin, ConnectionMetricsMixin, SendQueueMixin, DeliveryMixin, CodecMixin, AsyncWebsocketConsumer):
     """
     AsyncWebsocketConsumer for device-specific WebSocket connections.
     
     Accepts connections at ws/device/<public_id>
     Groups connected clients by device public_id for broadcasting.
+    
+    The delivery policy (see devices.delivery) may be given in the query
+    string, e.g. ``?mode=latest&interval_ms=500`` or ``?max_fps=2``, or
+    changed later with ``{"action": "set_policy", "policy": {...}}``.
+    
+    Frames are JSON text unless the client negotiated a binary encoding
+    through the subprotocol header (see devices.encoding).
+    
+    Right after connecting the client receives a ``snapshot`` frame (latest
+    value per metric, plus the last ``?history=N`` points) carrying the
+    sequence number of the last update it reflects; live updates carry
+    ``seq`` too, so updates already in the snapshot can be skipped and gaps
+    detected.
+    
+    Updates are written to the socket by a per-connection task through a
+    bounded send queue (see devices.backpressure): a client that stops
+    reading loses its oldest updates, has them coalesced, or is closed with
+    code 4008 and must resync, instead of backing up the channel layer.
     """
     
     async def connect(self):
@@ -31,7 +68,22 @@ class DeviceConsumer(AsyncWebsocketConsumer):
         """
         # Extract public_id from URL path
         self.public_id = self.scope['url_route']['kwargs']['public_id']
-        self.device_group_name = f'device_{self.public_id}'
+        self.device_group_name = device_group_name(self.public_id)
+        self.init_delivery()
+        self.init_send_queue()
+        
+        # Validate the requested delivery policy and snapshot history
+        try:
+            query = dict(parse_qsl(self.scope.get('query_string', b'').decode()))
+            policy = DeliveryPolicy.from_dict(
+                {key: query[key] for key in ('mode', 'max_fps', 'interval_ms') if key in query}
+            )
+            history = _parse_history(query.get('history'))
+        except ValueError as exc:
+            logger.warning(f"Invalid delivery policy for device {self.public_id}: {exc}")
+            await self.close(code=4400)  # Bad Request
+            return
+        self.delivery.set_policy(self.public_id, policy)
         
         # Validate device exists
         device = await self.get_device(self.public_id)
@@ -41,21 +93,26 @@ class DeviceConsumer(AsyncWebsocketConsumer):
             return
         
         # Join device group
-        await self.channel_layer.group_add(
-            self.device_group_name,
-            self.channel_name
-        )
+        await self.join_group(self.device_group_name)
         
-        await self.accept()
-        logger.info(f"WebSocket connected for device: {self.public_id}")
+        await self.accept(subprotocol=self.negotiate_codec())
+        logger.info(f"WebSocket connected for device: {self.public_id} (encoding: {self.codec.name})")
         
         # Send welcome message
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'connection_established',
             'message': f'Connected to device {self.public_id}',
             'device_id': str(self.public_id),
             'device_name': device.name
-        }))
+        })
+        
+        # Initial state, sent after joining the group so no update falls in between
+        snapshots = await load_snapshots([self.public_id], history)
+        await self.send_frame({
+            'type': 'snapshot',
+            'device_id': str(self.public_id),
+            **snapshots[str(self.public_id)],
+        })
     
     async def disconnect(self, close_code):
         """
@@ -63,35 +120,39 @@ class DeviceConsumer(AsyncWebsocketConsumer):
         
         Leaves device group when connection is closed.
         """
+        await self.stop_delivery()
+        await self.stop_send_queue()
+        
         # Leave device group
-        await self.channel_layer.group_discard(
-            self.device_group_name,
-            self.channel_name
-        )
+        await self.leave_group(self.device_group_name)
         logger.info(f"WebSocket disconnected for device: {self.public_id} (code: {close_code})")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Handle messages received from WebSocket client.
         
-        Currently only logs received messages.
+        Handles set_policy actions and echoes anything else back.
         Can be extended for bidirectional communication if needed.
         """
         try:
-            data = json.loads(text_data)
+            data = self.decode_message(text_data, bytes_data)
             logger.debug(f"Received message from device {self.public_id}: {data}")
             
+            if isinstance(data, dict) and data.get('action') == 'set_policy':
+                await self.set_policy(data.get('policy'))
+                return
+            
             # Echo message back (optional - can be removed if not needed)
-            await self.send(text_data=json.dumps({
+            await self.send_frame({
                 'type': 'message_received',
                 'data': data
-            }))
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received from device {self.public_id}")
-            await self.send(text_data=json.dumps({
+            })
+        except ValueError:
+            logger.error(f"Invalid message received from device {self.public_id}")
+            await self.send_frame({
                 'type': 'error',
                 'message': 'Invalid JSON format'
-            }))
+            })
     
     # Handler for messages sent to the group
     async def measurement_update(self, event):
@@ -102,15 +163,22 @@ class DeviceConsumer(AsyncWebsocketConsumer):
         via channel_layer.group_send().
         
         Args:
-            event: Dict containing message data with 'measurement' key
+            event: Dict with the 'metric' and the 'frame' to encode (see
+                publish_measurement), or a plain 'measurement' dict
         """
-        measurement = event['measurement']
-        
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'measurement_update',
-            'measurement': measurement
-        }))
+        observe_delivery(event)
+        # Send (or buffer, depending on the delivery policy) the update
+        await self.deliver(self.public_id, _event_metric(event), self.event_payload(event))
+    
+    async def set_policy(self, data):
+        """Change the delivery policy of the connection."""
+        try:
+            policy = DeliveryPolicy.from_dict(data)
+        except ValueError as exc:
+            await self.send_frame({'type': 'error', 'message': str(exc)})
+            return
+        self.delivery.set_policy(self.public_id, policy)
+        await self.send_frame({'type': 'policy_updated', 'policy': policy.to_dict()})
     
     @database_sync_to_async
     def get_device(self, public_id: str):
@@ -129,3 +197,321 @@ class DeviceConsumer(AsyncWebsocketConsumer):
         except (Device.DoesNotExist, ValidationError):
             return None
 
+
+class MultiplexDeviceConsumer(ProfilingConsumerMixin, QueryStatsConsumerMixin, ConnectionMetricsMixin, SendQueueMixin, DeliveryMixin, CodecMixin, AsyncWebsocketConsumer):
+    """
+    AsyncWebsocketConsumer carrying updates of many devices on one connection.
+    
+    Accepts connections at ws/devices/ and lets the client manage its
+    subscriptions with JSON messages:
+    
+        {"action": "subscribe", "devices": ["<public_id>", ...], "categories": [<id>, ...],
+         "policy": {"mode": "latest", "interval_ms": 500}, "snapshot": true, "history": 20}
+        {"action": "set_policy", "devices": [...], "categories": [...], "policy": {...}}
+        {"action": "unsubscribe", "devices": ["<public_id>", ...], "categories": [<id>, ...]}
+    
+    Devices and categories of a message are validated with a single query.
+    Categories are expanded to their devices when the message is received.
+    Messages are JSON text, or binary frames in the negotiated encoding.
+    Every update is tagged with the ``device_id`` (public_id) it belongs to,
+    and delivered according to the policy of its subscription. With
+    ``"snapshot": true`` a ``snapshot`` frame per device follows the
+    ``subscribed`` reply (see DeviceConsumer). Updates share one send queue
+    per connection, like DeviceConsumer.
+    """
+    
+    async def connect(self):
+        """Accept the connection; subscriptions are added by client messages."""
+        # public_id -> device name of every subscribed device
+        self.subscriptions: dict[str, str] = {}
+        self.init_delivery()
+        self.init_send_queue()
+        await self.accept(subprotocol=self.negotiate_codec())
+        await self.send_frame({
+            'type': 'connection_established',
+            'message': 'Connected to device stream',
+        })
+    
+    async def disconnect(self, close_code):
+        """Leave every subscribed device group."""
+        await self.stop_delivery()
+        await self.stop_send_queue()
+        await self._discard(list(getattr(self, 'subscriptions', {})))
+        logger.info(f"Multiplexed WebSocket disconnected (code: {close_code})")
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        """Dispatch subscribe/unsubscribe messages."""
+        try:
+            data = self.decode_message(text_data, bytes_data)
+        except ValueError:
+            await self.send_error('Invalid JSON format')
+            return
+        if not isinstance(data, dict):
+            await self.send_error('Message must be a JSON object')
+            return
+        
+        action = data.get('action')
+        if action == 'subscribe':
+            await self.subscribe(data)
+        elif action == 'set_policy':
+            await self.set_policy(data)
+        elif action == 'unsubscribe':
+            await self.unsubscribe(data)
+        else:
+            await self.send_error(f'Unknown action: {action}')
+    
+    async def subscribe(self, data: dict):
+        """Validate the requested devices/categories and join their groups."""
+        try:
+            policy = DeliveryPolicy.from_dict(data.get('policy'))
+        except ValueError as exc:
+            await self.send_error(str(exc))
+            return
+        
+        try:
+            history = _parse_history(data.get('history'))
+        except ValueError as exc:
+            await self.send_error(str(exc))
+            return
+        
+        public_ids, invalid = _parse_public_ids(data.get('devices'))
+        category_ids = _parse_category_ids(data.get('categories'))
+        
+        devices = await self.resolve_devices(public_ids, category_ids)
+        found = {public_id for public_id, _ in devices}
+        invalid.extend(public_id for public_id in public_ids if public_id not in found)
+        
+        new_devices = {
+            public_id: name for public_id, name in devices
+            if public_id not in self.subscriptions
+        }
+        limit = settings.WS_MAX_SUBSCRIPTIONS
+        if len(self.subscriptions) + len(new_devices) > limit:
+            await self.send_error(f'Subscription limit of {limit} devices exceeded')
+            return
+        
+        await asyncio.gather(*(
+            self.join_group(device_group_name(public_id))
+            for public_id in new_devices
+        ))
+        self.subscriptions.update(new_devices)
+        for public_id in found:
+            self.delivery.set_policy(public_id, policy)
+        
+        await self.send_frame({
+            'type': 'subscribed',
+            'devices': [
+                {'device_id': public_id, 'device_name': name} for public_id, name in devices
+            ],
+            'invalid': invalid,
+            'policy': policy.to_dict(),
+        })
+        
+        if data.get('snapshot') and devices:
+            snapshots = await load_snapshots([public_id for public_id, _ in devices], history)
+            for public_id, snapshot in snapshots.items():
+                await self.send_frame({'type': 'snapshot', 'device_id': public_id, **snapshot})
+    
+    async def set_policy(self, data: dict):
+        """Change the delivery policy of already subscribed devices/categories."""
+        try:
+            policy = DeliveryPolicy.from_dict(data.get('policy'))
+        except ValueError as exc:
+            await self.send_error(str(exc))
+            return
+        
+        public_ids = await self._targets(data)
+        updated = [public_id for public_id in dict.fromkeys(public_ids) if public_id in self.subscriptions]
+        for public_id in updated:
+            self.delivery.set_policy(public_id, policy)
+        
+        await self.send_frame({
+            'type': 'policy_updated',
+            'devices': updated,
+            'policy': policy.to_dict(),
+        })
+    
+    async def unsubscribe(self, data: dict):
+        """Leave the groups of the given devices/categories."""
+        _, invalid = _parse_public_ids(data.get('devices'))
+        public_ids = await self._targets(data)
+        removed = [public_id for public_id in dict.fromkeys(public_ids) if public_id in self.subscriptions]
+        await self._discard(removed)
+        
+        await self.send_frame({
+            'type': 'unsubscribed',
+            'devices': removed,
+            'invalid': invalid,
+        })
+    
+    async def _targets(self, data: dict) -> list[str]:
+        """Return the public_ids named by a message, expanding its categories."""
+        public_ids, _ = _parse_public_ids(data.get('devices'))
+        category_ids = _parse_category_ids(data.get('categories'))
+        if category_ids:
+            devices = await self.resolve_devices([], category_ids)
+            public_ids.extend(public_id for public_id, _ in devices)
+        return public_ids
+    
+    async def _discard(self, public_ids: list[str]):
+        """Leave the groups of the given subscribed devices."""
+        await asyncio.gather(*(
+            self.leave_group(device_group_name(public_id))
+            for public_id in public_ids
+        ))
+        for public_id in public_ids:
+            self.subscriptions.pop(public_id, None)
+            self.delivery.remove(public_id)
+    
+    async def send_error(self, message: str):
+        """Send an error frame to the client."""
+        await self.send_frame({'type': 'error', 'message': message})
+    
+    # Handler for messages sent to the device groups
+    async def measurement_update(self, event):
+        """
+        Handle 'measurement_update' messages of any subscribed device.
+        
+        Args:
+            event: Dict with 'device_id' (public_id), 'metric' and the
+                'frame' to encode (see publish_measurement), or a plain
+                'measurement' dict
+        """
+        device_id = event.get('device_id')
+        # Updates already queued for a device unsubscribed meanwhile are dropped
+        if device_id not in self.subscriptions:
+            return
+        observe_delivery(event)
+        await self.deliver(device_id, _event_metric(event), self.event_payload(event))
+    
+    @database_sync_to_async
+    def resolve_devices(self, public_ids: list[str], category_ids: list[int]) -> list[tuple[str, str]]:
+        """
+        Resolve public_ids and category ids to existing devices in one query.
+        
+        Returns:
+            List of (public_id, name) tuples
+        """
+        if not public_ids and not category_ids:
+            return []
+        devices = Device.objects.filter(
+            Q(public_id__in=public_ids) | Q(category_id__in=category_ids)
+        ).values_list('public_id', 'name')
+        return [(str(public_id), name) for public_id, name in devices]
+
+
+class FleetEventConsumer(ProfilingConsumerMixin, QueryStatsConsumerMixin, ConnectionMetricsMixin, CodecMixin, AsyncWebsocketConsumer):
+    """
+    AsyncWebsocketConsumer streaming fleet-wide events (see devices.fleet).
+    
+    Accepts connections at ws/fleet/ and pushes alert_created,
+    alert_resolved, alert_reopened and device_status_changed frames, so
+    alert and device lists can be kept current without polling.
+    
+    Filters are applied server side and may be given in the query string,
+    e.g. ``?severity=high,critical&category=3&events=alert_created``, or
+    replaced later with ``{"action": "set_filters", "filters": {...}}``.
+    
+    The stream covers every device, so anonymous connections are always
+    rejected (4401), whatever WS_REQUIRE_AUTH says.
+    """
+    
+    async def connect(self):
+        """Check the user, validate the filters and join the fleet group."""
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=UNAUTHORIZED_CLOSE_CODE)
+            return
+        
+        try:
+            query = dict(parse_qsl(self.scope.get('query_string', b'').decode()))
+            self.filters = FleetFilter.from_dict(
+                {key: query[key] for key in ('events', 'severity', 'category') if key in query}
+            )
+        except ValueError as exc:
+            logger.warning(f"Invalid fleet event filters: {exc}")
+            await self.close(code=4400)  # Bad Request
+            return
+        
+        await self.join_group(FLEET_GROUP)
+        await self.accept(subprotocol=self.negotiate_codec())
+        await self.send_frame({
+            'type': 'connection_established',
+            'message': 'Connected to fleet event stream',
+            'filters': self.filters.to_dict(),
+        })
+    
+    async def disconnect(self, close_code):
+        """Leave the fleet group."""
+        await self.leave_group(FLEET_GROUP)
+        logger.info(f"Fleet WebSocket disconnected (code: {close_code})")
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handle set_filters messages."""
+        try:
+            data = self.decode_message(text_data, bytes_data)
+        except ValueError:
+            await self.send_frame({'type': 'error', 'message': 'Invalid JSON format'})
+            return
+        if not isinstance(data, dict) or data.get('action') != 'set_filters':
+            action = data.get('action') if isinstance(data, dict) else None
+            await self.send_frame({'type': 'error', 'message': f'Unknown action: {action}'})
+            return
+        try:
+            self.filters = FleetFilter.from_dict(data.get('filters'))
+        except ValueError as exc:
+            await self.send_frame({'type': 'error', 'message': str(exc)})
+            return
+        await self.send_frame({'type': 'filters_updated', 'filters': self.filters.to_dict()})
+    
+    async def fleet_event(self, event):
+        """
+        Forward a fleet event that passes the connection filters.
+        
+        Args:
+            event: Dict with the routing fields ('event', 'severity',
+                'category_id') and the 'frame' to encode
+        """
+        if self.filters.matches(event):
+            await self.send_encoded(self.event_payload(event))
+
+
+def _event_metric(event) -> Optional[str]:
+    """Return the metric of a measurement_update event (the coalescing key)."""
+    if 'metric' in event:
+        return event['metric']
+    return (event.get('measurement') or {}).get('metric')
+
+
+def _parse_public_ids(values) -> tuple[list[str], list]:
+    """Split requested public_ids into normalized UUID strings and invalid values."""
+    if not isinstance(values, list):
+        return [], []
+    valid: list[str] = []
+    invalid: list = []
+    for value in values:
+        try:
+            valid.append(str(uuid.UUID(str(value))))
+        except ValueError:
+            invalid.append(value)
+    return valid, invalid
+
+
+def _parse_category_ids(values) -> list[int]:
+    """Return the integer category ids of a request, ignoring anything else."""
+    if not isinstance(values, list):
+        return []
+    return [value for value in values if isinstance(value, int) and not isinstance(value, bool)]
+
+
+def _parse_history(value) -> int:
+    """Return the number of snapshot points requested by a client."""
+    if value in (None, ''):
+        return 0
+    try:
+        history = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('history must be an integer')
+    if history < 0:
+        raise ValueError('history must be zero or positive')
+    return history
@@ -0,0 +1,322 @@
+"""
+Delivery policies for WebSocket measurement pushes.
+
+A policy decides how the updates of one subscription (device) reach the
+client:
+
+- ``immediate``: every update is sent as its own frame (default).
+- ``max_fps``: at most ``max_fps`` frames per second; updates arriving
+  faster are coalesced to the latest value per metric and sent when the
+  window reopens.
+- ``latest``: only the latest value per metric is sent, every ``interval_ms``.
+- ``batch``: every update is buffered and sent as one array every ``interval_ms``.
+
+DeliveryScheduler holds the pending updates and deadlines; DeliveryMixin
+runs the asyncio flush task inside a consumer, so network and client CPU
+scale with the viewing rate instead of the ingest rate.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+MODE_IMMEDIATE: str = 'immediate'
+MODE_MAX_FPS: str = 'max_fps'
+MODE_LATEST: str = 'latest'
+MODE_BATCH: str = 'batch'
+
+MODES: tuple[str, ...] = (MODE_IMMEDIATE, MODE_MAX_FPS, MODE_LATEST, MODE_BATCH)
+
+# Accepted ranges for client supplied parameters
+MIN_INTERVAL_MS: int = 20
+MAX_INTERVAL_MS: int = 60000
+MAX_FPS_LIMIT: float = 100.0
+
+DEFAULT_INTERVAL_MS: int = 500
+
+# Updates kept per subscription in batch mode; the oldest are dropped beyond this
+BATCH_MAX_UPDATES: int = 1000
+
+
+def _parse_max_fps(value: Any) -> float:
+    try:
+        max_fps = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('max_fps must be a number')
+    if not 0 < max_fps <= MAX_FPS_LIMIT:
+        raise ValueError(f'max_fps must be within (0, {MAX_FPS_LIMIT:g}]')
+    return max_fps
+
+
+def _parse_interval_ms(value: Any) -> int:
+    try:
+        interval_ms = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('interval_ms must be an integer')
+    if not MIN_INTERVAL_MS <= interval_ms <= MAX_INTERVAL_MS:
+        raise ValueError(f'interval_ms must be within [{MIN_INTERVAL_MS}, {MAX_INTERVAL_MS}]')
+    return interval_ms
+
+
+@dataclass(frozen=True)
+class DeliveryPolicy:
+    """How the updates of a subscription are delivered."""
+
+    mode: str = MODE_IMMEDIATE
+    max_fps: Optional[float] = None
+    interval_ms: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict[str, Any]]) -> DeliveryPolicy:
+        """
+        Build a policy from a client message or query parameters.
+
+        Accepts ``{"mode": ..., "max_fps": ..., "interval_ms": ...}``; a bare
+        ``max_fps`` implies the max_fps mode.
+
+        Raises:
+            ValueError: If the mode or a parameter is invalid.
+        """
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError('Policy must be an object')
+
+        mode = data.get('mode') or (MODE_MAX_FPS if data.get('max_fps') is not None else MODE_IMMEDIATE)
+        if mode not in MODES:
+            raise ValueError(f"Unknown delivery mode '{mode}' (expected one of {', '.join(MODES)})")
+
+        if mode == MODE_MAX_FPS:
+            return cls(mode=mode, max_fps=_parse_max_fps(data.get('max_fps')))
+        if mode in (MODE_LATEST, MODE_BATCH):
+            return cls(mode=mode, interval_ms=_parse_interval_ms(data.get('interval_ms', DEFAULT_INTERVAL_MS)))
+        return cls()
+
+    @property
+    def interval(self) -> float:
+        """Minimum time between two frames of the subscription, in seconds."""
+        if self.mode == MODE_MAX_FPS:
+            return 1.0 / self.max_fps
+        if self.mode in (MODE_LATEST, MODE_BATCH):
+            return self.interval_ms / 1000.0
+        return 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the policy as sent back to clients."""
+        data: dict[str, Any] = {'mode': self.mode}
+        if self.max_fps is not None:
+            data['max_fps'] = self.max_fps
+        if self.interval_ms is not None:
+            data['interval_ms'] = self.interval_ms
+        return data
+
+
+IMMEDIATE = DeliveryPolicy()
+
+
+class _Subscription:
+    """Pending updates and timing of one subscription."""
+
+    __slots__ = ('policy', 'latest', 'batch', 'last_sent', 'deadline', 'dropped')
+
+    def __init__(self, policy: DeliveryPolicy):
+        self.policy = policy
+        self.latest: dict[Hashable, Any] = {}
+        self.batch: deque = deque(maxlen=BATCH_MAX_UPDATES)
+        self.last_sent: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.dropped = 0
+
+    def has_pending(self) -> bool:
+        return bool(self.latest or self.batch)
+
+    def take(self) -> list[Any]:
+        items = list(self.batch) if self.policy.mode == MODE_BATCH else list(self.latest.values())
+        self.latest.clear()
+        self.batch.clear()
+        self.deadline = None
+        return items
+
+
+class DeliveryScheduler:
+    """
+    Apply delivery policies to the updates of several subscriptions.
+
+    Items are opaque to the scheduler; ``key`` identifies the series an item
+    belongs to (the metric) so coalescing keeps the latest item per key.
+    Times are monotonic seconds (``loop.time()``).
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[Hashable, _Subscription] = {}
+
+    def set_policy(self, subscription: Hashable, policy: DeliveryPolicy) -> None:
+        """Set the policy of a subscription, dropping anything pending."""
+        if policy == IMMEDIATE:
+            self._subscriptions.pop(subscription, None)
+        else:
+            self._subscriptions[subscription] = _Subscription(policy)
+
+    def get_policy(self, subscription: Hashable) -> DeliveryPolicy:
+        """Return the policy of a subscription."""
+        state = self._subscriptions.get(subscription)
+        return state.policy if state is not None else IMMEDIATE
+
+    def remove(self, subscription: Hashable) -> None:
+        """Forget a subscription and its pending updates."""
+        self._subscriptions.pop(subscription, None)
+
+    def offer(self, subscription: Hashable, key: Hashable, item: Any, now: float) -> list[Any]:
+        """
+        Accept an update.
+
+        Returns:
+            Items to send right away (possibly empty when buffered).
+        """
+        state = self._subscriptions.get(subscription)
+        if state is None:
+            return [item]
+
+        mode = state.policy.mode
+        if mode == MODE_MAX_FPS:
+            window_open = state.last_sent is None or now - state.last_sent >= state.policy.interval
+            if window_open and not state.has_pending():
+                state.last_sent = now
+                return [item]
+            state.latest[key] = item
+            if state.deadline is None:
+                state.deadline = (now if state.last_sent is None else state.last_sent) + state.policy.interval
+            return []
+
+        if mode == MODE_BATCH:
+            if len(state.batch) == state.batch.maxlen:
+                state.dropped += 1
+            state.batch.append(item)
+        else:
+            state.latest[key] = item
+        if state.deadline is None:
+            # Aligned to the interval so subscriptions sharing it flush together
+            interval = state.policy.interval
+            state.deadline = (math.floor(now / interval) + 1) * interval
+        return []
+
+    def due(self, now: float) -> list[tuple[Hashable, DeliveryPolicy, list[Any]]]:
+        """
+        Collect the pending updates whose deadline has passed.
+
+        Returns:
+            List of (subscription, policy, items) to send.
+        """
+        ready = []
+        for subscription, state in self._subscriptions.items():
+            if state.deadline is not None and state.deadline <= now and state.has_pending():
+                ready.append((subscription, state.policy, state.take()))
+                state.last_sent = now
+        return ready
+
+    def next_deadline(self) -> Optional[float]:
+        """Return the earliest pending deadline, or None when nothing is pending."""
+        deadlines = [
+            state.deadline for state in self._subscriptions.values()
+            if state.deadline is not None and state.has_pending()
+        ]
+        return min(deadlines) if deadlines else None
+
+    def dropped(self) -> int:
+        """Return how many batched updates were dropped because a buffer was full."""
+        return sum(state.dropped for state in self._subscriptions.values())
+
+
+class DeliveryMixin:
+    """
+    Consumer mixin delivering measurement frames through a DeliveryScheduler.
+
+    The consumer calls ``init_delivery()`` on connect, ``deliver()`` for each
+    encoded update frame and ``stop_delivery()`` on disconnect. Frames are
+    sent verbatim with ``send_encoded()`` (see devices.encoding.CodecMixin);
+    batches are assembled as ``{"type": "measurement_batch", "updates": [...]}``
+    without re-encoding the frames. Consumers may override ``send_update()``
+    and ``send_batch()`` to queue frames instead (see devices.backpressure).
+    A single flush task per connection sleeps until the earliest deadline.
+    """
+
+    def init_delivery(self) -> None:
+        self.delivery = DeliveryScheduler()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup = asyncio.Event()
+
+    async def deliver(self, subscription: Hashable, key: Hashable, item: Any) -> None:
+        """Send or buffer an update according to the subscription policy."""
+        loop = asyncio.get_running_loop()
+        for ready in self.delivery.offer(subscription, key, item, loop.time()):
+            await self.send_update(ready, (subscription, key))
+        if self.delivery.next_deadline() is not None:
+            self._ensure_flush_task()
+            self._flush_wakeup.set()
+
+    async def stop_delivery(self) -> None:
+        """Cancel the flush task; pending updates are discarded."""
+        task = getattr(self, '_flush_task', None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+    def _ensure_flush_task(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            if await self._wait_for_deadline():
+                try:
+                    await self._flush_due()
+                except Exception:
+                    logger.exception("Failed to flush buffered WebSocket updates")
+
+    async def _wait_for_deadline(self) -> bool:
+        """Sleep until the next deadline or a wakeup; True when a deadline has passed."""
+        loop = asyncio.get_running_loop()
+        self._flush_wakeup.clear()
+        deadline = self.delivery.next_deadline()
+        if deadline is None:
+            await self._flush_wakeup.wait()
+            return False
+        delay = deadline - loop.time()
+        if delay <= 0:
+            return True
+        try:
+            await asyncio.wait_for(self._flush_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        return False
+
+    async def _flush_due(self) -> None:
+        """Send the buffered updates of every due subscription."""
+        # Batched updates of every due subscription share one frame
+        batched: list[Any] = []
+        for _subscription, policy, items in self.delivery.due(asyncio.get_running_loop().time()):
+            if policy.mode == MODE_BATCH:
+                batched.extend(items)
+            else:
+                for item in items:
+                    await self.send_update(item)
+        if batched:
+            await self.send_batch(batched)
+
+    async def send_update(self, item: Any, key: Optional[Hashable] = None) -> None:
+        """Send one encoded update frame (``key``: its subscription and series, when known)."""
+        await self.send_encoded(item)
+
+    async def send_batch(self, items: list[Any]) -> None:
+        """Send several encoded update frames as one array frame."""
+        await self.send_encoded(self.codec.encode_batch(items))
@@ -0,0 +1,284 @@
+"""
+Wire encodings for WebSocket frames.
+
+JSON text frames are the default. Clients may negotiate a binary encoding
+through the WebSocket subprotocol header (``Sec-WebSocket-Protocol``):
+
+- ``msgpack``: MessagePack binary frames (requires ``msgpack``)
+- ``cbor``: CBOR binary frames (requires ``cbor2``)
+
+Binary frames carry measurements in a compact form: ``value`` as a float
+and ``timestamp`` as integer milliseconds since the Unix epoch, instead of
+the decimal and ISO 8601 strings used in JSON. Codecs whose library is not
+installed, or that are not listed in WS_CODECS, are simply not offered.
+
+Broadcast events carry the frame once (broadcast_event). Consumers encode
+it with their codec on first delivery and share that encoding with every
+other connection of the process using the same codec (encode_event);
+batches are assembled from the already encoded frames (encode_batch)
+without decoding them.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from django.conf import settings
+
+JSON: str = 'json'
+MSGPACK: str = 'msgpack'
+CBOR: str = 'cbor'
+
+
+class Codec:
+    """Encode frames for one wire format."""
+
+    name: str = JSON
+    binary: bool = False
+
+    def encode(self, frame: dict[str, Any]) -> Any:
+        """Return the frame as text (str) or bytes."""
+        return json.dumps(frame)
+
+    def decode(self, data: Any) -> Any:
+        """Decode a client message."""
+        return json.loads(data)
+
+    def encode_batch(self, payloads: list[Any]) -> Any:
+        """Wrap already encoded update frames in a measurement_batch frame."""
+        return '{"type": "measurement_batch", "updates": [' + ', '.join(payloads) + ']}'
+
+    def send_kwargs(self, payload: Any) -> dict[str, Any]:
+        """Return the ``send()`` keyword arguments for an encoded payload."""
+        return {'bytes_data': payload} if self.binary else {'text_data': payload}
+
+
+class MsgpackCodec(Codec):
+    """MessagePack frames with compact measurements."""
+
+    name = MSGPACK
+    binary = True
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+        # fixmap(2): "type": "measurement_batch", "updates": <array>
+        self._batch_prefix = b'\x82' + b''.join(
+            msgpack.packb(item) for item in ('type', 'measurement_batch', 'updates')
+        )
+
+    def encode(self, frame: dict[str, Any]) -> bytes:
+        return self._msgpack.packb(compact_frame(frame), use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+    def encode_batch(self, payloads: list[bytes]) -> bytes:
+        count = len(payloads)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 2 ** 16:
+            header = b'\xdc' + count.to_bytes(2, 'big')
+        else:
+            header = b'\xdd' + count.to_bytes(4, 'big')
+        return self._batch_prefix + header + b''.join(payloads)
+
+
+class CborCodec(Codec):
+    """CBOR frames with compact measurements."""
+
+    name = CBOR
+    binary = True
+
+    def __init__(self):
+        import cbor2
+        self._cbor2 = cbor2
+        # map(2): "type": "measurement_batch", "updates": <array>
+        self._batch_prefix = b'\xa2' + b''.join(
+            cbor2.dumps(item) for item in ('type', 'measurement_batch', 'updates')
+        )
+
+    def encode(self, frame: dict[str, Any]) -> bytes:
+        return self._cbor2.dumps(compact_frame(frame))
+
+    def decode(self, data: bytes) -> Any:
+        return self._cbor2.loads(data)
+
+    def encode_batch(self, payloads: list[bytes]) -> bytes:
+        count = len(payloads)
+        if count < 24:
+            header = bytes([0x80 | count])
+        elif count < 2 ** 8:
+            header = b'\x98' + count.to_bytes(1, 'big')
+        elif count < 2 ** 16:
+            header = b'\x99' + count.to_bytes(2, 'big')
+        else:
+            header = b'\x9a' + count.to_bytes(4, 'big')
+        return self._batch_prefix + header + b''.join(payloads)
+
+
+def _available_codecs() -> dict[str, Codec]:
+    enabled = set(getattr(settings, 'WS_CODECS', (MSGPACK, CBOR)))
+    codecs: dict[str, Codec] = {JSON: Codec()}
+    for codec_class in (MsgpackCodec, CborCodec):
+        if codec_class.name not in enabled:
+            continue
+        try:
+            codecs[codec_class.name] = codec_class()
+        except ImportError:
+            pass
+    return codecs
+
+
+CODECS: dict[str, Codec] = _available_codecs()
+
+JSON_CODEC: Codec = CODECS[JSON]
+
+
+def negotiate(subprotocols: Iterable[str]) -> Optional[Codec]:
+    """
+    Pick the codec of the first offered subprotocol that is supported.
+
+    Returns:
+        The codec, or None when no offered subprotocol names a codec.
+    """
+    for subprotocol in subprotocols or ():
+        codec = CODECS.get(subprotocol)
+        if codec is not None:
+            return codec
+    return None
+
+
+def broadcast_event(event_type: str, frame: dict[str, Any], **routing: Any) -> dict[str, Any]:
+    """
+    Return a channel layer event carrying a frame and its routing fields.
+
+    The event id lets the consumers of a process share one encoding of the
+    frame per codec (see encode_event).
+    """
+    return {'type': event_type, **routing, 'event_id': uuid.uuid4().hex, 'frame': frame}
+
+
+# Encodings of recent broadcast frames, keyed by (event id, codec name)
+ENCODED_FRAMES_CACHE_SIZE: int = 1024
+_encoded_frames: OrderedDict[tuple[str, str], Any] = OrderedDict()
+_encoded_frames_lock = threading.Lock()
+
+
+def encode_event(event: dict[str, Any], codec: Codec) -> Any:
+    """
+    Return the frame of a broadcast event encoded with a codec.
+
+    Each frame is encoded at most once per codec and process while it stays
+    among the last ENCODED_FRAMES_CACHE_SIZE encodings; every connection of
+    the process receiving the event reuses it.
+    """
+    event_id = event.get('event_id')
+    if event_id is None:
+        return codec.encode(event['frame'])
+    key = (event_id, codec.name)
+    with _encoded_frames_lock:
+        payload = _encoded_frames.get(key)
+        if payload is not None:
+            _encoded_frames.move_to_end(key)
+            return payload
+
+    payload = codec.encode(event['frame'])
+    with _encoded_frames_lock:
+        _encoded_frames[key] = payload
+        while len(_encoded_frames) > ENCODED_FRAMES_CACHE_SIZE:
+            _encoded_frames.popitem(last=False)
+    return payload
+
+
+def compact_measurement(measurement: dict[str, Any]) -> dict[str, Any]:
+    """Return a measurement with a float value and an epoch-milliseconds timestamp."""
+    compact = dict(measurement)
+    value = compact.get('value')
+    if value is not None and not isinstance(value, float):
+        compact['value'] = float(value)
+    timestamp = compact.get('timestamp')
+    if isinstance(timestamp, str):
+        compact['timestamp'] = int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+    elif isinstance(timestamp, datetime):
+        compact['timestamp'] = int(timestamp.timestamp() * 1000)
+    return compact
+
+
+def compact_frame(frame: dict[str, Any]) -> dict[str, Any]:
+    """Return a frame with every measurement it carries in compact form."""
+    compact = dict(frame)
+    if isinstance(compact.get('measurement'), dict):
+        compact['measurement'] = compact_measurement(compact['measurement'])
+    if isinstance(compact.get('updates'), list):
+        compact['updates'] = [compact_frame(update) for update in compact['updates']]
+    if isinstance(compact.get('latest'), dict):
+        compact['latest'] = {key: compact_measurement(m) for key, m in compact['latest'].items()}
+    if isinstance(compact.get('recent'), list):
+        compact['recent'] = [compact_measurement(m) for m in compact['recent']]
+    return compact
+
+
+class CodecMixin:
+    """
+    Consumer mixin sending and receiving frames with the negotiated codec.
+
+    Call ``negotiate_codec()`` before ``accept()`` and pass its result as
+    the accepted subprotocol.
+    """
+
+    codec: Codec = JSON_CODEC
+
+    def negotiate_codec(self) -> Optional[str]:
+        """
+        Select the codec from the offered subprotocols; return the one to accept.
+
+        Without a codec, the ``bearer`` subprotocol that carried the access
+        token (see accounts.middleware) is accepted, as browsers require one
+        of the offered subprotocols to be echoed.
+        """
+        codec = negotiate(self.scope.get('subprotocols', []))
+        self.codec = codec or JSON_CODEC
+        if codec is not None:
+            return codec.name
+        return self.scope.get('auth_subprotocol')
+
+    async def send_frame(self, frame: dict[str, Any]) -> None:
+        """Encode and send one frame."""
+        await self.send_encoded(self.codec.encode(frame))
+
+    async def send_encoded(self, payload: Any) -> None:
+        """Send a payload already encoded with this connection's codec."""
+        await self.send(**self.codec.send_kwargs(payload))
+
+    def event_payload(self, event: dict[str, Any]) -> Any:
+        """
+        Return the encoded frame of a broadcast event for this connection.
+
+        Events built by broadcast_event() carry the frame under ``frame``
+        and are encoded once per codec and process (encode_event); other
+        events carry the frame fields themselves and are encoded as is.
+        """
+        if 'frame' in event:
+            return encode_event(event, self.codec)
+        return self.codec.encode(event)
+
+    def decode_message(self, text_data: Optional[str] = None, bytes_data: Optional[bytes] = None) -> Any:
+        """
+        Decode a client message; text is always JSON, bytes use the binary codec.
+
+        Raises:
+            ValueError: If the message cannot be decoded.
+        """
+        if text_data is not None:
+            return json.loads(text_data)
+        if bytes_data is not None and self.codec.binary:
+            try:
+                return self.codec.decode(bytes_data)
+            except Exception as exc:
+                raise ValueError(str(exc)) from exc
+        raise ValueError('Unsupported message format')
@@ -0,0 +1,104 @@
+"""
+Custom model fields for devices app.
+
+MeasurementValueField lets the measurement value column be stored either as
+NUMERIC(20, 10) (default) or as a float8 column, selected through the
+MEASUREMENT_VALUE_STORAGE setting.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Optional, Union
+
+from django.conf import settings
+from django.core import exceptions
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+VALUE_STORAGE_DECIMAL: str = 'decimal'
+VALUE_STORAGE_FLOAT: str = 'float'
+VALUE_STORAGES: tuple[str, ...] = (VALUE_STORAGE_DECIMAL, VALUE_STORAGE_FLOAT)
+
+
+def get_value_storage() -> str:
+    """Return the configured measurement value storage mode."""
+    storage = getattr(settings, 'MEASUREMENT_VALUE_STORAGE', VALUE_STORAGE_DECIMAL)
+    if storage not in VALUE_STORAGES:
+        raise ImproperlyConfigured(
+            f"MEASUREMENT_VALUE_STORAGE must be one of: {', '.join(VALUE_STORAGES)} (got {storage!r})"
+        )
+    return storage
+
+
+def uses_float_storage() -> bool:
+    """Return True when measurement values are stored as float8."""
+    return get_value_storage() == VALUE_STORAGE_FLOAT
+
+
+def value_output_field() -> models.Field:
+    """Return the output field matching the storage mode, for aggregates over values."""
+    if uses_float_storage():
+        return models.FloatField()
+    return models.DecimalField()
+
+
+class MeasurementValueField(models.DecimalField):
+    """
+    DecimalField whose column type follows the measurement value storage mode.
+
+    In decimal mode it behaves exactly like DecimalField. In float mode the
+    column is a double precision float and Python values are plain floats,
+    avoiding Decimal construction on every read.
+
+    The ``storage`` argument pins a mode regardless of settings; it is only
+    meant for schema conversions and benchmarks and is not part of migrations
+    unless explicitly set.
+    """
+
+    def __init__(self, *args: Any, storage: Optional[str] = None, **kwargs: Any) -> None:
+        if storage is not None and storage not in VALUE_STORAGES:
+            raise ValueError(f"storage must be one of: {', '.join(VALUE_STORAGES)}")
+        self.storage = storage
+        super().__init__(*args, **kwargs)
+
+    @property
+    def uses_float(self) -> bool:
+        """Return True when this field stores values as floats."""
+        return (self.storage or get_value_storage()) == VALUE_STORAGE_FLOAT
+
+    def deconstruct(self) -> tuple:
+        """Keep migrations independent from the configured storage mode."""
+        name, path, args, kwargs = super().deconstruct()
+        if self.storage is not None:
+            kwargs['storage'] = self.storage
+        return name, path, args, kwargs
+
+    def get_internal_type(self) -> str:
+        """Map to FloatField in float mode so the backend picks a float8 column."""
+        return 'FloatField' if self.uses_float else 'DecimalField'
+
+    @property
+    def validators(self) -> list:
+        """Skip digit/decimal place validation for float storage."""
+        if self.uses_float:
+            return models.Field.validators.func(self)
+        return models.DecimalField.validators.func(self)
+
+    def to_python(self, value: Any) -> Union[Decimal, float, None]:
+        """Convert input to float in float mode, Decimal otherwise."""
+        if not self.uses_float or value is None:
+            return super().to_python(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'],
+                code='invalid',
+                params={'value': value},
+            )
+
+    def get_db_prep_save(self, value: Any, connection) -> Any:
+        """Send floats to float columns and quantized decimals to numeric columns."""
+        if not self.uses_float or hasattr(value, 'as_sql'):
+            return super().get_db_prep_save(value, connection)
+        return self.to_python(value)
@@ -75,7 +75,7 @@ class MeasurementFilter(django_filters.FilterSet):
     )
     
     metric = django_filters.CharFilter(
-        field_name='metric',
+        field_name='definition__name',
         lookup_expr='iexact',
         help_text='Filter by metric name (case-insensitive exact match)'
     )
@@ -0,0 +1,108 @@
+"""
+Fleet-wide event stream.
+
+Alert lifecycle changes and device status transitions of the whole fleet are
+broadcast to a single channel layer group (FLEET_GROUP); every subscriber
+applies its own FleetFilter before forwarding, so clients only receive the
+severities, categories and event types they asked for.
+
+Events sent to clients:
+
+- ``alert_created``: ``{"type", "alert": {...}, "device": {...}}``
+- ``alert_resolved`` / ``alert_reopened``: same shape, after a status change
+- ``device_status_changed``: ``{"type", "device": {...}, "previous_status", "status"}``
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from devices.models import Alert
+
+FLEET_GROUP: str = 'fleet_events'
+
+ALERT_CREATED: str = 'alert_created'
+ALERT_RESOLVED: str = 'alert_resolved'
+ALERT_REOPENED: str = 'alert_reopened'
+DEVICE_STATUS_CHANGED: str = 'device_status_changed'
+
+EVENTS: tuple[str, ...] = (ALERT_CREATED, ALERT_RESOLVED, ALERT_REOPENED, DEVICE_STATUS_CHANGED)
+
+
+def _values(data: Any) -> list:
+    """Accept a list or a comma separated string of values."""
+    if data in (None, ''):
+        return []
+    if isinstance(data, str):
+        return [value.strip() for value in data.split(',') if value.strip()]
+    if isinstance(data, (list, tuple)):
+        return list(data)
+    raise ValueError('Filters must be lists or comma separated strings')
+
+
+@dataclass(frozen=True)
+class FleetFilter:
+    """Which fleet events a subscriber receives; empty sets match everything."""
+
+    events: frozenset[str] = frozenset()
+    severities: frozenset[str] = frozenset()
+    categories: frozenset[int] = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict[str, Any]]) -> FleetFilter:
+        """
+        Build a filter from a client message or query parameters.
+
+        Accepts ``{"events": [...], "severity": [...], "category": [...]}``;
+        query parameters may use comma separated values.
+
+        Raises:
+            ValueError: If an event type, severity or category id is invalid.
+        """
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError('Filters must be an object')
+
+        events = _values(data.get('events'))
+        unknown = [event for event in events if event not in EVENTS]
+        if unknown:
+            raise ValueError(f"Unknown event type '{unknown[0]}' (expected one of {', '.join(EVENTS)})")
+
+        severities = _values(data.get('severity'))
+        unknown = [severity for severity in severities if severity not in Alert.Severity.values]
+        if unknown:
+            raise ValueError(
+                f"Unknown severity '{unknown[0]}' (expected one of {', '.join(Alert.Severity.values)})"
+            )
+
+        try:
+            categories = [int(category) for category in _values(data.get('category'))]
+        except (TypeError, ValueError):
+            raise ValueError('category must contain integer ids')
+
+        return cls(frozenset(events), frozenset(severities), frozenset(categories))
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        """
+        Return whether a channel layer fleet event passes the filter.
+
+        The severity filter only applies to alert events; device status
+        changes carry no severity (restrict them with ``events``).
+        """
+        if self.events and event.get('event') not in self.events:
+            return False
+        if self.categories and event.get('category_id') not in self.categories:
+            return False
+        severity = event.get('severity')
+        if self.severities and severity is not None and severity not in self.severities:
+            return False
+        return True
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the filter as sent back to clients."""
+        return {
+            'events': sorted(self.events),
+            'severity': sorted(self.severities),
+            'category': sorted(self.categories),
+        }
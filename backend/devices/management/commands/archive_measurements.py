@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+"""
+Management command moving old measurements to the Parquet cold tier.
+
+Usage:
+  python manage.py archive_measurements [--older-than-days 90] [--root s3://bucket/prefix]
+  python manage.py archive_measurements --start 2024-01-01 --end 2024-02-01
+  python manage.py archive_measurements --dry-run
+
+Each UTC day is exported to its own file and deleted from the database in
+its own transaction, so an interrupted run can simply be started again.
+"""
+
+from datetime import datetime, time
+from datetime import timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date
+
+from devices.models import Measurement
+from devices.services.archive import (
+    ArchiveError,
+    archive_cutoff,
+    archive_older_than,
+    archive_range,
+    get_archive_root,
+)
+
+
+class Command(BaseCommand):
+    help = "Export closed measurement ranges to Parquet and delete them from the database"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=None,
+            help="Arquivar medições com mais de N dias completos (padrão: MEASUREMENT_HOT_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--start",
+            help="Data inicial (AAAA-MM-DD, inclusiva) de um intervalo explícito",
+        )
+        parser.add_argument(
+            "--end",
+            help="Data final (AAAA-MM-DD, exclusiva) de um intervalo explícito",
+        )
+        parser.add_argument(
+            "--root",
+            default=None,
+            help="Diretório local ou URI (s3://...) do arquivo (padrão: MEASUREMENT_ARCHIVE_ROOT)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas listar quantas medições seriam arquivadas por dia",
+        )
+
+    def handle(self, *args, **options) -> None:
+        start, end, days = self._window(options)
+        root = options["root"] or get_archive_root()
+
+        if options["dry_run"]:
+            self._dry_run(start, end, days)
+            return
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(f"ARQUIVANDO MEDIÇÕES EM {root}")
+        self.stdout.write("=" * 70)
+        try:
+            if start is not None:
+                archives = archive_range(start, end, root=root)
+            else:
+                archives = archive_older_than(days, root=root)
+        except (ArchiveError, ImproperlyConfigured) as exc:
+            raise CommandError(str(exc))
+        self._report(archives)
+
+    def _window(self, options) -> tuple[Optional[datetime], Optional[datetime], int]:
+        """Validate the options; return the explicit range (or None, None) and the retention in days."""
+        start = self._parse_day(options["start"], "--start")
+        end = self._parse_day(options["end"], "--end")
+        if (start is None) != (end is None):
+            raise CommandError("--start and --end must be used together")
+        if start is not None and start >= end:
+            raise CommandError("--start must be before --end")
+
+        days = options["older_than_days"]
+        if days is None:
+            days = settings.MEASUREMENT_HOT_RETENTION_DAYS
+        if days < 0:
+            raise CommandError("--older-than-days must be zero or positive")
+        return start, end, days
+
+    def _report(self, archives) -> None:
+        if not archives:
+            self.stdout.write("ℹ️  Nenhuma medição a arquivar")
+            return
+        for archive in archives:
+            self.stdout.write(f"  {archive.path}  linhas={archive.row_count}  bytes={archive.size_bytes}")
+        total = sum(archive.row_count for archive in archives)
+        self.stdout.write(f"✅ {total} medições arquivadas em {len(archives)} arquivo(s)")
+
+    def _parse_day(self, value: Optional[str], option: str) -> Optional[datetime]:
+        if value is None:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date for {option}: {value}")
+        return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+    def _dry_run(self, start: Optional[datetime], end: Optional[datetime], days: int) -> None:
+        measurements = Measurement.objects.all()
+        if start is not None:
+            measurements = measurements.filter(timestamp__gte=start, timestamp__lt=end)
+        else:
+            measurements = measurements.filter(timestamp__lt=archive_cutoff(days))
+        per_day = (
+            measurements.annotate(day=TruncDate('timestamp', tzinfo=dt_timezone.utc))
+            .values('day')
+            .annotate(rows=Count('id'))
+            .order_by('day')
+        )
+        total = 0
+        for entry in per_day:
+            self.stdout.write(f"  {entry['day']}  linhas={entry['rows']}")
+            total += entry['rows']
+        self.stdout.write(f"ℹ️  {total} medições seriam arquivadas (nada foi alterado)")
+
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+"""
+Management command to convert the measurement value column between storages.
+
+Usage:
+  python manage.py convert_measurement_storage --to float
+  python manage.py convert_measurement_storage --to decimal
+
+The current column type is read from the database. After converting, set
+MEASUREMENT_VALUE_STORAGE to the same mode and restart the application.
+Converting rewrites the whole measurements table.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from devices.fields import VALUE_STORAGE_DECIMAL, VALUE_STORAGE_FLOAT, VALUE_STORAGES, MeasurementValueField
+from devices.models import Measurement
+
+
+class Command(BaseCommand):
+    help = "Convert Measurement.value between NUMERIC(20, 10) and float8 storage"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--to",
+            required=True,
+            choices=VALUE_STORAGES,
+            dest="target",
+            help="Armazenamento de destino para Measurement.value",
+        )
+
+    def handle(self, *args, **options) -> None:
+        target: str = options["target"]
+        source = self._current_storage()
+        if source == target:
+            self.stdout.write(f"ℹ️  A coluna value já usa armazenamento '{target}'")
+        else:
+            self._alter(source, target)
+            self.stdout.write(f"✅ Coluna value convertida: {source} → {target}")
+
+        if settings.MEASUREMENT_VALUE_STORAGE != target:
+            self.stdout.write(
+                f"⚠️  Defina MEASUREMENT_VALUE_STORAGE={target} e reinicie a aplicação "
+                f"(atual: {settings.MEASUREMENT_VALUE_STORAGE})"
+            )
+
+    def _current_storage(self) -> str:
+        """Introspect the value column and return the storage it currently uses."""
+        table = Measurement._meta.db_table
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, table)
+        for column in description:
+            if column.name == 'value':
+                field_type = connection.introspection.get_field_type(column.type_code, column)
+                return VALUE_STORAGE_FLOAT if field_type == 'FloatField' else VALUE_STORAGE_DECIMAL
+        raise CommandError(f"Column 'value' not found in table {table}")
+
+    def _alter(self, source: str, target: str) -> None:
+        """Run the column type change through the schema editor."""
+        old_field = self._pinned_field(source)
+        new_field = self._pinned_field(target)
+        with connection.schema_editor(atomic=True) as editor:
+            editor.alter_field(Measurement, old_field, new_field, strict=True)
+
+    def _pinned_field(self, storage: str) -> MeasurementValueField:
+        """Return a copy of Measurement.value pinned to the given storage."""
+        field = Measurement._meta.get_field('value').clone()
+        field.storage = storage
+        field.set_attributes_from_name('value')
+        field.model = Measurement
+        return field
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+"""
+Management command generating a production-scale synthetic fleet.
+
+Usage:
+  python manage.py generate_fleet --devices 10000 --metrics 3 --days 90 --interval 300
+  python manage.py generate_fleet --devices 10000 --metrics temperature,humidity,co2 --days 35 --interval 900 --seed 7
+  python manage.py generate_fleet --devices 500 --days 7 --dry-run
+
+Series (drift, daily cycle, noise, gaps, threshold breaches) are generated
+with NumPy and loaded with binary COPY on PostgreSQL; the same seed and
+parameters always produce the same data. See devices.services.synthetic.
+"""
+
+import time
+from datetime import datetime, time as dt_time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from devices.models import Device
+from devices.services.synthetic import PROFILES, FleetSpec, SyntheticDataError, generate_fleet
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic fleet of devices with months of realistic measurements"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--devices", type=int, default=1000, help="Quantidade de dispositivos (padrão: 1000)")
+        parser.add_argument(
+            "--metrics",
+            default="3",
+            help=f"Número de métricas por dispositivo ou lista separada por vírgulas ({', '.join(PROFILES)})",
+        )
+        parser.add_argument("--days", type=int, default=30, help="Dias de histórico (padrão: 30)")
+        parser.add_argument("--interval", type=int, default=300, help="Segundos entre amostras (padrão: 300)")
+        parser.add_argument("--end", help="Data final (AAAA-MM-DD, exclusiva; padrão: hoje 00:00 UTC)")
+        parser.add_argument("--seed", type=int, default=42, help="Semente do gerador (padrão: 42)")
+        parser.add_argument("--gap-rate", type=float, default=0.02, help="Probabilidade de queda por dispositivo/dia")
+        parser.add_argument("--loss-rate", type=float, default=0.001, help="Probabilidade de amostra perdida")
+        parser.add_argument("--breach-rate", type=float, default=0.01, help="Probabilidade de violação por série/dia")
+        parser.add_argument("--batch-devices", type=int, default=1000, help="Dispositivos gerados por bloco")
+        parser.add_argument("--prefix", default="Synthetic", help="Prefixo dos nomes de dispositivos e categorias")
+        parser.add_argument("--replace", action="store_true", help="Apagar antes uma frota existente com o mesmo prefixo")
+        parser.add_argument("--no-alerts", action="store_true", help="Não criar alertas para as violações")
+        parser.add_argument("--dry-run", action="store_true", help="Apenas mostrar o volume planejado")
+
+    def handle(self, *args, **options) -> None:
+        try:
+            spec = FleetSpec(
+                devices=options["devices"],
+                metrics=self._metrics(options["metrics"]),
+                days=options["days"],
+                interval=options["interval"],
+                seed=options["seed"],
+                gap_rate=options["gap_rate"],
+                loss_rate=options["loss_rate"],
+                breach_rate=options["breach_rate"],
+                batch_devices=max(1, options["batch_devices"]),
+                prefix=options["prefix"],
+                **({"end": self._end(options["end"])} if options["end"] else {}),
+            )
+        except SyntheticDataError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write("=" * 70)
+        self.stdout.write("GERANDO FROTA SINTÉTICA")
+        self.stdout.write("=" * 70)
+        self.stdout.write(
+            f"  {spec.devices} dispositivos × {len(spec.metrics)} métricas ({', '.join(spec.metrics)}) × "
+            f"{spec.days} dias a cada {spec.interval}s"
+        )
+        self.stdout.write(f"  {spec.start:%Y-%m-%d} → {spec.end:%Y-%m-%d}  semente={spec.seed}")
+        self.stdout.write(f"  ~{spec.planned_rows:,} medições (antes das falhas simuladas)")
+        if options["dry_run"]:
+            self.stdout.write("ℹ️  Nada foi criado (--dry-run)")
+            return
+
+        existing = Device.objects.filter(name__startswith=f"{spec.prefix} ")
+        if existing.exists():
+            if not options["replace"]:
+                raise CommandError(
+                    f"Devices named '{spec.prefix} ...' already exist; use --replace or another --prefix"
+                )
+            deleted, _ = existing.delete()
+            self.stdout.write(f"🗑️  Frota anterior removida ({deleted} registros)")
+
+        started = time.perf_counter()
+        last_report = [started]
+
+        def progress(rows: int, planned: int) -> None:
+            now = time.perf_counter()
+            if now - last_report[0] >= 5:
+                last_report[0] = now
+                rate = rows / (now - started)
+                self.stdout.write(f"  {rows:,}/{planned:,} linhas ({rate:,.0f}/s)")
+
+        try:
+            counts = generate_fleet(spec, progress=progress, alerts=not options["no_alerts"])
+        except SyntheticDataError as exc:
+            raise CommandError(str(exc))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"✅ Dispositivos: {counts['devices']}")
+        self.stdout.write(
+            f"✅ Medições: {counts['measurements']:,} em {elapsed:.1f}s "
+            f"({counts['measurements'] / elapsed if elapsed else 0:,.0f}/s)"
+        )
+        self.stdout.write(f"✅ Entradas no catálogo de métricas: {counts['catalog']}")
+        self.stdout.write(f"✅ Alertas: {counts['alerts']}")
+
+    def _metrics(self, value: str) -> tuple[str, ...]:
+        if value.isdigit():
+            count = int(value)
+            if not 1 <= count <= len(PROFILES):
+                raise CommandError(f"--metrics must be between 1 and {len(PROFILES)}")
+            return tuple(PROFILES)[:count]
+        return tuple(name.strip() for name in value.split(",") if name.strip())
+
+    def _end(self, value: str) -> datetime:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date for --end: {value}")
+        return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""
+Management command reporting measurement index sizes and hot query plans.
+
+Usage:
+  python manage.py measurement_index_report [--device 1] [--analyze]
+  python manage.py measurement_index_report --create-brin
+  python manage.py measurement_index_report --drop-brin
+
+Replays the queries of the aggregated-data endpoint (rows + statistics) for
+several periods, with and without a metric filter, and prints their plans so
+redundant B-tree indexes can be dropped with confidence.
+"""
+
+from typing import Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from devices.models import Device, DeviceMetric, Measurement
+from devices.services.aggregation import compute_statistics, recent_measurements
+from devices.services.measurement_indexes import (
+    brin_supported,
+    create_brin_indexes,
+    drop_brin_indexes,
+    explain,
+    index_sizes,
+    table_size,
+)
+
+REPORT_PERIODS: tuple[str, ...] = ('last_24h', 'last_7d', 'all')
+
+
+class Command(BaseCommand):
+    help = "Report measurements index sizes and EXPLAIN plans of the aggregated-data queries"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--device",
+            type=int,
+            help="ID do dispositivo usado nas consultas (padrão: o que recebeu a medição mais recente)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Limite de medições, como no parâmetro 'limit' do endpoint (padrão: 100)",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Executar EXPLAIN (ANALYZE, BUFFERS) no PostgreSQL",
+        )
+        parser.add_argument(
+            "--create-brin",
+            action="store_true",
+            help="Criar os índices BRIN opcionais antes do relatório",
+        )
+        parser.add_argument(
+            "--drop-brin",
+            action="store_true",
+            help="Remover os índices BRIN opcionais antes do relatório",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["create_brin"] or options["drop_brin"]:
+            self._maintain_brin(create=options["create_brin"])
+
+        self._report_sizes()
+
+        device = self._pick_device(options["device"])
+        if device is None:
+            self.stdout.write("ℹ️  Nenhuma medição encontrada; planos não gerados")
+            return
+        self._report_plans(device, options["limit"], options["analyze"])
+
+    def _maintain_brin(self, create: bool) -> None:
+        if not brin_supported(connection):
+            raise CommandError("BRIN indexes require PostgreSQL")
+        if create:
+            names = create_brin_indexes(connection)
+            self.stdout.write(f"✅ Índices BRIN garantidos: {', '.join(names)}")
+        else:
+            names = drop_brin_indexes(connection)
+            self.stdout.write(f"✅ Índices BRIN removidos: {', '.join(names)}")
+
+    def _report_sizes(self) -> None:
+        self.stdout.write("=" * 70)
+        self.stdout.write("ÍNDICES DE measurements")
+        self.stdout.write("=" * 70)
+        sizes = table_size(connection)
+        if not sizes:
+            self.stdout.write(f"ℹ️  Tamanhos disponíveis apenas no PostgreSQL (banco atual: {connection.vendor})")
+            return
+        self.stdout.write(f"Heap: {_human(sizes['heap_bytes'])}   Total: {_human(sizes['total_bytes'])}")
+        for index in index_sizes(connection):
+            self.stdout.write(
+                f"  {index['name']:<32} {index['method']:<6} {_human(index['bytes']):>10}  scans={index['scans']}"
+            )
+
+    def _pick_device(self, device_id: Optional[int]) -> Optional[Device]:
+        if device_id is not None:
+            try:
+                return Device.objects.get(id=device_id)
+            except Device.DoesNotExist:
+                raise CommandError(f"Device {device_id} not found")
+        latest = Measurement.objects.order_by('-timestamp').values_list('device_id', flat=True).first()
+        return Device.objects.filter(id=latest).first() if latest is not None else None
+
+    def _report_plans(self, device: Device, limit: int, analyze: bool) -> None:
+        top_metric = (
+            DeviceMetric.objects.filter(device=device)
+            .order_by('-sample_count')
+            .values_list('metric', flat=True)
+            .first()
+        )
+        metrics: list[Optional[str]] = [None] if top_metric is None else [None, top_metric]
+        for period in REPORT_PERIODS:
+            for metric in metrics:
+                self._report_scenario(device, period, metric, limit, analyze)
+
+    def _report_scenario(self, device: Device, period: str, metric: Optional[str], limit: int, analyze: bool) -> None:
+        self.stdout.write("")
+        self.stdout.write("=" * 70)
+        self.stdout.write(f"device={device.id} period={period} metric={metric or '-'} limit={limit}")
+        self.stdout.write("=" * 70)
+
+        with CaptureQueriesContext(connection) as captured:
+            measurements_qs = recent_measurements(device, period=period, metric=metric, limit=limit)
+            compute_statistics(measurements_qs)
+            list(measurements_qs)
+
+        for query in captured.captured_queries:
+            self.stdout.write(f"-- {query['time']}s: {query['sql']}")
+            for line in explain(connection, query['sql'], analyze=analyze):
+                self.stdout.write(f"   {line}")
+
+
+def _human(size: Optional[int]) -> str:
+    """Format a byte count for display."""
+    if size is None:
+        return "-"
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
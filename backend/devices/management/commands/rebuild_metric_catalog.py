@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+"""
+Management command to rebuild the per-device metric catalog.
+
+Usage:
+  python manage.py rebuild_metric_catalog [--device 1 --device 2]
+
+The catalog is kept current by the ingestion endpoint; this is only needed
+after loading measurements through other paths (bulk imports, seeds).
+"""
+
+from django.core.management.base import BaseCommand
+
+from devices.services.metric_catalog import rebuild_metric_catalog
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-device metric catalog from stored measurements"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--device",
+            type=int,
+            action="append",
+            dest="devices",
+            help="ID do dispositivo a reconstruir (pode ser repetido; padrão: todos)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        device_ids: list[int] | None = options["devices"]
+        written = rebuild_metric_catalog(device_ids)
+        self.stdout.write(f"✅ Entradas de catálogo gravadas: {written}")
@@ -16,6 +16,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand
 
 from devices.models import Device, Category, Measurement, Alert
+from devices.services.metric_catalog import rebuild_metric_catalog
 
 
 DEFAULT_DEVICE_COUNT = 10
@@ -188,6 +189,7 @@ class Command(BaseCommand):
                 )
                 total += 1
 
+        rebuild_metric_catalog([device.id for device in devices])
         self.stdout.write(f"✅ Medições criadas: {total}")
 
     def _create_alerts(self, devices: list[Device]) -> None:
@@ -0,0 +1,135 @@
+"""
+Runtime metrics of ingestion, alerting and WebSocket streams.
+
+Registered in core.metrics.REGISTRY and exported on ``/metrics``:
+
+- ingestion: measurements received per result and request duration;
+- alerting: threshold check duration and violations;
+- WebSocket: open connections, connects/disconnects (with close code),
+  frames sent and group subscriptions per consumer (per group as well with
+  METRICS_WS_GROUP_LABELS, one series per device, so off by default);
+- channel layer: ``group_send`` duration and publish-to-consumer delay of
+  measurement updates (from the ``published_at`` stamp of the message);
+- send queues (devices.backpressure) and, when the layer keeps them
+  (core.layers), channel layer counters, read at collection time.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from core.metrics import COUNTER, Counter, Gauge, Histogram, register_callback
+
+from . import backpressure
+
+MEASUREMENTS_INGESTED = Counter(
+    'measurements_ingested_total', 'Measurements received by the ingestion endpoint', ['result']
+)
+INGEST_SECONDS = Histogram('measurement_ingest_seconds', 'Duration of measurement ingestion requests')
+
+ALERT_CHECK_SECONDS = Histogram('alert_check_seconds', 'Duration of threshold checks (check_for_alert)')
+THRESHOLD_VIOLATIONS = Counter('threshold_violations_total', 'Measurements outside their threshold')
+
+WS_CONNECTIONS = Gauge('ws_connections', 'Open WebSocket connections', ['consumer'])
+WS_CONNECTS = Counter('ws_connects_total', 'Accepted WebSocket connections', ['consumer'])
+WS_DISCONNECTS = Counter('ws_disconnects_total', 'Closed WebSocket connections', ['consumer', 'code'])
+WS_FRAMES_SENT = Counter('ws_frames_sent_total', 'Frames sent to WebSocket clients', ['consumer'])
+WS_SUBSCRIPTIONS = Gauge('ws_subscriptions', 'Channel layer group memberships of open connections', ['consumer'])
+WS_GROUP_SUBSCRIBERS = Gauge(
+    'ws_group_subscribers', 'Connections subscribed to each group (METRICS_WS_GROUP_LABELS)', ['group']
+)
+
+GROUP_SEND_SECONDS = Histogram('channel_layer_group_send_seconds', 'Duration of channel layer group_send calls', ['event'])
+DELIVERY_SECONDS = Histogram(
+    'channel_layer_delivery_seconds', 'Delay between publishing a measurement update and its handling by a consumer'
+)
+
+
+def _send_queue_totals() -> dict[str, int]:
+    totals = backpressure.metrics()
+    return {outcome: totals[outcome] for outcome in ('queued', 'sent', 'dropped', 'coalesced', 'evicted')}
+
+
+def _channel_layer_counters() -> dict[str, int]:
+    layer = get_channel_layer()
+    return dict(layer.metrics()) if hasattr(layer, 'metrics') else {}
+
+
+register_callback('ws_send_queue_frames_total', 'Frames through WebSocket send queues per outcome',
+                  _send_queue_totals, kind=COUNTER, labelnames=['outcome'])
+register_callback('ws_send_queue_depth', 'Frames waiting in WebSocket send queues', lambda: backpressure.metrics()['depth'])
+register_callback('channel_layer_stats', 'Counters and sizes reported by the in-process channel layer',
+                  _channel_layer_counters, labelnames=['stat'])
+
+
+def stamp(message: dict[str, Any]) -> dict[str, Any]:
+    """Add the publishing time read back by ``observe_delivery``."""
+    message['published_at'] = time.time()
+    return message
+
+
+def observe_delivery(event: dict[str, Any]) -> None:
+    published_at = event.get('published_at')
+    if published_at is not None:
+        DELIVERY_SECONDS.observe(max(0.0, time.time() - published_at))
+
+
+class ConnectionMetricsMixin:
+    """
+    Consumer mixin counting connections, frames and group subscriptions.
+
+    Consumers join and leave channel layer groups through ``join_group()``
+    / ``leave_group()``; memberships left over are released on disconnect.
+    """
+
+    _metrics_accepted: bool = False
+
+    @property
+    def _metrics_label(self) -> str:
+        return type(self).__name__
+
+    async def accept(self, subprotocol=None, headers=None):
+        await super().accept(subprotocol, headers)
+        self._metrics_accepted = True
+        WS_CONNECTS.inc(consumer=self._metrics_label)
+        WS_CONNECTIONS.inc(consumer=self._metrics_label)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        await super().send(text_data, bytes_data, close)
+        if text_data is not None or bytes_data is not None:
+            WS_FRAMES_SENT.inc(consumer=self._metrics_label)
+
+    async def join_group(self, group: str) -> None:
+        await self.channel_layer.group_add(group, self.channel_name)
+        groups = self.__dict__.setdefault('_metrics_groups', set())
+        if group not in groups:
+            groups.add(group)
+            self._count_subscription(group, 1)
+
+    async def leave_group(self, group: str) -> None:
+        await self.channel_layer.group_discard(group, self.channel_name)
+        groups = self.__dict__.get('_metrics_groups', set())
+        if group in groups:
+            groups.discard(group)
+            self._count_subscription(group, -1)
+
+    def _count_subscription(self, group: str, delta: int) -> None:
+        WS_SUBSCRIPTIONS.inc(delta, consumer=self._metrics_label)
+        if settings.METRICS_WS_GROUP_LABELS:
+            WS_GROUP_SUBSCRIBERS.inc(delta, group=group)
+            if not WS_GROUP_SUBSCRIBERS.value(group=group):
+                WS_GROUP_SUBSCRIBERS.remove(group=group)
+
+    async def websocket_disconnect(self, message):
+        try:
+            await super().websocket_disconnect(message)
+        finally:
+            for group in self.__dict__.pop('_metrics_groups', set()):
+                self._count_subscription(group, -1)
+            if self._metrics_accepted:
+                self._metrics_accepted = False
+                WS_CONNECTIONS.dec(consumer=self._metrics_label)
+                WS_DISCONNECTS.inc(consumer=self._metrics_label, code=message.get('code', ''))
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_device_metrics(apps, schema_editor):
+    """Populate the metric catalog from the measurements already stored."""
+    Measurement = apps.get_model('devices', 'Measurement')
+    DeviceMetric = apps.get_model('devices', 'DeviceMetric')
+    # Unit of the newest sample (not the alphabetically largest one)
+    newest_unit = (
+        Measurement.objects
+        .filter(device_id=models.OuterRef('device_id'), metric=models.OuterRef('metric'))
+        .order_by('-timestamp')
+        .values('unit')[:1]
+    )
+    rows = (
+        Measurement.objects
+        .order_by()
+        .values('device_id', 'metric')
+        .annotate(
+            unit=models.Subquery(newest_unit),
+            first_seen=models.Min('timestamp'),
+            last_seen=models.Max('timestamp'),
+            sample_count=models.Count('id'),
+        )
+    )
+    DeviceMetric.objects.bulk_create(
+        (DeviceMetric(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0005_measurementthreshold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceMetric',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('metric', models.CharField(help_text='Metric name (e.g., temperature, humidity, pressure)', max_length=100)),
+                ('unit', models.CharField(help_text='Last unit reported for the metric', max_length=50)),
+                ('first_seen', models.DateTimeField(help_text='Timestamp of the oldest sample seen for the metric')),
+                ('last_seen', models.DateTimeField(help_text='Timestamp of the newest sample seen for the metric')),
+                ('sample_count', models.PositiveBigIntegerField(default=0, help_text='Number of samples ingested for the metric')),
+                ('device', models.ForeignKey(help_text='Device that reports this metric', on_delete=django.db.models.deletion.CASCADE, related_name='metric_catalog', to='devices.device')),
+            ],
+            options={
+                'verbose_name': 'Device Metric',
+                'verbose_name_plural': 'Device Metrics',
+                'db_table': 'device_metrics',
+                'ordering': ['metric'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='devicemetric',
+            constraint=models.UniqueConstraint(fields=('device', 'metric'), name='unique_device_metric'),
+        ),
+        migrations.RunPython(backfill_device_metrics, migrations.RunPython.noop),
+    ]
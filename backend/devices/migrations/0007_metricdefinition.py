@@ -0,0 +1,89 @@
+# Generated manually to intern measurement metric/unit strings
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def intern_measurement_metrics(apps, schema_editor):
+    """Create one definition per distinct (metric, unit) and point measurements at it."""
+    Measurement = apps.get_model('devices', 'Measurement')
+    MetricDefinition = apps.get_model('devices', 'MetricDefinition')
+    pairs = (
+        Measurement.objects
+        .order_by()
+        .values_list('metric', 'unit')
+        .distinct()
+    )
+    for metric, unit in pairs.iterator():
+        definition, _ = MetricDefinition.objects.get_or_create(name=metric, unit=unit)
+        Measurement.objects.filter(metric=metric, unit=unit).update(definition=definition)
+
+
+def restore_measurement_metrics(apps, schema_editor):
+    """Copy definition strings back onto measurements."""
+    Measurement = apps.get_model('devices', 'Measurement')
+    MetricDefinition = apps.get_model('devices', 'MetricDefinition')
+    for definition in MetricDefinition.objects.iterator():
+        Measurement.objects.filter(definition=definition).update(
+            metric=definition.name,
+            unit=definition.unit,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0006_devicemetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricDefinition',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Type of measurement/metric (e.g., temperature, humidity, pressure)', max_length=100)),
+                ('unit', models.CharField(help_text='Unit of measurement (e.g., °C, %, hPa, m/s)', max_length=50)),
+            ],
+            options={
+                'verbose_name': 'Metric Definition',
+                'verbose_name_plural': 'Metric Definitions',
+                'db_table': 'metric_definitions',
+                'ordering': ['name', 'unit'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricdefinition',
+            constraint=models.UniqueConstraint(fields=('name', 'unit'), name='unique_metric_definition'),
+        ),
+        migrations.AddField(
+            model_name='measurement',
+            name='definition',
+            field=models.ForeignKey(db_index=False, help_text='Metric name and unit of this measurement', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='measurements', to='devices.metricdefinition'),
+        ),
+        migrations.RunPython(intern_measurement_metrics, restore_measurement_metrics),
+        migrations.RemoveIndex(
+            model_name='measurement',
+            name='meas_metric_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='measurement',
+            name='meas_device_metric_idx',
+        ),
+        migrations.RemoveField(
+            model_name='measurement',
+            name='metric',
+        ),
+        migrations.RemoveField(
+            model_name='measurement',
+            name='unit',
+        ),
+        migrations.AlterField(
+            model_name='measurement',
+            name='definition',
+            field=models.ForeignKey(db_index=False, help_text='Metric name and unit of this measurement', on_delete=django.db.models.deletion.PROTECT, related_name='measurements', to='devices.metricdefinition'),
+        ),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['device', 'definition'], name='meas_device_definition_idx'),
+        ),
+    ]
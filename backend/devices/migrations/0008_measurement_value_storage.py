@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:39
+#
+# The column becomes NUMERIC(20, 10) or float8 according to MEASUREMENT_VALUE_STORAGE
+# at migrate time. Later switches go through `manage.py convert_measurement_storage`.
+
+import devices.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0007_metricdefinition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='measurement',
+            name='value',
+            field=devices.fields.MeasurementValueField(decimal_places=10, help_text='Measurement value with precision', max_digits=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated manually for optional BRIN indexes on measurements
+#
+# The indexes are only created on PostgreSQL when MEASUREMENT_BRIN_INDEXES is
+# enabled at migrate time; they can be added later with
+# `manage.py measurement_index_report --create-brin`.
+
+from django.conf import settings
+from django.db import migrations
+
+from devices.services.measurement_indexes import create_brin_indexes, drop_brin_indexes
+
+
+def add_brin_indexes(apps, schema_editor):
+    if getattr(settings, 'MEASUREMENT_BRIN_INDEXES', False):
+        create_brin_indexes(schema_editor.connection)
+
+
+def remove_brin_indexes(apps, schema_editor):
+    drop_brin_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('devices', '0008_measurement_value_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_brin_indexes, remove_brin_indexes),
+    ]
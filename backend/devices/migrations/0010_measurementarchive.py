@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0009_measurement_brin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementArchive',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('period_start', models.DateTimeField(db_index=True, help_text='Inclusive start of the archived time range')),
+                ('period_end', models.DateTimeField(db_index=True, help_text='Exclusive end of the archived time range')),
+                ('path', models.CharField(help_text='Parquet file path relative to the archive root', max_length=1024)),
+                ('row_count', models.PositiveBigIntegerField(help_text='Number of measurements stored in the file')),
+                ('size_bytes', models.PositiveBigIntegerField(blank=True, help_text='Size of the Parquet file in bytes', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the range was archived')),
+            ],
+            options={
+                'verbose_name': 'Measurement Archive',
+                'verbose_name_plural': 'Measurement Archives',
+                'db_table': 'measurement_archives',
+                'ordering': ['-period_start'],
+            },
+        ),
+    ]
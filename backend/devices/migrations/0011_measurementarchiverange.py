@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_existing_archives(apps, schema_editor):
+    """Record the device ranges of the files archived before the index existed."""
+    MeasurementArchive = apps.get_model('devices', 'MeasurementArchive')
+    MeasurementArchiveRange = apps.get_model('devices', 'MeasurementArchiveRange')
+    Device = apps.get_model('devices', 'Device')
+    if not MeasurementArchive.objects.exists():
+        return
+
+    from devices.services.archive import _pyarrow, device_ranges, get_filesystem
+
+    pa = _pyarrow()
+    filesystem, base = get_filesystem()
+    device_ids = set(Device.objects.values_list('id', flat=True))
+    for archive in MeasurementArchive.objects.iterator():
+        table = pa.parquet.read_table(
+            f"{base.rstrip('/')}/{archive.path}",
+            filesystem=filesystem,
+            columns=['id', 'device_id', 'timestamp'],
+        )
+        MeasurementArchiveRange.objects.bulk_create(
+            MeasurementArchiveRange(
+                archive=archive, device_id=device_id,
+                first_timestamp=first, last_timestamp=last, row_count=count,
+            )
+            for device_id, (first, last, count) in device_ranges(table).items()
+            if device_id in device_ids
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0010_measurementarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementArchiveRange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('first_timestamp', models.DateTimeField(help_text='Timestamp of the oldest archived sample of the device')),
+                ('last_timestamp', models.DateTimeField(help_text='Timestamp of the newest archived sample of the device')),
+                ('row_count', models.PositiveBigIntegerField(help_text='Number of measurements of the device in the file')),
+                ('archive', models.ForeignKey(help_text='Archive file holding the measurements', on_delete=django.db.models.deletion.CASCADE, related_name='device_ranges', to='devices.measurementarchive')),
+                ('device', models.ForeignKey(db_index=False, help_text='Device whose measurements were archived', on_delete=django.db.models.deletion.CASCADE, related_name='archived_ranges', to='devices.device')),
+            ],
+            options={
+                'verbose_name': 'Measurement Archive Range',
+                'verbose_name_plural': 'Measurement Archive Ranges',
+                'db_table': 'measurement_archive_ranges',
+                'ordering': ['-last_timestamp'],
+                'indexes': [models.Index(fields=['device', 'last_timestamp'], name='archive_range_device_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='measurementarchiverange',
+            constraint=models.UniqueConstraint(fields=('archive', 'device'), name='unique_archive_device'),
+        ),
+        migrations.RunPython(index_existing_archives, migrations.RunPython.noop),
+    ]
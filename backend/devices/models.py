@@ -4,10 +4,15 @@ Device model definition.
 Following Django & Python best practices with type hinting,
 UUIDField for public_id, and clean model structure.
 """
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
+from collections import OrderedDict
+from typing import Optional
+import threading
 import uuid
 
+from .fields import MeasurementValueField
+
 
 class Category(models.Model):
     """
@@ -169,6 +174,108 @@ class Device(models.Model):
         return f"<Device: {self.name} (status={self.status}, public_id={self.public_id}, category_id={self.category_id})>"
 
 
+class MetricDefinitionManager(models.Manager):
+    """
+    Manager resolving (name, unit) pairs to interned MetricDefinition rows.
+    
+    Resolved definitions are kept in a process-wide LRU cache of
+    ``cache_size`` entries so that ingestion does not query the lookup table
+    for already known metrics, while clients reporting ever new metric
+    names cannot grow it without bound. Entries are only cached once the
+    transaction that read or created them commits, so rolled back
+    definitions never leak into the cache.
+    """
+    
+    cache_size: int = 1024
+    _cache: OrderedDict[tuple[str, str], 'MetricDefinition'] = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    def resolve(self, name: str, unit: str) -> 'MetricDefinition':
+        """Return the definition for a metric name and unit, creating it on first use."""
+        key = (name, unit)
+        with self._cache_lock:
+            definition = self._cache.get(key)
+            if definition is not None:
+                self._cache.move_to_end(key)
+                return definition
+        
+        definition, _created = self.get_or_create(name=name, unit=unit)
+        transaction.on_commit(lambda: self._remember(key, definition), using=self.db)
+        return definition
+    
+    @classmethod
+    def _remember(cls, key: tuple[str, str], definition: 'MetricDefinition') -> None:
+        with cls._cache_lock:
+            cls._cache[key] = definition
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.cache_size:
+                cls._cache.popitem(last=False)
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop every cached definition (e.g. after definitions were deleted)."""
+        with cls._cache_lock:
+            cls._cache.clear()
+
+
+class MetricDefinition(models.Model):
+    """
+    MetricDefinition model interning metric name and unit pairs.
+    
+    Measurements reference a definition through an integer foreign key
+    instead of repeating both strings on every row.
+    
+    Fields:
+        - id: Auto-generated primary key (AutoField)
+        - name: Metric name (CharField)
+        - unit: Unit of measurement (CharField)
+    """
+    
+    # Primary key (a 4-byte integer: clients may report new metric names at any
+    # time, so a smallint key could run out after 32767 definitions)
+    id = models.AutoField(primary_key=True)
+    
+    name = models.CharField(
+        max_length=100,
+        help_text=_('Type of measurement/metric (e.g., temperature, humidity, pressure)')
+    )
+    
+    unit = models.CharField(
+        max_length=50,
+        help_text=_('Unit of measurement (e.g., °C, %, hPa, m/s)')
+    )
+    
+    objects = MetricDefinitionManager()
+    
+    class Meta:
+        db_table: str = 'metric_definitions'
+        verbose_name: str = _('Metric Definition')
+        verbose_name_plural: str = _('Metric Definitions')
+        ordering: list[str] = ['name', 'unit']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'unit'],
+                name='unique_metric_definition',
+            )
+        ]
+    
+    def __str__(self) -> str:
+        """Return string representation of MetricDefinition."""
+        return f"{self.name} ({self.unit})"
+    
+    def __repr__(self) -> str:
+        """Return developer-friendly representation."""
+        return f"<MetricDefinition: {self.name} unit={self.unit} (id={self.id})>"
+
+
+class MeasurementManager(models.Manager):
+    """Manager joining the interned metric definition on every read."""
+    
+    def get_queryset(self) -> models.QuerySet:
+        """Return measurements with their definition loaded in the same query."""
+        return super().get_queryset().select_related('definition')
+
+
 class Measurement(models.Model):
     """
     Measurement model representing precision data from devices.
@@ -176,10 +283,13 @@ class Measurement(models.Model):
     Fields:
         - id: Auto-generated primary key (BigAutoField)
         - device: Foreign key to Device model
-        - metric: Type of measurement/metric (CharField)
-        - value: Measurement value (DecimalField for precision)
-        - unit: Unit of measurement (CharField)
+        - definition: Foreign key to the interned MetricDefinition (metric + unit)
+        - value: Measurement value (Decimal or float, see MEASUREMENT_VALUE_STORAGE)
         - timestamp: When the measurement was taken (DateTimeField)
+    
+    The ``metric`` and ``unit`` properties expose the definition as strings and
+    may be passed to the constructor; the definition is resolved on save().
+    Querysets must filter through ``definition__name`` / ``definition__unit``.
     """
     
     # Primary key
@@ -194,30 +304,33 @@ class Measurement(models.Model):
         help_text=_('Device that generated this measurement')
     )
     
-    # Measurement data
-    metric = models.CharField(
-        max_length=100,
-        db_index=True,
-        help_text=_('Type of measurement/metric (e.g., temperature, humidity, pressure)')
+    # Metric and unit (interned; covered by the device + definition index)
+    definition = models.ForeignKey(
+        MetricDefinition,
+        on_delete=models.PROTECT,
+        related_name='measurements',
+        db_index=False,
+        help_text=_('Metric name and unit of this measurement')
     )
     
-    value = models.DecimalField(
+    # NUMERIC(20, 10) or float8 depending on MEASUREMENT_VALUE_STORAGE
+    value = MeasurementValueField(
         max_digits=20,
         decimal_places=10,
         help_text=_('Measurement value with precision')
     )
     
-    unit = models.CharField(
-        max_length=50,
-        help_text=_('Unit of measurement (e.g., °C, %, hPa, m/s)')
-    )
-    
     # Timestamp
     timestamp = models.DateTimeField(
         db_index=True,
         help_text=_('When the measurement was taken')
     )
     
+    objects = MeasurementManager()
+    
+    # (name, unit) assigned through the properties and not yet resolved
+    _pending_definition: Optional[tuple[str, str]] = None
+    
     class Meta:
         db_table: str = 'measurements'
         verbose_name: str = _('Measurement')
@@ -225,11 +338,53 @@ class Measurement(models.Model):
         ordering: list[str] = ['-timestamp']
         indexes: list[models.Index] = [
             models.Index(fields=['device', 'timestamp'], name='meas_device_timestamp_idx'),
-            models.Index(fields=['metric'], name='meas_metric_idx'),
             models.Index(fields=['timestamp'], name='meas_timestamp_idx'),
-            models.Index(fields=['device', 'metric'], name='meas_device_metric_idx'),
+            models.Index(fields=['device', 'definition'], name='meas_device_definition_idx'),
         ]
     
+    @property
+    def metric(self) -> str:
+        """Metric name of the measurement."""
+        if self._pending_definition is not None:
+            return self._pending_definition[0]
+        return self.definition.name
+    
+    @metric.setter
+    def metric(self, value: str) -> None:
+        self._stage_definition(name=value)
+    
+    @property
+    def unit(self) -> str:
+        """Unit of the measurement."""
+        if self._pending_definition is not None:
+            return self._pending_definition[1]
+        return self.definition.unit
+    
+    @unit.setter
+    def unit(self, value: str) -> None:
+        self._stage_definition(unit=value)
+    
+    def _stage_definition(self, name: Optional[str] = None, unit: Optional[str] = None) -> None:
+        """Remember a new name and/or unit until the definition is resolved on save."""
+        if self._pending_definition is not None:
+            current_name, current_unit = self._pending_definition
+        elif self.definition_id is not None:
+            current_name, current_unit = self.definition.name, self.definition.unit
+        else:
+            current_name, current_unit = '', ''
+        self._pending_definition = (
+            name if name is not None else current_name,
+            unit if unit is not None else current_unit,
+        )
+    
+    def save(self, *args, **kwargs) -> None:
+        """Resolve a pending metric name/unit to its definition before saving."""
+        if self._pending_definition is not None:
+            name, unit = self._pending_definition
+            self.definition = MetricDefinition.objects.resolve(name, unit)
+            self._pending_definition = None
+        super().save(*args, **kwargs)
+    
     def __str__(self) -> str:
         """Return string representation of Measurement."""
         return f"{self.metric}={self.value} {self.unit} @ {self.device.name} ({self.timestamp})"
@@ -442,4 +597,229 @@ class MeasurementThreshold(models.Model):
         return (
             f"<MeasurementThreshold: metric={self.metric_name} min={self.min_limit} "
             f"max={self.max_limit} active={self.is_active} device_id={self.device_id}>"
-        )
\ No newline at end of file
+        )
+
+
+class DeviceMetric(models.Model):
+    """
+    DeviceMetric model representing the per-device metric catalog.
+    
+    One row per (device, metric) pair, maintained during ingestion so that
+    the list of available metrics can be answered without scanning measurements.
+    
+    Fields:
+        - id: Auto-generated primary key (BigAutoField)
+        - device: Foreign key to Device model
+        - metric: Metric name as reported by the device (CharField)
+        - unit: Last unit reported for the metric (CharField)
+        - first_seen: Timestamp of the oldest sample seen (DateTimeField)
+        - last_seen: Timestamp of the newest sample seen (DateTimeField)
+        - sample_count: Number of samples ingested for the metric (PositiveBigIntegerField)
+    """
+    
+    # Primary key
+    id = models.BigAutoField(primary_key=True)
+    
+    # Device relationship
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='metric_catalog',
+        db_index=True,
+        help_text=_('Device that reports this metric')
+    )
+    
+    # Metric identification
+    metric = models.CharField(
+        max_length=100,
+        help_text=_('Metric name (e.g., temperature, humidity, pressure)')
+    )
+    
+    unit = models.CharField(
+        max_length=50,
+        help_text=_('Last unit reported for the metric')
+    )
+    
+    # Sighting statistics
+    first_seen = models.DateTimeField(
+        help_text=_('Timestamp of the oldest sample seen for the metric')
+    )
+    
+    last_seen = models.DateTimeField(
+        help_text=_('Timestamp of the newest sample seen for the metric')
+    )
+    
+    sample_count = models.PositiveBigIntegerField(
+        default=0,
+        help_text=_('Number of samples ingested for the metric')
+    )
+    
+    class Meta:
+        db_table: str = 'device_metrics'
+        verbose_name: str = _('Device Metric')
+        verbose_name_plural: str = _('Device Metrics')
+        ordering: list[str] = ['metric']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device', 'metric'],
+                name='unique_device_metric',
+            )
+        ]
+    
+    def __str__(self) -> str:
+        """Return string representation of DeviceMetric."""
+        return f"{self.metric} ({self.unit}) @ device {self.device_id}"
+    
+    def __repr__(self) -> str:
+        """Return developer-friendly representation."""
+        return (
+            f"<DeviceMetric: metric={self.metric} unit={self.unit} "
+            f"samples={self.sample_count} device_id={self.device_id}>"
+        )
+
+
+class MeasurementArchive(models.Model):
+    """
+    MeasurementArchive model recording measurements moved to cold storage.
+    
+    Each row points to one Parquet file holding every measurement of a closed
+    time range that was exported and then removed from the database.
+    
+    Fields:
+        - id: Auto-generated primary key (BigAutoField)
+        - period_start: Inclusive lower bound of the archived range (DateTimeField)
+        - period_end: Exclusive upper bound of the archived range (DateTimeField)
+        - path: Parquet file location relative to the archive root (CharField)
+        - row_count: Number of measurements in the file (PositiveBigIntegerField)
+        - size_bytes: File size in bytes (PositiveBigIntegerField)
+        - created_at: Archival timestamp (DateTimeField)
+    """
+    
+    # Primary key
+    id = models.BigAutoField(primary_key=True)
+    
+    # Archived range [period_start, period_end)
+    period_start = models.DateTimeField(
+        db_index=True,
+        help_text=_('Inclusive start of the archived time range')
+    )
+    
+    period_end = models.DateTimeField(
+        db_index=True,
+        help_text=_('Exclusive end of the archived time range')
+    )
+    
+    # File information
+    path = models.CharField(
+        max_length=1024,
+        help_text=_('Parquet file path relative to the archive root')
+    )
+    
+    row_count = models.PositiveBigIntegerField(
+        help_text=_('Number of measurements stored in the file')
+    )
+    
+    size_bytes = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text=_('Size of the Parquet file in bytes')
+    )
+    
+    # Timestamps
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_('When the range was archived')
+    )
+    
+    class Meta:
+        db_table: str = 'measurement_archives'
+        verbose_name: str = _('Measurement Archive')
+        verbose_name_plural: str = _('Measurement Archives')
+        ordering: list[str] = ['-period_start']
+    
+    def __str__(self) -> str:
+        """Return string representation of MeasurementArchive."""
+        return f"{self.path} ({self.row_count} rows)"
+    
+    def __repr__(self) -> str:
+        """Return developer-friendly representation."""
+        return (
+            f"<MeasurementArchive: {self.period_start} - {self.period_end} "
+            f"rows={self.row_count} path={self.path}>"
+        )
+
+
+class MeasurementArchiveRange(models.Model):
+    """
+    MeasurementArchiveRange model indexing the devices of each archive file.
+    
+    One row per (archive, device) pair with the timestamps of the device's
+    oldest and newest archived samples, so cold reads only open the files
+    holding rows of the requested device and period.
+    
+    Fields:
+        - id: Auto-generated primary key (BigAutoField)
+        - archive: Foreign key to MeasurementArchive model
+        - device: Foreign key to Device model
+        - first_timestamp: Timestamp of the oldest archived sample (DateTimeField)
+        - last_timestamp: Timestamp of the newest archived sample (DateTimeField)
+        - row_count: Number of measurements of the device in the file (PositiveBigIntegerField)
+    """
+    
+    # Primary key
+    id = models.BigAutoField(primary_key=True)
+    
+    # Relationships
+    archive = models.ForeignKey(
+        MeasurementArchive,
+        on_delete=models.CASCADE,
+        related_name='device_ranges',
+        help_text=_('Archive file holding the measurements')
+    )
+    
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='archived_ranges',
+        db_index=False,
+        help_text=_('Device whose measurements were archived')
+    )
+    
+    # Archived samples of the device, both bounds inclusive
+    first_timestamp = models.DateTimeField(
+        help_text=_('Timestamp of the oldest archived sample of the device')
+    )
+    
+    last_timestamp = models.DateTimeField(
+        help_text=_('Timestamp of the newest archived sample of the device')
+    )
+    
+    row_count = models.PositiveBigIntegerField(
+        help_text=_('Number of measurements of the device in the file')
+    )
+    
+    class Meta:
+        db_table: str = 'measurement_archive_ranges'
+        verbose_name: str = _('Measurement Archive Range')
+        verbose_name_plural: str = _('Measurement Archive Ranges')
+        ordering: list[str] = ['-last_timestamp']
+        indexes: list[models.Index] = [
+            models.Index(fields=['device', 'last_timestamp'], name='archive_range_device_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['archive', 'device'],
+                name='unique_archive_device',
+            )
+        ]
+    
+    def __str__(self) -> str:
+        """Return string representation of MeasurementArchiveRange."""
+        return f"device {self.device_id} in {self.archive_id} ({self.row_count} rows)"
+    
+    def __repr__(self) -> str:
+        """Return developer-friendly representation."""
+        return (
+            f"<MeasurementArchiveRange: device_id={self.device_id} archive_id={self.archive_id} "
+            f"{self.first_timestamp} - {self.last_timestamp} rows={self.row_count}>"
+        )
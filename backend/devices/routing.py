@@ -12,5 +12,15 @@ websocket_urlpatterns = [
         consumers.DeviceConsumer.as_asgi(), 
         name='device_websocket'
     ),
+    re_path(
+        r'ws/devices/$',
+        consumers.MultiplexDeviceConsumer.as_asgi(),
+        name='devices_websocket'
+    ),
+    re_path(
+        r'ws/fleet/$',
+        consumers.FleetEventConsumer.as_asgi(),
+        name='fleet_websocket'
+    ),
 ]
 
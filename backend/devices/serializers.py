@@ -7,7 +7,8 @@ Following Django REST Framework best practices:
 """
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Category, Device, Measurement, Alert, MeasurementThreshold
+from .models import Category, Device, Measurement, Alert, MeasurementThreshold, DeviceMetric
+from .fields import uses_float_storage
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -96,8 +97,14 @@ class MeasurementSerializer(serializers.ModelSerializer):
     
     Handles data validation and representation for Measurement resources.
     Used for ingesting measurement data from devices.
+    
+    ``metric`` and ``unit`` are exposed as plain strings; they are stored
+    through the interned MetricDefinition of the measurement.
     """
     
+    metric = serializers.CharField(max_length=100)
+    unit = serializers.CharField(max_length=50)
+    
     class Meta:
         model = Measurement
         fields: list[str] = [
@@ -110,6 +117,16 @@ class MeasurementSerializer(serializers.ModelSerializer):
         ]
         read_only_fields: list[str] = ['id']
     
+    def get_fields(self) -> dict:
+        """Represent values as JSON numbers when they are stored as floats."""
+        fields = super().get_fields()
+        if uses_float_storage():
+            fields['value'] = serializers.FloatField()
+        # The ingestion view passes the device it already loaded: do not look it up again
+        if 'device' in self.context:
+            fields['device'].read_only = True
+        return fields
+    
     def validate_metric(self, value: str) -> str:
         """Validate metric name."""
         if not value or not value.strip():
@@ -135,6 +152,25 @@ class MeasurementSerializer(serializers.ModelSerializer):
         return value
 
 
+class DeviceMetricSerializer(serializers.ModelSerializer):
+    """
+    Serializer for DeviceMetric model.
+    
+    Read-only representation of a device metric catalog entry.
+    """
+    
+    class Meta:
+        model = DeviceMetric
+        fields: list[str] = [
+            'metric',
+            'unit',
+            'first_seen',
+            'last_seen',
+            'sample_count',
+        ]
+        read_only_fields: list[str] = fields
+
+
 class AggregatedDataSerializer(serializers.Serializer):
     """
     Serializer for aggregated measurement data endpoint.
@@ -0,0 +1,137 @@
+"""
+Aggregation service for device measurement windows.
+
+Builds the queries behind the aggregated-data endpoint so they can be reused
+outside the view (e.g. to inspect their plans), and merges archived (cold
+tier) measurements when the requested window reaches them.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Union
+
+from django.db.models import Avg, Max, Min
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from devices.fields import value_output_field
+from devices.models import Device, Measurement
+from devices.services.archive import archive_horizon, read_archived_measurements
+
+# Supported period filters and their window length ('all' has no lower bound)
+PERIODS: dict[str, Optional[timedelta]] = {
+    'last_24h': timedelta(hours=24),
+    'last_7d': timedelta(days=7),
+    'last_30d': timedelta(days=30),
+    'all': None,
+}
+
+
+def get_period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Return the lower timestamp bound of a period, or None for unknown/'all'."""
+    window = PERIODS.get(period)
+    if window is None:
+        return None
+    return (now or timezone.now()) - window
+
+
+def recent_measurements(
+    device: Device,
+    period: str = 'all',
+    metric: Optional[str] = None,
+    limit: int = 100,
+) -> QuerySet[Measurement]:
+    """
+    Return the newest measurements of a device within a period.
+
+    Args:
+        device: Device whose measurements are returned.
+        period: One of PERIODS; unknown values behave like 'all'.
+        metric: Optional metric name (case-insensitive exact match).
+        limit: Maximum number of measurements.
+
+    Returns:
+        Sliced queryset ordered by timestamp, newest first.
+    """
+    measurements_qs = Measurement.objects.filter(device=device)
+
+    if metric:
+        measurements_qs = measurements_qs.filter(definition__name__iexact=metric)
+
+    start_time = get_period_start(period)
+    if start_time is not None:
+        measurements_qs = measurements_qs.filter(timestamp__gte=start_time)
+
+    return measurements_qs.order_by('-timestamp')[:limit]
+
+
+def compute_statistics(measurements_qs: QuerySet[Measurement]) -> dict[str, Optional[float]]:
+    """
+    Compute mean, max and min of the values in a (possibly sliced) queryset.
+
+    Returns:
+        Dict with 'mean', 'max' and 'min' as floats, all None when empty.
+    """
+    aggregates = measurements_qs.aggregate(
+        avg_value=Avg('value', output_field=value_output_field()),
+        max_value=Max('value'),
+        min_value=Min('value')
+    )
+
+    if aggregates['avg_value'] is None:
+        return {'mean': None, 'max': None, 'min': None}
+
+    return {
+        'mean': float(aggregates['avg_value']),
+        'max': float(aggregates['max_value']) if aggregates['max_value'] is not None else None,
+        'min': float(aggregates['min_value']) if aggregates['min_value'] is not None else None,
+    }
+
+
+def values_statistics(values: Sequence) -> dict[str, Optional[float]]:
+    """Compute mean, max and min of in-memory values, like compute_statistics."""
+    if not values:
+        return {'mean': None, 'max': None, 'min': None}
+    return {
+        'mean': float(sum(values) / len(values)),
+        'max': float(max(values)),
+        'min': float(min(values)),
+    }
+
+
+def aggregated_window(
+    device: Device,
+    period: str = 'all',
+    metric: Optional[str] = None,
+    limit: int = 100,
+) -> tuple[Union[QuerySet[Measurement], list[Measurement]], dict[str, Optional[float]]]:
+    """
+    Return the newest measurements of a period and their statistics.
+
+    When no archived sample of the device falls in the period this is the
+    plain database path (sliced queryset + aggregate query). Otherwise the
+    database rows are merged with archived rows read from Parquet, and
+    statistics are computed over the merged window in Python.
+
+    Returns:
+        Tuple (measurements newest first, statistics dict).
+    """
+    # An empty window needs no query; querysets also reject negative slices
+    if limit <= 0:
+        return [], values_statistics([])
+
+    measurements_qs = recent_measurements(device, period=period, metric=metric, limit=limit)
+    start_time = get_period_start(period)
+
+    horizon = archive_horizon(device, start_time)
+    if horizon is None:
+        return measurements_qs, compute_statistics(measurements_qs)
+
+    hot = list(measurements_qs)
+    # A full window newer than every archived sample of the device cannot contain cold rows
+    if len(hot) >= limit and hot[-1].timestamp >= horizon:
+        return hot, values_statistics([m.value for m in hot])
+
+    cold = read_archived_measurements(device, start=start_time, metric=metric, limit=limit)
+    merged = sorted(hot + cold, key=lambda m: m.timestamp, reverse=True)[:limit]
+    return merged, values_statistics([m.value for m in merged])
@@ -11,9 +11,11 @@ from typing import Tuple, Optional
 
 from django.utils.translation import gettext_lazy as _
 
+from devices.metrics import ALERT_CHECK_SECONDS, THRESHOLD_VIOLATIONS
 from devices.models import Measurement, MeasurementThreshold
 
 
+@ALERT_CHECK_SECONDS.time()
 def check_for_alert(measurement: Measurement) -> Tuple[bool, Optional[str]]:
     """
     Check whether a measurement violates an active threshold.
@@ -41,7 +43,8 @@ def check_for_alert(measurement: Measurement) -> Tuple[bool, Optional[str]]:
     if threshold is None:
         return False, None
 
-    value: Decimal = Decimal(measurement.value)
+    # str() keeps float-stored values at their shortest decimal representation
+    value: Decimal = Decimal(str(measurement.value))
     min_limit: Decimal = Decimal(threshold.min_limit)
     max_limit: Decimal = Decimal(threshold.max_limit)
 
@@ -54,6 +57,7 @@ def check_for_alert(measurement: Measurement) -> Tuple[bool, Optional[str]]:
             unit=measurement.unit,
             min_limit=str(min_limit),
         )
+        THRESHOLD_VIOLATIONS.inc()
         return True, message
 
     if value > max_limit:
@@ -65,6 +69,7 @@ def check_for_alert(measurement: Measurement) -> Tuple[bool, Optional[str]]:
             unit=measurement.unit,
             max_limit=str(max_limit),
         )
+        THRESHOLD_VIOLATIONS.inc()
         return True, message
 
     return False, None
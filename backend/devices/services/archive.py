@@ -0,0 +1,385 @@
+"""
+Cold-tier archival of measurements to Parquet.
+
+Closed time ranges are exported one UTC day at a time to zstd-compressed
+Parquet files laid out as ``year=YYYY/month=MM/day=DD/`` (Hive-style) under
+MEASUREMENT_ARCHIVE_ROOT, then deleted from the database. Every file is
+registered as a MeasurementArchive row, with one MeasurementArchiveRange per device it
+holds (oldest and newest sample), so the read path only opens the files
+of the requested device and period, without listing the storage.
+
+Archived samples are also removed from the metric catalog (DeviceMetric),
+which describes the measurements still in the database.
+
+The root may be a local directory or any URI understood by
+``pyarrow.fs.FileSystem.from_uri`` (e.g. ``s3://bucket/prefix``). pyarrow is
+an optional dependency, imported lazily.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import islice
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from devices.fields import uses_float_storage
+from devices.models import Device, Measurement, MeasurementArchive, MeasurementArchiveRange
+from devices.services.metric_catalog import forget_archived
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the database and written per Parquet row group
+BATCH_SIZE: int = 50000
+
+PARQUET_COMPRESSION: str = 'zstd'
+
+# Columns stored in every file; metric/unit are denormalized so archives are self-describing
+ARCHIVE_COLUMNS: tuple[str, ...] = ('id', 'device_id', 'metric', 'unit', 'value', 'timestamp')
+
+
+class ArchiveError(Exception):
+    """Raised when a range cannot be archived consistently."""
+
+
+def _pyarrow():
+    """Import pyarrow lazily, failing with a clear configuration error."""
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.fs  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            "Measurement archival requires pyarrow (pip install pyarrow)"
+        ) from exc
+    return pyarrow
+
+
+def get_archive_root() -> str:
+    """Return the configured archive root (local path or URI)."""
+    return str(getattr(settings, 'MEASUREMENT_ARCHIVE_ROOT'))
+
+
+def get_filesystem(root: Optional[str] = None) -> tuple[Any, str]:
+    """
+    Resolve the archive root to a pyarrow filesystem and base path.
+
+    Returns:
+        Tuple (filesystem, base_path).
+    """
+    pa = _pyarrow()
+    root = root or get_archive_root()
+    if '://' in root:
+        return pa.fs.FileSystem.from_uri(root)
+    return pa.fs.LocalFileSystem(), os.path.abspath(root)
+
+
+def _schema():
+    """Return the Parquet schema matching the current value storage."""
+    pa = _pyarrow()
+    value_type = pa.float64() if uses_float_storage() else pa.decimal128(20, 10)
+    return pa.schema([
+        ('id', pa.int64()),
+        ('device_id', pa.int64()),
+        ('metric', pa.string()),
+        ('unit', pa.string()),
+        ('value', value_type),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def device_ranges(table) -> dict[int, tuple[datetime, datetime, int]]:
+    """Return the oldest and newest timestamp and the row count of each device in an Arrow table."""
+    grouped = table.group_by('device_id').aggregate([('timestamp', 'min'), ('timestamp', 'max'), ('id', 'count')])
+    return {
+        row['device_id']: (row['timestamp_min'], row['timestamp_max'], row['id_count'])
+        for row in grouped.to_pylist()
+    }
+
+
+class _FileIndex:
+    """Per-device ranges and per-metric sample counts of the rows written to one file."""
+
+    def __init__(self):
+        self.ranges: dict[int, tuple[datetime, datetime, int]] = {}
+        self.samples: dict[tuple[int, str], int] = {}
+
+    def add(self, table) -> None:
+        for device_id, (first, last, count) in device_ranges(table).items():
+            if device_id in self.ranges:
+                known_first, known_last, known_count = self.ranges[device_id]
+                first, last, count = min(first, known_first), max(last, known_last), count + known_count
+            self.ranges[device_id] = (first, last, count)
+        grouped = table.group_by(['device_id', 'metric']).aggregate([('id', 'count')])
+        for row in grouped.to_pylist():
+            key = (row['device_id'], row['metric'])
+            self.samples[key] = self.samples.get(key, 0) + row['id_count']
+
+    def range_rows(self, archive: MeasurementArchive) -> list[MeasurementArchiveRange]:
+        return [
+            MeasurementArchiveRange(
+                archive=archive, device_id=device_id,
+                first_timestamp=first, last_timestamp=last, row_count=count,
+            )
+            for device_id, (first, last, count) in self.ranges.items()
+        ]
+
+
+def day_bounds(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Split [start, end) into UTC day ranges aligned to midnight."""
+    start = start.astimezone(dt_timezone.utc)
+    end = end.astimezone(dt_timezone.utc)
+    cursor = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    ranges = []
+    while cursor < end:
+        following = cursor + timedelta(days=1)
+        ranges.append((max(cursor, start), min(following, end)))
+        cursor = following
+    return ranges
+
+
+def partition_path(day: datetime) -> str:
+    """Return the Hive-style partition directory of a day."""
+    return f"year={day.year:04d}/month={day.month:02d}/day={day.day:02d}"
+
+
+def archive_day(period_start: datetime, period_end: datetime, root: Optional[str] = None) -> Optional[MeasurementArchive]:
+    """
+    Export the measurements of one closed range to Parquet and delete them.
+
+    The file is written first; rows are deleted afterwards in a transaction
+    that also registers the archive and its per-device ranges, and removes
+    the rows from the metric catalog. Only rows that were exported are
+    deleted (by id), and the deletion is rolled back if the count does not
+    match, so concurrent late arrivals are never lost.
+
+    Args:
+        period_start: Inclusive lower bound (within a single UTC day).
+        period_end: Exclusive upper bound, must be in the past.
+        root: Archive root, defaults to MEASUREMENT_ARCHIVE_ROOT.
+
+    Returns:
+        The MeasurementArchive created, or None when the range was empty.
+
+    Raises:
+        ArchiveError: If the range is still open or the deletion is inconsistent.
+    """
+    pa = _pyarrow()
+    if period_end > timezone.now():
+        raise ArchiveError(f"Range ending at {period_end.isoformat()} is not closed yet")
+
+    range_qs = Measurement.objects.filter(timestamp__gte=period_start, timestamp__lt=period_end)
+    rows = (
+        range_qs.order_by('device_id', 'timestamp')
+        .values_list('id', 'device_id', 'definition__name', 'definition__unit', 'value', 'timestamp')
+    )
+
+    filesystem, base = get_filesystem(root)
+    relative = (
+        f"{partition_path(period_start)}/"
+        f"measurements-{period_start:%Y%m%dT%H%M%S}-{timezone.now():%Y%m%dT%H%M%S%f}.parquet"
+    )
+    full_path = f"{base.rstrip('/')}/{relative}"
+    filesystem.create_dir(full_path.rsplit('/', 1)[0], recursive=True)
+
+    schema = _schema()
+    index = _FileIndex()
+    row_count = 0
+    max_id = 0
+    writer = None
+    try:
+        for batch in _chunks(rows.iterator(chunk_size=BATCH_SIZE), BATCH_SIZE):
+            if writer is None:
+                writer = pa.parquet.ParquetWriter(
+                    full_path, schema, filesystem=filesystem, compression=PARQUET_COMPRESSION
+                )
+            table = _to_table(batch, schema)
+            writer.write_table(table)
+            index.add(table)
+            row_count += len(batch)
+            max_id = max(max_id, max(row[0] for row in batch))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if row_count == 0:
+        return None
+
+    try:
+        with transaction.atomic():
+            deleted, _ = range_qs.filter(id__lte=max_id).delete()
+            if deleted != row_count:
+                raise ArchiveError(
+                    f"Archived {row_count} rows but {deleted} matched for deletion "
+                    f"in [{period_start.isoformat()}, {period_end.isoformat()})"
+                )
+            archive = MeasurementArchive.objects.create(
+                period_start=period_start,
+                period_end=period_end,
+                path=relative,
+                row_count=row_count,
+                size_bytes=filesystem.get_file_info(full_path).size,
+            )
+            MeasurementArchiveRange.objects.bulk_create(index.range_rows(archive))
+            forget_archived(index.samples)
+    except Exception:
+        filesystem.delete_file(full_path)
+        raise
+
+    logger.info("Archived %s measurements to %s", row_count, relative)
+    return archive
+
+
+def _chunks(iterator: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    """Yield lists of at most ``size`` items from an iterator."""
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _to_table(batch: list[tuple], schema):
+    """Build an Arrow table from values_list rows."""
+    pa = _pyarrow()
+    columns = list(zip(*batch))
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def archive_range(start: datetime, end: datetime, root: Optional[str] = None) -> list[MeasurementArchive]:
+    """
+    Archive every UTC day of [start, end), one file and one transaction per day.
+
+    Returns:
+        MeasurementArchive rows created (empty days are skipped).
+    """
+    archives = []
+    for period_start, period_end in day_bounds(start, end):
+        archive = archive_day(period_start, period_end, root=root)
+        if archive is not None:
+            archives.append(archive)
+    return archives
+
+
+def archive_cutoff(days: int) -> datetime:
+    """Return the UTC midnight ``days`` full days ago (exclusive end of archivable data)."""
+    now = timezone.now().astimezone(dt_timezone.utc)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+
+
+def archive_older_than(days: int, root: Optional[str] = None) -> list[MeasurementArchive]:
+    """Archive every measurement older than ``days`` full UTC days."""
+    end = archive_cutoff(days)
+    oldest = (
+        Measurement.objects.filter(timestamp__lt=end)
+        .order_by('timestamp')
+        .values_list('timestamp', flat=True)
+        .first()
+    )
+    if oldest is None:
+        return []
+    return archive_range(oldest, end, root=root)
+
+
+def archive_horizon(device: Device, start: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Return the timestamp of the newest archived sample of a device since ``start``.
+
+    None means no archived data of the device can fall within [start, now),
+    so reads can skip the cold tier entirely. Answered from the per-device
+    ranges, without opening any file.
+    """
+    ranges = MeasurementArchiveRange.objects.filter(device=device)
+    if start is not None:
+        ranges = ranges.filter(last_timestamp__gte=start)
+    return ranges.aggregate(horizon=Max('last_timestamp'))['horizon']
+
+
+def read_archived_measurements(
+    device: Device,
+    start: Optional[datetime] = None,
+    metric: Optional[str] = None,
+    limit: int = 100,
+    root: Optional[str] = None,
+) -> list[Measurement]:
+    """
+    Return the newest archived measurements of a device.
+
+    Only the files holding rows of the device since ``start`` are opened
+    (MeasurementArchiveRange), newest first, with predicate pushdown on
+    device_id and timestamp, stopping once ``limit`` rows are collected.
+    Results are unsaved Measurement instances (metric/unit set without
+    touching the database), so they serialize like live rows.
+
+    Args:
+        device: Device whose measurements are returned.
+        start: Optional inclusive lower timestamp bound.
+        metric: Optional metric name (case-insensitive exact match).
+        limit: Maximum number of measurements.
+        root: Archive root, defaults to MEASUREMENT_ARCHIVE_ROOT.
+
+    Returns:
+        Measurements ordered by timestamp, newest first.
+    """
+    ranges = MeasurementArchiveRange.objects.filter(device=device).select_related('archive').order_by('-last_timestamp')
+    if start is not None:
+        ranges = ranges.filter(last_timestamp__gte=start)
+    ranges = list(ranges)
+    if not ranges or limit <= 0:
+        return []
+
+    pa = _pyarrow()
+    filesystem, base = get_filesystem(root)
+    filters = [('device_id', '=', device.id)]
+    if start is not None:
+        filters.append(('timestamp', '>=', start))
+
+    value_type = _schema().field('value').type
+    tables = []
+    collected = 0
+    oldest: Optional[datetime] = None
+    for index, device_range in enumerate(ranges):
+        table = pa.parquet.read_table(
+            f"{base.rstrip('/')}/{device_range.archive.path}",
+            filesystem=filesystem,
+            columns=list(ARCHIVE_COLUMNS),
+            filters=filters,
+        )
+        if metric:
+            table = table.filter(pa.compute.equal(pa.compute.utf8_lower(table['metric']), metric.lower()))
+        # Files written under another MEASUREMENT_VALUE_STORAGE are read in the current one
+        if table.schema.field('value').type != value_type:
+            table = table.set_column(
+                table.schema.get_field_index('value'), 'value', table['value'].cast(value_type, safe=False)
+            )
+        tables.append(table)
+        collected += table.num_rows
+        oldest = min(oldest or device_range.first_timestamp, device_range.first_timestamp)
+        # Ranges may overlap (re-archived late arrivals); stop once older files cannot compete
+        following = ranges[index + 1] if index + 1 < len(ranges) else None
+        if collected >= limit and (following is None or following.last_timestamp < oldest):
+            break
+
+    merged = pa.concat_tables(tables).sort_by([('timestamp', 'descending')]).slice(0, limit)
+    return [
+        Measurement(
+            id=row['id'],
+            device=device,
+            metric=row['metric'],
+            unit=row['unit'],
+            value=row['value'],
+            timestamp=row['timestamp'],
+        )
+        for row in merged.to_pylist()
+    ]
@@ -0,0 +1,118 @@
+"""
+Index maintenance and inspection helpers for the measurements table.
+
+BRIN indexes are PostgreSQL-only and are managed with raw SQL instead of
+model Meta indexes so the schema stays portable (tests run on SQLite).
+This module does not import models so migrations can use it safely.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+MEASUREMENTS_TABLE: str = 'measurements'
+
+# Measurements arrive roughly in timestamp order, so block ranges correlate with time
+BRIN_INDEXES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ('meas_timestamp_brin_idx', ('timestamp',)),
+    ('meas_device_ts_brin_idx', ('device_id', 'timestamp')),
+)
+
+BRIN_PAGES_PER_RANGE: int = 32
+
+
+def brin_supported(connection: BaseDatabaseWrapper) -> bool:
+    """Return True when the database supports BRIN indexes."""
+    return connection.vendor == 'postgresql'
+
+
+def create_brin_indexes(connection: BaseDatabaseWrapper, concurrently: bool = True) -> list[str]:
+    """
+    Create the BRIN indexes on the measurements table if missing.
+
+    Args:
+        connection: Database connection (must be PostgreSQL).
+        concurrently: Build without blocking writes (must run outside a transaction).
+
+    Returns:
+        Names of the indexes ensured, empty on unsupported databases.
+    """
+    if not brin_supported(connection):
+        return []
+    quote = connection.ops.quote_name
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    with connection.cursor() as cursor:
+        for name, columns in BRIN_INDEXES:
+            cursor.execute(
+                f"CREATE INDEX {mode}IF NOT EXISTS {quote(name)} "
+                f"ON {quote(MEASUREMENTS_TABLE)} USING brin ({', '.join(quote(c) for c in columns)}) "
+                f"WITH (pages_per_range = {BRIN_PAGES_PER_RANGE})"
+            )
+    return [name for name, _ in BRIN_INDEXES]
+
+
+def drop_brin_indexes(connection: BaseDatabaseWrapper, concurrently: bool = True) -> list[str]:
+    """Drop the BRIN indexes on the measurements table if present."""
+    if not brin_supported(connection):
+        return []
+    quote = connection.ops.quote_name
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    with connection.cursor() as cursor:
+        for name, _ in BRIN_INDEXES:
+            cursor.execute(f"DROP INDEX {mode}IF EXISTS {quote(name)}")
+    return [name for name, _ in BRIN_INDEXES]
+
+
+def index_sizes(connection: BaseDatabaseWrapper) -> list[dict[str, Any]]:
+    """
+    Return size, access method and scan count of every measurements index.
+
+    Only available on PostgreSQL; returns an empty list elsewhere.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT s.indexrelname, am.amname, pg_relation_size(s.indexrelid), s.idx_scan
+            FROM pg_stat_user_indexes s
+            JOIN pg_class c ON c.oid = s.indexrelid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE s.relname = %s
+            ORDER BY pg_relation_size(s.indexrelid) DESC
+            """,
+            [MEASUREMENTS_TABLE],
+        )
+        rows = cursor.fetchall()
+    return [
+        {'name': name, 'method': method, 'bytes': size, 'scans': scans}
+        for name, method, size, scans in rows
+    ]
+
+
+def table_size(connection: BaseDatabaseWrapper) -> dict[str, Any]:
+    """Return heap and total size of the measurements table (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_relation_size(%s), pg_total_relation_size(%s)",
+            [MEASUREMENTS_TABLE, MEASUREMENTS_TABLE],
+        )
+        heap, total = cursor.fetchone()
+    return {'heap_bytes': heap, 'total_bytes': total}
+
+
+def explain(connection: BaseDatabaseWrapper, sql: str, analyze: bool = False) -> list[str]:
+    """
+    Return the plan of an already rendered SQL statement, one line per row.
+
+    With ``analyze`` the statement is executed (PostgreSQL EXPLAIN ANALYZE, BUFFERS).
+    """
+    options = {'analyze': True, 'buffers': True} if analyze and connection.vendor == 'postgresql' else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}")
+        rows = cursor.fetchall()
+    return [str(row[-1]) for row in rows]
@@ -0,0 +1,138 @@
+"""
+Metric catalog service keeping the per-device list of metrics up to date.
+
+The catalog is maintained incrementally during ingestion so that reading
+the metrics of a device costs O(#metrics) instead of a DISTINCT scan over
+every measurement the device ever reported. It describes the measurements
+stored in the database: archival (devices.services.archive) removes the
+samples it moves to the cold tier.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateTimeField, Exists, F, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.query import QuerySet
+
+from devices.models import Device, DeviceMetric, Measurement
+
+
+def record_measurement(measurement: Measurement) -> None:
+    """
+    Register a freshly ingested measurement in the device metric catalog.
+
+    Existing entries are updated in place with a single UPDATE statement;
+    the INSERT only happens on the first sighting of a (device, metric) pair.
+
+    Args:
+        measurement: Persisted Measurement instance.
+    """
+    if _increment(measurement) > 0:
+        return
+
+    try:
+        with transaction.atomic():
+            DeviceMetric.objects.create(
+                device_id=measurement.device_id,
+                metric=measurement.metric,
+                unit=measurement.unit,
+                first_seen=measurement.timestamp,
+                last_seen=measurement.timestamp,
+                sample_count=1,
+            )
+    except IntegrityError:
+        # Another worker registered the pair concurrently; count this sample on it
+        _increment(measurement)
+
+
+def _increment(measurement: Measurement) -> int:
+    """Update the catalog entry of a measurement, returning the number of rows touched."""
+    timestamp = Value(measurement.timestamp, output_field=DateTimeField())
+    return DeviceMetric.objects.filter(
+        device_id=measurement.device_id,
+        metric=measurement.metric,
+    ).update(
+        unit=measurement.unit,
+        first_seen=Least(F('first_seen'), timestamp),
+        last_seen=Greatest(F('last_seen'), timestamp),
+        sample_count=F('sample_count') + 1,
+    )
+
+
+def get_device_metrics(device: Device) -> QuerySet[DeviceMetric]:
+    """Return the catalog entries of a device ordered by metric name."""
+    return DeviceMetric.objects.filter(device=device).order_by('metric')
+
+
+def rebuild_metric_catalog(device_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute catalog entries from the stored measurements.
+
+    Intended for data loaded outside the ingestion endpoint (bulk imports,
+    seeds). This performs the full scan the catalog normally avoids.
+
+    Args:
+        device_ids: Restrict the rebuild to these devices. All devices when None.
+
+    Returns:
+        Number of catalog entries written.
+    """
+    measurements = Measurement.objects.order_by()
+    catalog = DeviceMetric.objects.all()
+    if device_ids is not None:
+        device_ids = list(device_ids)
+        measurements = measurements.filter(device_id__in=device_ids)
+        catalog = catalog.filter(device_id__in=device_ids)
+
+    newest_unit = (
+        Measurement.objects.filter(device_id=OuterRef('device_id'), definition__name=OuterRef('definition__name'))
+        .order_by('-timestamp')
+        .values('definition__unit')[:1]
+    )
+    rows = measurements.values('device_id', 'definition__name').annotate(
+        last_unit=Subquery(newest_unit),
+        oldest=Min('timestamp'),
+        newest=Max('timestamp'),
+        samples=Count('id'),
+    )
+    entries: list[DeviceMetric] = [
+        DeviceMetric(
+            device_id=row['device_id'],
+            metric=row['definition__name'],
+            unit=row['last_unit'],
+            first_seen=row['oldest'],
+            last_seen=row['newest'],
+            sample_count=row['samples'],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        catalog.delete()
+        DeviceMetric.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def forget_archived(samples: dict[tuple[int, str], int]) -> None:
+    """
+    Remove samples moved out of the database from the catalog.
+
+    Counts are decremented and ``first_seen`` moves to the oldest sample
+    left; entries without samples left in the database are deleted.
+
+    Args:
+        samples: Number of removed samples per (device_id, metric).
+    """
+    if not samples:
+        return
+    remaining = Measurement.objects.filter(device_id=OuterRef('device_id'), definition__name=OuterRef('metric'))
+    oldest = Subquery(remaining.order_by('timestamp').values('timestamp')[:1])
+    for (device_id, metric), count in samples.items():
+        DeviceMetric.objects.filter(device_id=device_id, metric=metric).update(
+            sample_count=Greatest(F('sample_count') - count, Value(0)),
+            first_seen=Coalesce(oldest, F('first_seen')),
+        )
+    device_ids = {device_id for device_id, _metric in samples}
+    DeviceMetric.objects.filter(device_id__in=device_ids).filter(~Exists(remaining)).delete()
@@ -0,0 +1,143 @@
+"""
+Real-time publishing of device updates to WebSocket consumers.
+
+Measurements are stamped with their per-device sequence number (see
+devices.services.snapshot) and broadcast to the device group through the
+channel layer. The event carries the frame once; consumers encode it with
+their codec, once per codec and process (see devices.encoding).
+
+Alert lifecycle changes and device status transitions go to the fleet-wide
+event stream (see devices.fleet). Publishing them is best effort: failures
+are logged and never fail the request that caused them.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from devices.encoding import broadcast_event
+from devices.fleet import ALERT_CREATED, ALERT_REOPENED, ALERT_RESOLVED, DEVICE_STATUS_CHANGED, FLEET_GROUP
+from devices.metrics import GROUP_SEND_SECONDS, stamp
+from devices.models import Alert, Device
+from devices.serializers import AlertSerializer
+from devices.services.snapshot import record_update
+
+logger = logging.getLogger(__name__)
+
+
+def device_group_name(public_id) -> str:
+    """Return the channel layer group receiving updates of a device."""
+    return f'device_{public_id}'
+
+
+def publish_measurement(device_public_id, measurement_data: dict[str, Any]) -> Optional[int]:
+    """
+    Broadcast a serialized measurement to the subscribers of its device.
+
+    Args:
+        device_public_id: UUID of the device (public_id)
+        measurement_data: Serialized measurement data dictionary
+
+    Returns:
+        The sequence number of the update, or None if it could not be assigned.
+    """
+    try:
+        seq: Optional[int] = record_update(device_public_id, measurement_data)
+    except Exception as e:
+        # Snapshots are best effort; live updates still go out without a sequence number
+        logger.error(f"Failed to update snapshot for device {device_public_id}: {str(e)}", exc_info=True)
+        seq = None
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("Channel layer is not configured. WebSocket update skipped.")
+        return seq
+
+    frame = {
+        'type': 'measurement_update',
+        'device_id': str(device_public_id),
+        'seq': seq,
+        'measurement': measurement_data,
+    }
+    # Only routing fields travel next to the frame: device_id for
+    # multiplexed sockets, metric for coalescing delivery policies
+    message = broadcast_event(
+        'measurement_update', frame, device_id=frame['device_id'], metric=measurement_data.get('metric')
+    )
+    with GROUP_SEND_SECONDS.time(event='measurement_update'):
+        async_to_sync(channel_layer.group_send)(device_group_name(device_public_id), stamp(message))
+    return seq
+
+
+def _device_summary(device: Device) -> dict[str, Any]:
+    return {
+        'id': device.id,
+        'public_id': str(device.public_id),
+        'name': device.name,
+        'category': device.category_id,
+        'status': device.status,
+    }
+
+
+def _publish_fleet_event(event: str, frame: dict[str, Any], category_id: Optional[int], severity: Optional[str] = None) -> None:
+    """Broadcast a fleet event with its routing fields and frame."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("Channel layer is not configured. Fleet event skipped.")
+        return
+    with GROUP_SEND_SECONDS.time(event='fleet_event'):
+        async_to_sync(channel_layer.group_send)(FLEET_GROUP, broadcast_event(
+            'fleet_event', frame, event=event, category_id=category_id, severity=severity
+        ))
+
+
+def publish_alert_event(alert: Alert, event: str = ALERT_CREATED) -> None:
+    """
+    Broadcast an alert lifecycle event (alert_created, alert_resolved, alert_reopened).
+
+    Args:
+        alert: The saved alert (its device should already be loaded)
+        event: Event type, one of devices.fleet.EVENTS for alerts
+    """
+    try:
+        device = alert.device
+        _publish_fleet_event(
+            event,
+            {'type': event, 'alert': dict(AlertSerializer(alert).data), 'device': _device_summary(device)},
+            category_id=device.category_id,
+            severity=alert.severity,
+        )
+    except Exception as e:
+        logger.error(f"Failed to publish {event} for alert {alert.pk}: {str(e)}", exc_info=True)
+
+
+def publish_alert_status_change(alert: Alert, previous_status: str) -> None:
+    """Broadcast alert_resolved or alert_reopened when the status of an alert changed."""
+    if alert.status == previous_status:
+        return
+    if alert.status == Alert.Status.RESOLVED:
+        publish_alert_event(alert, ALERT_RESOLVED)
+    elif previous_status == Alert.Status.RESOLVED:
+        publish_alert_event(alert, ALERT_REOPENED)
+
+
+def publish_device_status_change(device: Device, previous_status: str) -> None:
+    """Broadcast device_status_changed when the status of a device changed."""
+    if device.status == previous_status:
+        return
+    try:
+        _publish_fleet_event(
+            DEVICE_STATUS_CHANGED,
+            {
+                'type': DEVICE_STATUS_CHANGED,
+                'device': _device_summary(device),
+                'previous_status': previous_status,
+                'status': device.status,
+            },
+            category_id=device.category_id,
+        )
+    except Exception as e:
+        logger.error(f"Failed to publish status change of device {device.pk}: {str(e)}", exc_info=True)
@@ -0,0 +1,226 @@
+"""
+Cached per-device snapshots for WebSocket subscribers.
+
+Every published measurement gets a per-device sequence number and updates a
+cached snapshot (latest value per metric and the last points), so clients
+can paint their initial state on connect without an HTTP round trip and
+detect gaps between the snapshot and the live updates.
+
+The snapshot is only rebuilt from the database when it is missing from the
+cache; the ingestion path never scans measurements. Updates are applied
+under a per-device lock and ordered by measurement timestamp, so
+concurrent workers and late measurements never regress the snapshot. Rebuilds read from a
+replica lagging at most DB_REPLICA_SNAPSHOT_MAX_LAG seconds when replicas
+are configured (core.replicas).
+"""
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.utils.dateparse import parse_datetime
+
+from core.replicas import read_from_replica
+from devices.models import DeviceMetric, Measurement
+from devices.serializers import MeasurementSerializer
+
+SNAPSHOT_KEY: str = 'device_snapshot:{}'
+SEQUENCE_KEY: str = 'device_seq:{}'
+LOCK_KEY: str = 'device_snapshot_lock:{}'
+
+# Snapshot lock: lifetime, how long an update waits for it, and the retry interval (seconds)
+LOCK_TIMEOUT: int = 5
+LOCK_WAIT: float = 0.5
+LOCK_RETRY_DELAY: float = 0.002
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_points() -> int:
+    return settings.WS_SNAPSHOT_POINTS
+
+
+def _ttl() -> int:
+    return settings.WS_SNAPSHOT_TTL
+
+
+def next_sequence(public_id) -> int:
+    """Return the next sequence number of a device (atomic on shared caches)."""
+    key = SEQUENCE_KEY.format(public_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); restart the sequence
+        cache.add(key, 1, timeout=None)
+        return 1
+
+
+@contextmanager
+def _snapshot_lock(public_id) -> Iterator[bool]:
+    """
+    Hold the snapshot lock of a device (``cache.add``, atomic on shared caches).
+
+    Yields False when the lock could not be taken within LOCK_WAIT seconds.
+    The lock expires after LOCK_TIMEOUT seconds, so a crashed holder never
+    blocks the device for longer than that.
+    """
+    key = LOCK_KEY.format(public_id)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    acquired = cache.add(key, token, timeout=LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(LOCK_RETRY_DELAY)
+        acquired = cache.add(key, token, timeout=LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def _timestamp(measurement: Optional[dict[str, Any]]) -> Optional[datetime]:
+    value = measurement.get('timestamp') if measurement else None
+    return parse_datetime(value) if isinstance(value, str) else None
+
+
+def _is_newer(measurement: dict[str, Any], current: Optional[dict[str, Any]]) -> bool:
+    """Whether ``measurement`` was taken after ``current`` (ingest order when a timestamp is missing)."""
+    taken, current_taken = _timestamp(measurement), _timestamp(current)
+    return taken is None or current_taken is None or taken >= current_taken
+
+
+def apply_update(snapshot: dict[str, Any], seq: int, measurement: dict[str, Any]) -> None:
+    """
+    Add a measurement to a snapshot, by measurement timestamp.
+
+    A measurement arriving late (older than the latest value of its metric)
+    never replaces that value, and is placed in ``recent`` by timestamp, or
+    dropped when older than every kept point.
+    """
+    snapshot['seq'] = max(snapshot['seq'], seq)
+    metric = measurement['metric']
+    if _is_newer(measurement, snapshot['latest'].get(metric)):
+        snapshot['latest'][metric] = measurement
+    recent = snapshot['recent']
+    position = next(
+        (index for index, point in enumerate(recent) if _is_newer(measurement, point)),
+        len(recent),
+    )
+    recent.insert(position, measurement)
+    del recent[_snapshot_points():]
+
+
+def record_update(public_id, measurement_data: dict[str, Any]) -> int:
+    """
+    Assign a sequence number to a published measurement and update the snapshot.
+
+    The read-modify-write of the cached snapshot runs under a per-device
+    lock, so concurrent workers never overwrite each other's updates. A
+    missing snapshot is left missing; it is rebuilt from the database on
+    the next read, as is a snapshot whose lock could not be taken.
+
+    Returns:
+        The sequence number of the update.
+    """
+    seq = next_sequence(public_id)
+    key = SNAPSHOT_KEY.format(public_id)
+    with _snapshot_lock(public_id) as locked:
+        if not locked:
+            logger.warning(f"Snapshot lock of device {public_id} busy; dropping the cached snapshot")
+            cache.delete(key)
+            return seq
+        snapshot = cache.get(key)
+        # Updates may take the lock out of sequence order; only those older
+        # than the rebuild are already part of the snapshot
+        if snapshot is not None and snapshot.get('built_seq', snapshot['seq']) < seq:
+            apply_update(snapshot, seq, dict(measurement_data))
+            cache.set(key, snapshot, timeout=_ttl())
+    return seq
+
+
+def build_snapshot(public_id) -> dict[str, Any]:
+    """
+    Build a device snapshot from the database (cache miss path).
+
+    The sequence number is read before the measurements, so an update
+    published meanwhile is at worst delivered twice, never lost. On a
+    replica, points written less than its lag before the rebuild may be
+    missing from ``recent`` until the snapshot expires.
+
+    Metrics absent from the recent points are completed in one query: the
+    newest measurement of each cataloged metric (DeviceMetric).
+    """
+    seq = cache.get(SEQUENCE_KEY.format(public_id), 0)
+    points = _snapshot_points()
+    recent = list(
+        Measurement.objects.filter(device__public_id=public_id).order_by('-timestamp')[:points]
+    )
+    latest = {measurement.metric: measurement for measurement in reversed(recent)}
+    newest = Measurement.objects.filter(
+        device=OuterRef('device'), definition__name=OuterRef('metric')
+    ).order_by('-timestamp').values('pk')[:1]
+    missing = (
+        DeviceMetric.objects.filter(device__public_id=public_id)
+        .exclude(metric__in=list(latest))
+        .values(latest_id=Subquery(newest))
+    )
+    for measurement in Measurement.objects.filter(pk__in=missing):
+        latest[measurement.metric] = measurement
+    return {
+        'seq': seq,
+        'built_seq': seq,
+        'latest': {metric: _serialize(m) for metric, m in latest.items()},
+        'recent': [_serialize(m) for m in recent],
+    }
+
+
+def get_snapshots(public_ids: Iterable, history: int = 0) -> dict[str, dict[str, Any]]:
+    """
+    Return the snapshots of several devices, reading the cache in one round trip.
+
+    Args:
+        public_ids: Device public_ids.
+        history: Number of recent points to include (capped at WS_SNAPSHOT_POINTS).
+
+    Returns:
+        Dict public_id -> {'seq', 'latest', and 'recent' when history > 0}.
+    """
+    public_ids = [str(public_id) for public_id in public_ids]
+    keys = {SNAPSHOT_KEY.format(public_id): public_id for public_id in public_ids}
+    cached = cache.get_many(list(keys))
+
+    snapshots = {}
+    for key, public_id in keys.items():
+        snapshot = cached.get(key)
+        if snapshot is None:
+            with read_from_replica(settings.DB_REPLICA_SNAPSHOT_MAX_LAG):
+                snapshot = build_snapshot(public_id)
+            cache.add(key, snapshot, timeout=_ttl())
+        snapshots[public_id] = snapshot_payload(snapshot, history)
+    return snapshots
+
+
+def get_snapshot(public_id, history: int = 0) -> dict[str, Any]:
+    """Return the snapshot of one device (see get_snapshots)."""
+    return get_snapshots([public_id], history)[str(public_id)]
+
+
+def snapshot_payload(snapshot: dict[str, Any], history: int) -> dict[str, Any]:
+    """Trim a cached snapshot to what a client asked for."""
+    payload = {'seq': snapshot['seq'], 'latest': snapshot['latest']}
+    history = max(0, min(history, _snapshot_points()))
+    if history:
+        payload['recent'] = snapshot['recent'][:history]
+    return payload
+
+
+def _serialize(measurement: Measurement) -> dict[str, Any]:
+    return dict(MeasurementSerializer(measurement).data)
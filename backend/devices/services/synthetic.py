@@ -0,0 +1,525 @@
+"""
+Synthetic fleet data for load and performance testing.
+
+Generates production-scale time series (thousands of devices, several
+metrics, months of samples) with NumPy and loads them with PostgreSQL
+binary COPY, so the slow paths seen in production can be reproduced
+locally. Each series combines:
+
+- a per-device base level, daily cycle (with per-device phase) and linear drift;
+- a random walk carried across days plus Gaussian noise;
+- gaps: isolated lost samples and whole outage windows per device;
+- threshold breaches: short excursions beyond the profile limits, each
+  recorded as an Alert (thresholds are created for every device/metric).
+
+Generation is deterministic for a seed and parameters: every (day, device
+batch) block draws from its own generator keyed by ``(seed, day, batch)``.
+Rows are produced day by day across the whole fleet, each block in
+timestamp order, so measurements are stored roughly in time order like live
+ingestion (which BRIN indexes rely on).
+
+NumPy is only needed here; it is imported lazily.
+"""
+from __future__ import annotations
+
+import io
+import math
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, Optional
+
+from django.db import connection, transaction
+
+from ..fields import uses_float_storage
+from ..models import Alert, Category, Device, DeviceMetric, Measurement, MeasurementThreshold, MetricDefinition
+
+# PostgreSQL timestamps count microseconds from 2000-01-01 UTC
+_PG_EPOCH_US: int = 946684800 * 1_000_000
+
+_COPY_SQL: str = 'COPY measurements (device_id, definition_id, value, timestamp) FROM STDIN WITH (FORMAT binary)'
+
+# Bytes of the binary COPY representation of each integer key type (int2, int4, int8)
+_KEY_WIDTHS: dict[str, int] = {
+    'SmallAutoField': 2, 'SmallIntegerField': 2,
+    'AutoField': 4, 'IntegerField': 4,
+    'BigAutoField': 8, 'BigIntegerField': 8,
+}
+
+
+def key_width(model) -> int:
+    """
+    Return the width in bytes of a model's primary key in binary COPY.
+
+    Foreign keys take the type of the key they reference, so the COPY layout
+    of ``device_id`` and ``definition_id`` follows the referenced models.
+    """
+    field_type = model._meta.pk.get_internal_type()
+    try:
+        return _KEY_WIDTHS[field_type]
+    except KeyError:
+        raise SyntheticDataError(f'Unsupported key type {field_type} of {model.__name__} for binary COPY')
+
+
+_COPY_HEADER: bytes = b'PGCOPY\n\xff\r\n\x00' + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00'
+_COPY_TRAILER: bytes = b'\xff\xff'
+
+
+class SyntheticDataError(Exception):
+    """Raised when synthetic data cannot be generated with the given parameters."""
+
+
+def _numpy():
+    """Import NumPy lazily, failing with a clear configuration error."""
+    try:
+        import numpy
+    except ImportError as exc:
+        raise SyntheticDataError("Synthetic data generation requires numpy (pip install numpy)") from exc
+    return numpy
+
+
+@dataclass(frozen=True)
+class MetricProfile:
+    """Shape of one simulated metric."""
+
+    name: str
+    unit: str
+    mean: float
+    spread: float          # standard deviation of the base level between devices
+    daily_amplitude: float
+    noise: float
+    walk: float            # standard deviation of each random walk step
+    drift_per_day: float   # standard deviation of the per-device drift slope
+    min_limit: float
+    max_limit: float
+    floor: Optional[float] = None
+    ceiling: Optional[float] = None
+
+
+PROFILES: dict[str, MetricProfile] = {
+    profile.name: profile for profile in (
+        MetricProfile('temperature', '°C', 22.0, 4.0, 3.0, 0.3, 0.02, 0.03, -10.0, 40.0),
+        MetricProfile('humidity', '%', 55.0, 10.0, 8.0, 1.0, 0.05, 0.05, 10.0, 90.0, floor=0.0, ceiling=100.0),
+        MetricProfile('pressure', 'hPa', 1013.0, 5.0, 1.5, 0.2, 0.05, 0.02, 950.0, 1050.0),
+        MetricProfile('co2', 'ppm', 650.0, 150.0, 120.0, 15.0, 1.0, 1.0, 300.0, 2000.0, floor=0.0),
+        MetricProfile('voltage', 'V', 230.0, 2.0, 1.0, 0.5, 0.02, 0.01, 207.0, 253.0, floor=0.0),
+        MetricProfile('vibration', 'mm/s', 2.5, 1.0, 0.3, 0.4, 0.01, 0.01, 0.0, 10.0, floor=0.0),
+        MetricProfile('luminosity', 'lux', 400.0, 200.0, 350.0, 25.0, 0.5, 0.5, 0.0, 5000.0, floor=0.0),
+    )
+}
+
+# Share of devices per status; the rest are active
+_STATUS_SHARES: tuple[tuple[str, float], ...] = (
+    (Device.Status.MAINTENANCE, 0.03),
+    (Device.Status.INACTIVE, 0.04),
+    (Device.Status.ERROR, 0.01),
+)
+
+
+@dataclass(frozen=True)
+class FleetSpec:
+    """Parameters of a synthetic fleet."""
+
+    devices: int
+    metrics: tuple[str, ...]
+    days: int
+    interval: int = 60           # seconds between samples of a device
+    end: datetime = field(default_factory=lambda: datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0))
+    seed: int = 42
+    gap_rate: float = 0.02       # probability of an outage window per device and day
+    loss_rate: float = 0.001     # probability of a lost sample
+    breach_rate: float = 0.01    # probability of a threshold breach per series and day
+    batch_devices: int = 1000
+    prefix: str = 'Synthetic'
+
+    def __post_init__(self):
+        unknown = [name for name in self.metrics if name not in PROFILES]
+        if unknown:
+            raise SyntheticDataError(f"Unknown metrics: {', '.join(unknown)} (available: {', '.join(PROFILES)})")
+        if self.devices < 1 or self.days < 1 or not self.metrics:
+            raise SyntheticDataError('At least one device, metric and day are required')
+        if not 1 <= self.interval <= 86400 or 86400 % self.interval:
+            raise SyntheticDataError('interval must divide a day (e.g. 10, 60, 300, 900)')
+
+    @property
+    def start(self) -> datetime:
+        return self.end - timedelta(days=self.days)
+
+    @property
+    def samples_per_day(self) -> int:
+        return 86400 // self.interval
+
+    @property
+    def planned_rows(self) -> int:
+        """Rows before gaps are applied."""
+        return self.devices * len(self.metrics) * self.days * self.samples_per_day
+
+
+@dataclass
+class Breach:
+    """One threshold excursion of a series."""
+
+    device_index: int
+    metric: str
+    timestamp_us: int
+    peak: float
+
+
+@dataclass
+class Chunk:
+    """Column arrays of a block of measurements (timestamps in Unix microseconds)."""
+
+    device_ids: Any
+    definition_ids: Any
+    values: Any
+    timestamps_us: Any
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class SeriesGenerator:
+    """Vectorized generator of the measurements of a FleetSpec, day by day."""
+
+    def __init__(self, spec: FleetSpec, device_ids: list[int], definition_ids: list[int]):
+        np = self.np = _numpy()
+        self.spec = spec
+        self.profiles = [PROFILES[name] for name in spec.metrics]
+        self.device_ids = np.asarray(device_ids, dtype=f'i{key_width(Device)}')
+        self.definition_ids = np.asarray(definition_ids, dtype=f'i{key_width(MetricDefinition)}')
+        devices, metrics = spec.devices, len(self.profiles)
+
+        static = np.random.default_rng([spec.seed, 0xF1EE7])
+        # Sorted so each block, emitted sample by sample, is in timestamp order
+        self.offsets = np.sort(static.integers(0, spec.interval, devices))
+        self.phase = static.random((metrics, devices))
+        self.base = np.stack([
+            profile.mean + static.normal(0, profile.spread, devices) for profile in self.profiles
+        ])
+        self.slope = np.stack([
+            static.normal(0, profile.drift_per_day, devices) for profile in self.profiles
+        ])
+        self.walk = np.zeros((metrics, devices))
+
+        # Catalog statistics per (metric, device)
+        self.counts = np.zeros((metrics, devices), dtype=np.int64)
+        self.first_us = np.full((metrics, devices), -1, dtype=np.int64)
+        self.last_us = np.full((metrics, devices), -1, dtype=np.int64)
+        self.breaches: list[Breach] = []
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for day in range(self.spec.days):
+            for first in range(0, self.spec.devices, self.spec.batch_devices):
+                yield self.block(day, first, min(first + self.spec.batch_devices, self.spec.devices))
+
+    def block(self, day: int, first: int, last: int) -> Chunk:
+        """Generate the measurements of devices [first, last) during one day."""
+        np, spec = self.np, self.spec
+        rng = np.random.default_rng([spec.seed, day, first])
+        devices = slice(first, last)
+        count, samples = last - first, spec.samples_per_day
+
+        day_start = int(spec.start.timestamp()) + day * 86400
+        seconds = day_start + self.offsets[devices, None] + np.arange(samples) * spec.interval
+        elapsed_days = (seconds - int(spec.start.timestamp())) / 86400.0
+        day_fraction = (seconds % 86400) / 86400.0
+
+        # Lost samples and outage windows are shared by every metric of a device
+        present = rng.random((count, samples)) >= spec.loss_rate
+        outages = np.flatnonzero(rng.random(count) < spec.gap_rate)
+        if len(outages):
+            lengths = rng.integers(samples // 20 + 1, samples + 1, len(outages))
+            starts = rng.integers(0, samples, len(outages))
+            columns = np.arange(samples)
+            present[outages] &= ~((columns >= starts[:, None]) & (columns < (starts + lengths)[:, None]))
+
+        values = np.empty((len(self.profiles), count, samples))
+        for index, profile in enumerate(self.profiles):
+            walk = self.walk[index, devices, None] + np.cumsum(rng.normal(0, profile.walk, (count, samples)), axis=1)
+            self.walk[index, devices] = walk[:, -1]
+            series = (
+                self.base[index, devices, None]
+                + profile.daily_amplitude * np.sin(2 * math.pi * (day_fraction - self.phase[index, devices, None]))
+                + self.slope[index, devices, None] * elapsed_days
+                + walk
+                + rng.normal(0, profile.noise, (count, samples))
+            )
+            self._add_breaches(rng, series, present, seconds, profile, first)
+            if profile.floor is not None or profile.ceiling is not None:
+                np.clip(series, profile.floor, profile.ceiling, out=series)
+            values[index] = series
+            self._track(index, devices, present, seconds)
+
+        # Time-major order: (sample, device, metric)
+        mask = np.broadcast_to(present.T[:, :, None], (samples, count, len(self.profiles)))
+        timestamps = np.broadcast_to(seconds.T[:, :, None], mask.shape)[mask]
+        return Chunk(
+            device_ids=np.broadcast_to(self.device_ids[devices][None, :, None], mask.shape)[mask],
+            definition_ids=np.broadcast_to(self.definition_ids[None, None, :], mask.shape)[mask],
+            values=np.round(values.transpose(2, 1, 0)[mask], 4),
+            timestamps_us=timestamps.astype(np.int64) * 1_000_000,
+        )
+
+    def _add_breaches(self, rng, series, present, seconds, profile: MetricProfile, first: int) -> None:
+        """Push a few series beyond the profile limits for a short while."""
+        np = self.np
+        count, samples = series.shape
+        rows = np.flatnonzero(rng.random(count) < self.spec.breach_rate)
+        if not len(rows):
+            return
+        span = max(profile.max_limit - profile.min_limit, 1.0)
+        lengths = rng.integers(3, max(4, min(30, samples // 4)), len(rows))
+        starts = rng.integers(0, max(1, samples - lengths.max()), len(rows))
+        above = rng.random(len(rows)) < 0.8
+        excess = span * (0.05 + 0.15 * rng.random(len(rows)))
+        for row, start, length, high, extra in zip(rows, starts, lengths, above, excess):
+            window = slice(start, start + length)
+            if high:
+                peak = profile.max_limit + extra
+            elif profile.floor is not None and profile.min_limit - extra < profile.floor:
+                continue
+            else:
+                peak = profile.min_limit - extra
+            series[row, window] = peak + rng.normal(0, profile.noise, length)
+            visible = np.flatnonzero(present[row, window])
+            if len(visible):
+                self.breaches.append(Breach(
+                    device_index=first + int(row),
+                    metric=profile.name,
+                    timestamp_us=int(seconds[row, start + visible[0]]) * 1_000_000,
+                    peak=round(float(peak), 4),
+                ))
+
+    def _track(self, index: int, devices: slice, present, seconds) -> None:
+        np = self.np
+        sampled = present.any(axis=1)
+        self.counts[index, devices] += present.sum(axis=1)
+        first_seen = np.where(present, seconds, np.iinfo(np.int64).max).min(axis=1) * 1_000_000
+        last_seen = np.where(present, seconds, -1).max(axis=1) * 1_000_000
+        current_first = self.first_us[index, devices]
+        self.first_us[index, devices] = np.where(
+            sampled & (current_first < 0), first_seen, current_first
+        )
+        self.last_us[index, devices] = np.where(sampled, last_seen, self.last_us[index, devices])
+
+
+def encode_copy_binary(chunk: Chunk, float_storage: bool) -> bytes:
+    """
+    Encode a chunk in PostgreSQL's binary COPY format.
+
+    Key columns are as wide as the primary keys they reference (``key_width()``).
+    Values are written as float8, or as numeric with three base-10000 digits
+    (two integer, one fractional, i.e. 4 decimal places) for the default
+    NUMERIC(20, 10) column; PostgreSQL normalizes the digits on input.
+    """
+    np = _numpy()
+    device_width, definition_width = key_width(Device), key_width(MetricDefinition)
+    fields: list[tuple[str, str]] = [
+        ('count', '>i2'),
+        ('device_len', '>i4'), ('device', f'>i{device_width}'),
+        ('definition_len', '>i4'), ('definition', f'>i{definition_width}'),
+        ('value_len', '>i4'),
+    ]
+    if float_storage:
+        fields += [('value', '>f8')]
+    else:
+        fields += [
+            ('ndigits', '>i2'), ('weight', '>i2'), ('sign', '>u2'), ('dscale', '>i2'),
+            ('digit0', '>i2'), ('digit1', '>i2'), ('digit2', '>i2'),
+        ]
+    fields += [('timestamp_len', '>i4'), ('timestamp', '>i8')]
+
+    rows = np.empty(len(chunk), dtype=np.dtype(fields))
+    rows['count'] = 4
+    rows['device_len'], rows['device'] = device_width, chunk.device_ids
+    rows['definition_len'], rows['definition'] = definition_width, chunk.definition_ids
+    if float_storage:
+        rows['value_len'], rows['value'] = 8, chunk.values
+    else:
+        scaled = np.rint(np.abs(chunk.values) * 10000).astype(np.int64)
+        if len(scaled) and scaled.max() >= 10 ** 12:
+            raise SyntheticDataError('Synthetic values must stay below 1e8 in absolute value')
+        rows['value_len'] = 14
+        rows['ndigits'], rows['weight'], rows['dscale'] = 3, 1, 4
+        rows['sign'] = np.where(chunk.values < 0, 0x4000, 0)
+        rows['digit0'] = scaled // 10 ** 8
+        rows['digit1'] = (scaled // 10 ** 4) % 10 ** 4
+        rows['digit2'] = scaled % 10 ** 4
+    rows['timestamp_len'], rows['timestamp'] = 8, chunk.timestamps_us - _PG_EPOCH_US
+    return _COPY_HEADER + rows.tobytes() + _COPY_TRAILER
+
+
+def _copy(chunk: Chunk) -> None:
+    """Load a chunk with binary COPY (psycopg2 or psycopg 3)."""
+    payload = encode_copy_binary(chunk, uses_float_storage())
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            raw.copy_expert(_COPY_SQL, io.BytesIO(payload))
+        else:
+            with raw.copy(_COPY_SQL) as copy:
+                copy.write(payload)
+
+
+def _bulk_create(chunk: Chunk) -> None:
+    """Load a chunk through the ORM (databases without COPY)."""
+    Measurement.objects.bulk_create(
+        (
+            Measurement(
+                device_id=device_id,
+                definition_id=definition_id,
+                value=value,
+                timestamp=datetime.fromtimestamp(timestamp_us / 1_000_000, timezone.utc),
+            )
+            for device_id, definition_id, value, timestamp_us in zip(
+                chunk.device_ids.tolist(), chunk.definition_ids.tolist(),
+                chunk.values.tolist(), chunk.timestamps_us.tolist(),
+            )
+        ),
+        batch_size=5000,
+    )
+
+
+def loader() -> Callable[[Chunk], None]:
+    """Return the fastest loader for the default database."""
+    return _copy if connection.vendor == 'postgresql' else _bulk_create
+
+
+def create_devices(spec: FleetSpec) -> list[Device]:
+    """Create the devices (deterministic public_ids), categories and thresholds of a fleet."""
+    np = _numpy()
+    rng = np.random.default_rng([spec.seed, 0xDE71CE])
+    categories = [
+        Category.objects.get_or_create(
+            name=f'{spec.prefix} {name}',
+            defaults={'description': f'Synthetic {name} sensors'},
+        )[0]
+        for name in spec.metrics
+    ]
+    draws = rng.random(spec.devices)
+    statuses = []
+    for draw in draws:
+        status, cumulative = Device.Status.ACTIVE, 0.0
+        for candidate, share in _STATUS_SHARES:
+            cumulative += share
+            if draw < cumulative:
+                status = candidate
+                break
+        statuses.append(status)
+    width = len(str(spec.devices))
+    devices = Device.objects.bulk_create(
+        (
+            Device(
+                public_id=uuid.UUID(bytes=rng.bytes(16), version=4),
+                name=f'{spec.prefix} {index + 1:0{width}d}',
+                status=statuses[index],
+                category=categories[index % len(categories)],
+                description='Generated by generate_fleet',
+            )
+            for index in range(spec.devices)
+        ),
+        batch_size=5000,
+    )
+    MeasurementThreshold.objects.bulk_create(
+        (
+            MeasurementThreshold(
+                device=device,
+                metric_name=profile.name,
+                min_limit=profile.min_limit,
+                max_limit=profile.max_limit,
+            )
+            for device in devices
+            for profile in (PROFILES[name] for name in spec.metrics)
+        ),
+        batch_size=5000,
+    )
+    return devices
+
+
+def _datetime(timestamp_us: int) -> datetime:
+    return datetime.fromtimestamp(timestamp_us / 1_000_000, timezone.utc)
+
+
+def write_catalog(generator: SeriesGenerator) -> int:
+    """Write the metric catalog from the generator statistics (no table scan)."""
+    entries = [
+        DeviceMetric(
+            device_id=int(generator.device_ids[device]),
+            metric=profile.name,
+            unit=profile.unit,
+            first_seen=_datetime(int(generator.first_us[index, device])),
+            last_seen=_datetime(int(generator.last_us[index, device])),
+            sample_count=int(generator.counts[index, device]),
+        )
+        for index, profile in enumerate(generator.profiles)
+        for device in range(generator.spec.devices)
+        if generator.counts[index, device]
+    ]
+    DeviceMetric.objects.bulk_create(entries, batch_size=5000)
+    return len(entries)
+
+
+def write_alerts(generator: SeriesGenerator, devices: list[Device]) -> int:
+    """Create an alert per breach; the last day's alerts stay pending, older ones are resolved."""
+    profiles = {profile.name: profile for profile in generator.profiles}
+    recent_us = int((generator.spec.end - timedelta(days=1)).timestamp()) * 1_000_000
+    alerts = []
+    for breach in generator.breaches:
+        profile = profiles[breach.metric]
+        created_at = _datetime(breach.timestamp_us)
+        pending = breach.timestamp_us >= recent_us
+        limit = profile.max_limit if breach.peak > profile.max_limit else profile.min_limit
+        alerts.append(Alert(
+            device=devices[breach.device_index],
+            title=f'Threshold Violation: {breach.metric}',
+            message=f'{breach.metric} {"above maximum" if breach.peak > limit else "below minimum"}: '
+                    f'{breach.peak}{profile.unit} (limit {limit}{profile.unit})',
+            severity=Alert.Severity.HIGH,
+            status=Alert.Status.PENDING if pending else Alert.Status.RESOLVED,
+            resolved_at=None if pending else created_at + timedelta(hours=1),
+        ))
+    Alert.objects.bulk_create(alerts, batch_size=5000)
+    # created_at/updated_at are auto fields: backdate them to the breach time afterwards
+    for alert, breach in zip(alerts, generator.breaches):
+        alert.created_at = alert.updated_at = _datetime(breach.timestamp_us)
+    Alert.objects.bulk_update(alerts, ['created_at', 'updated_at'], batch_size=1000)
+    return len(alerts)
+
+
+def generate_fleet(spec: FleetSpec, progress: Optional[Callable[[int, int], None]] = None, alerts: bool = True) -> dict[str, int]:
+    """
+    Create a synthetic fleet and its measurements.
+
+    Args:
+        spec: Fleet parameters.
+        progress: Called with (rows loaded so far, planned rows) after each chunk.
+        alerts: Create an alert per threshold breach.
+
+    Returns:
+        Counts of created devices, measurements, catalog entries and alerts.
+
+    Raises:
+        SyntheticDataError: If NumPy is missing or the parameters are invalid.
+    """
+    with transaction.atomic():
+        devices = create_devices(spec)
+        definitions = [
+            MetricDefinition.objects.resolve(name, PROFILES[name].unit).id for name in spec.metrics
+        ]
+    generator = SeriesGenerator(spec, [device.id for device in devices], definitions)
+
+    load = loader()
+    rows = 0
+    for chunk in generator:
+        load(chunk)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows, spec.planned_rows)
+
+    with transaction.atomic():
+        catalog = write_catalog(generator)
+        created_alerts = write_alerts(generator, devices) if alerts else 0
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE measurements')
+    return {'devices': len(devices), 'measurements': rows, 'catalog': catalog, 'alerts': created_alerts}
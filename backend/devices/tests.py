@@ -4,7 +4,25 @@ Tests for devices app.
 Following Django & Python best practices.
 Test coverage for Device, Measurement, Alert models and their serializers.
 """
-from django.test import TestCase
+import asyncio
+import functools
+import importlib.util
+import json
+import tempfile
+import unittest
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
@@ -12,8 +30,27 @@ from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
-from .models import Category, Device, Measurement, Alert, MeasurementThreshold
+from typing import Optional
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from .models import Category, Device, Measurement, Alert, MeasurementThreshold, DeviceMetric, MetricDefinition, MeasurementArchive, MeasurementArchiveRange
 from .services.alert_service import check_for_alert
+from .services.metric_catalog import record_measurement, rebuild_metric_catalog
+from .fields import MeasurementValueField
+from .services.aggregation import recent_measurements, compute_statistics
+from .services.measurement_indexes import create_brin_indexes, explain
+from .services.archive import ArchiveError, archive_day, archive_range, read_archived_measurements
+from .services.realtime import device_group_name, publish_alert_event, publish_measurement
+from .services.snapshot import get_snapshot, record_update
+from .delivery import DeliveryPolicy, DeliveryScheduler
+from . import backpressure, metrics
+from .backpressure import POLICY_COALESCE, POLICY_DISCONNECT, RESYNC_CLOSE_CODE, SendQueue
+from .consumers import DeviceConsumer
+from .fleet import FLEET_GROUP, FleetFilter
+from .encoding import CODECS, JSON_CODEC, broadcast_event, compact_frame, negotiate
+from .routing import websocket_urlpatterns
+from accounts.middleware import JWTAuthMiddleware
+from core.testing import QueryBudgetMixin
 from .serializers import (
     CategorySerializer,
     DeviceSerializer,
@@ -24,6 +61,9 @@ from .serializers import (
 
 User = get_user_model()
 
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
 
 class DeviceModelTestCase(TestCase):
     """Test cases for Device model."""
@@ -1180,3 +1220,1456 @@ class DeviceViewSetAPITestCase(APITestCase):
         self.assertEqual(results[0]['id'], device2.id)
         self.assertEqual(results[1]['id'], device1.id)
 
+
+class MetricCatalogServiceTestCase(TestCase):
+    """Testes unitários para o catálogo de métricas por dispositivo."""
+
+    def setUp(self):
+        self.device = Device.objects.create(name='Sensor Catalog', status=Device.Status.ACTIVE)
+        self.now = timezone.now()
+
+    def _ingest(self, metric: str, unit: str, minutes_ago: int) -> Measurement:
+        measurement = Measurement.objects.create(
+            device=self.device,
+            metric=metric,
+            value=Decimal('1.0'),
+            unit=unit,
+            timestamp=self.now - timedelta(minutes=minutes_ago),
+        )
+        record_measurement(measurement)
+        return measurement
+
+    def test_first_sighting_creates_entry(self):
+        measurement = self._ingest('temperature', '°C', 0)
+        entry = DeviceMetric.objects.get(device=self.device, metric='temperature')
+        self.assertEqual(entry.unit, '°C')
+        self.assertEqual(entry.sample_count, 1)
+        self.assertEqual(entry.first_seen, measurement.timestamp)
+        self.assertEqual(entry.last_seen, measurement.timestamp)
+
+    def test_subsequent_samples_update_entry(self):
+        self._ingest('temperature', '°C', 10)
+        newest = self._ingest('temperature', 'K', 0)
+        oldest = self._ingest('temperature', 'K', 20)
+        entry = DeviceMetric.objects.get(device=self.device, metric='temperature')
+        self.assertEqual(entry.sample_count, 3)
+        self.assertEqual(entry.unit, 'K')
+        self.assertEqual(entry.first_seen, oldest.timestamp)
+        self.assertEqual(entry.last_seen, newest.timestamp)
+        self.assertEqual(DeviceMetric.objects.filter(device=self.device).count(), 1)
+
+    def test_rebuild_matches_measurements(self):
+        for minutes_ago, unit in ((0, '%'), (5, 'pct')):
+            Measurement.objects.create(
+                device=self.device,
+                metric='humidity',
+                value=Decimal('50.0'),
+                unit=unit,
+                timestamp=self.now - timedelta(minutes=minutes_ago),
+            )
+        written = rebuild_metric_catalog([self.device.id])
+        self.assertEqual(written, 1)
+        entry = DeviceMetric.objects.get(device=self.device, metric='humidity')
+        self.assertEqual(entry.sample_count, 2)
+        # Unit of the newest sample, not the largest one
+        self.assertEqual(entry.unit, '%')
+
+
+class DeviceMetricsViewAPITestCase(APITestCase):
+    """Test cases for the device metrics endpoint backed by the metric catalog."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='metrics_user',
+            email='metrics@example.com',
+            password='testpass123'
+        )
+        self.user.role = 'operator'
+        self.user.save()
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}')
+        self.device = Device.objects.create(name='Sensor Metrics', status=Device.Status.ACTIVE)
+
+    def _post(self, metric: str, unit: str):
+        payload = {
+            'metric': metric,
+            'value': '21.5',
+            'unit': unit,
+            'timestamp': timezone.now().isoformat(),
+        }
+        return self.client.post(f'/api/devices/{self.device.id}/measurements/', payload, format='json')
+
+    def test_ingestion_populates_catalog(self):
+        self._post('temperature', '°C')
+        self._post('temperature', '°C')
+        self._post('humidity', '%')
+
+        response = self.client.get(f'/api/devices/{self.device.id}/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['metrics'], ['humidity', 'temperature'])
+        catalog = {entry['metric']: entry for entry in response.data['catalog']}
+        self.assertEqual(catalog['temperature']['sample_count'], 2)
+        self.assertEqual(catalog['humidity']['unit'], '%')
+
+    def test_metrics_does_not_scan_measurements(self):
+        self._post('temperature', '°C')
+        with self.assertNumQueries(3):
+            # JWT user lookup, device lookup and catalog read
+            response = self.client.get(f'/api/devices/{self.device.id}/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_unknown_device_returns_404(self):
+        response = self.client.get('/api/devices/999999/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MetricDefinitionTestCase(TestCase):
+    """Testes para o dicionário de métricas/unidades (MetricDefinition)."""
+
+    def setUp(self):
+        MetricDefinition.objects.clear_cache()
+        self.device = Device.objects.create(name='Sensor Interned', status=Device.Status.ACTIVE)
+
+    def tearDown(self):
+        MetricDefinition.objects.clear_cache()
+
+    def _create(self, metric: str, unit: str) -> Measurement:
+        return Measurement.objects.create(
+            device=self.device,
+            metric=metric,
+            value=Decimal('1.0'),
+            unit=unit,
+            timestamp=timezone.now(),
+        )
+
+    def test_measurements_share_definition(self):
+        first = self._create('temperature', '°C')
+        second = self._create('temperature', '°C')
+        other_unit = self._create('temperature', 'K')
+        self.assertEqual(first.definition_id, second.definition_id)
+        self.assertNotEqual(first.definition_id, other_unit.definition_id)
+        self.assertEqual(MetricDefinition.objects.count(), 2)
+
+    def test_resolve_caches_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            definition = MetricDefinition.objects.resolve('humidity', '%')
+        with self.assertNumQueries(0):
+            self.assertEqual(MetricDefinition.objects.resolve('humidity', '%'), definition)
+
+    def test_resolve_cache_is_bounded_lru(self):
+        manager = MetricDefinition.objects
+        with mock.patch.object(type(manager), 'cache_size', 2):
+            for name in ('a', 'b'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    manager.resolve(name, 'u')
+            manager.resolve('a', 'u')
+            with self.captureOnCommitCallbacks(execute=True):
+                manager.resolve('c', 'u')
+        self.assertEqual(list(manager._cache), [('a', 'u'), ('c', 'u')])
+
+    def test_resolve_does_not_cache_uncommitted_definitions(self):
+        MetricDefinition.objects.resolve('pressure', 'hPa')
+        self.assertNotIn(('pressure', 'hPa'), MetricDefinition.objects._cache)
+
+    def test_string_properties_roundtrip(self):
+        measurement = self._create('pressure', 'hPa')
+        loaded = Measurement.objects.get(id=measurement.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(loaded.metric, 'pressure')
+            self.assertEqual(loaded.unit, 'hPa')
+
+    def test_serializer_keeps_string_contract(self):
+        measurement = self._create('co2', 'ppm')
+        data = MeasurementSerializer(measurement).data
+        self.assertEqual(data['metric'], 'co2')
+        self.assertEqual(data['unit'], 'ppm')
+        self.assertNotIn('definition', data)
+
+    def test_aggregated_data_filters_by_metric_name(self):
+        self._create('temperature', '°C')
+        self._create('humidity', '%')
+        user = User.objects.create_user(username='agg_user', email='agg@example.com', password='testpass123')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {str(RefreshToken.for_user(user).access_token)}')
+        response = client.get(f'/api/devices/{self.device.id}/aggregated-data/?metric=TEMPERATURE')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['measurements'][0]['metric'], 'temperature')
+
+
+class MeasurementValueStorageTestCase(TestCase):
+    """Testes para o modo de armazenamento configurável de Measurement.value."""
+
+    def setUp(self):
+        self.field = Measurement._meta.get_field('value')
+        self.device = Device.objects.create(name='Sensor Storage', status=Device.Status.ACTIVE)
+
+    def test_decimal_storage_is_default(self):
+        self.assertIsInstance(self.field, MeasurementValueField)
+        self.assertEqual(self.field.get_internal_type(), 'DecimalField')
+        self.assertEqual(self.field.to_python('1.5'), Decimal('1.5'))
+
+    def test_deconstruct_is_independent_of_storage(self):
+        with override_settings(MEASUREMENT_VALUE_STORAGE='float'):
+            _, path, _, kwargs = self.field.deconstruct()
+        self.assertEqual(path, 'devices.fields.MeasurementValueField')
+        self.assertNotIn('storage', kwargs)
+        self.assertEqual(kwargs['max_digits'], 20)
+
+    @override_settings(MEASUREMENT_VALUE_STORAGE='float')
+    def test_float_storage_uses_float_column(self):
+        self.assertEqual(self.field.get_internal_type(), 'FloatField')
+        self.assertEqual(self.field.to_python('1.5'), 1.5)
+        pinned = MeasurementValueField(max_digits=20, decimal_places=10, storage='decimal')
+        self.assertEqual(pinned.get_internal_type(), 'DecimalField')
+
+    @override_settings(MEASUREMENT_VALUE_STORAGE='float')
+    def test_float_storage_serializes_numbers(self):
+        measurement = Measurement.objects.create(
+            device=self.device,
+            metric='temperature',
+            value=25.5,
+            unit='°C',
+            timestamp=timezone.now(),
+        )
+        data = MeasurementSerializer(measurement).data
+        self.assertEqual(data['value'], 25.5)
+
+    @override_settings(MEASUREMENT_VALUE_STORAGE='float')
+    def test_float_storage_accepts_more_than_ten_decimals(self):
+        serializer = MeasurementSerializer(data={
+            'device': self.device.id,
+            'metric': 'current',
+            'value': 1.5e-12,
+            'unit': 'A',
+            'timestamp': timezone.now().isoformat(),
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_alert_check_handles_float_values(self):
+        MeasurementThreshold.objects.create(
+            device=self.device,
+            metric_name='temperature',
+            min_limit=Decimal('10.0'),
+            max_limit=Decimal('30.0'),
+        )
+        measurement = Measurement(device=self.device, metric='temperature', value=30.1, unit='°C')
+        violated, message = check_for_alert(measurement)
+        self.assertTrue(violated)
+        self.assertIn('30.1°C', message)
+
+
+class MeasurementIndexReportTestCase(TestCase):
+    """Testes para o serviço de agregação e o relatório de índices de measurements."""
+
+    def setUp(self):
+        self.device = Device.objects.create(name='Sensor Index', status=Device.Status.ACTIVE)
+        now = timezone.now()
+        for hours_ago, value in ((1, '10.0'), (30, '20.0'), (24 * 10, '30.0')):
+            record_measurement(Measurement.objects.create(
+                device=self.device,
+                metric='temperature',
+                value=Decimal(value),
+                unit='°C',
+                timestamp=now - timedelta(hours=hours_ago),
+            ))
+
+    def test_recent_measurements_respects_period(self):
+        self.assertEqual(recent_measurements(self.device, period='last_24h').count(), 1)
+        self.assertEqual(recent_measurements(self.device, period='last_7d').count(), 2)
+        self.assertEqual(recent_measurements(self.device, period='all').count(), 3)
+        self.assertEqual(recent_measurements(self.device, period='all', limit=2).count(), 2)
+
+    def test_compute_statistics(self):
+        statistics = compute_statistics(recent_measurements(self.device, period='last_7d'))
+        self.assertEqual(statistics, {'mean': 15.0, 'max': 20.0, 'min': 10.0})
+        empty = compute_statistics(recent_measurements(self.device, metric='humidity'))
+        self.assertEqual(empty, {'mean': None, 'max': None, 'min': None})
+
+    def test_brin_indexes_are_skipped_outside_postgresql(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('BRIN indexes are supported on PostgreSQL')
+        self.assertEqual(create_brin_indexes(connection), [])
+
+    def test_explain_returns_plan_lines(self):
+        plan = explain(connection, 'SELECT id FROM measurements WHERE device_id = 1')
+        self.assertTrue(plan)
+
+    def test_report_command_prints_plans(self):
+        out = StringIO()
+        call_command('measurement_index_report', '--device', str(self.device.id), stdout=out)
+        output = out.getvalue()
+        self.assertIn('period=last_24h metric=-', output)
+        self.assertIn('period=all metric=temperature', output)
+        self.assertIn('SELECT', output)
+
+
+@unittest.skipUnless(HAS_PYARROW, 'pyarrow is not installed')
+class MeasurementArchiveTestCase(APITestCase):
+    """Test cases for the Parquet cold tier and its merge into aggregated data."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        settings_override = override_settings(MEASUREMENT_ARCHIVE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='archive_user', email='archive@example.com', password='testpass123')
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}')
+
+        self.device = Device.objects.create(name='Sensor Archive', status=Device.Status.ACTIVE)
+        self.other = Device.objects.create(name='Sensor Other', status=Device.Status.ACTIVE)
+        self.now = timezone.now()
+        self.old_day = (self.now - timedelta(days=120)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for hour in range(3):
+            Measurement.objects.create(
+                device=self.device, metric='temperature', value=Decimal('20.5') + hour,
+                unit='°C', timestamp=self.old_day + timedelta(hours=hour)
+            )
+        Measurement.objects.create(
+            device=self.device, metric='humidity', value=Decimal('55.0'),
+            unit='%', timestamp=self.old_day + timedelta(hours=5)
+        )
+        Measurement.objects.create(
+            device=self.other, metric='temperature', value=Decimal('99.0'),
+            unit='°C', timestamp=self.old_day + timedelta(hours=1)
+        )
+        Measurement.objects.create(
+            device=self.device, metric='temperature', value=Decimal('30.0'),
+            unit='°C', timestamp=self.now - timedelta(hours=1)
+        )
+
+    def test_archive_day_moves_rows_to_parquet(self):
+        archive = archive_day(self.old_day, self.old_day + timedelta(days=1))
+
+        self.assertEqual(archive.row_count, 5)
+        self.assertTrue(archive.path.startswith(f'year={self.old_day.year:04d}/month={self.old_day.month:02d}/'))
+        self.assertGreater(archive.size_bytes, 0)
+        self.assertEqual(Measurement.objects.count(), 1)
+        self.assertEqual(MeasurementArchive.objects.count(), 1)
+
+    def test_archive_range_skips_empty_days(self):
+        archives = archive_range(self.old_day - timedelta(days=2), self.old_day + timedelta(days=1))
+        self.assertEqual(len(archives), 1)
+
+    def test_open_range_is_rejected(self):
+        with self.assertRaises(ArchiveError):
+            archive_day(self.now - timedelta(hours=2), self.now + timedelta(hours=1))
+        self.assertEqual(Measurement.objects.count(), 6)
+
+    def test_read_archived_measurements_filters_device_and_metric(self):
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+
+        rows = read_archived_measurements(self.device, metric='TEMPERATURE', limit=2)
+        self.assertEqual([float(m.value) for m in rows], [22.5, 21.5])
+        self.assertEqual(rows[0].metric, 'temperature')
+        self.assertEqual(rows[0].unit, '°C')
+        self.assertEqual(rows[0].device_id, self.device.id)
+
+    def test_aggregated_data_merges_cold_tier(self):
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+
+        response = self.client.get(
+            f'/api/devices/{self.device.id}/aggregated-data/', {'metric': 'temperature', 'limit': 3}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [float(m['value']) for m in response.data['measurements']], [30.0, 22.5, 21.5]
+        )
+        self.assertEqual(response.data['statistics']['max'], 30.0)
+        self.assertAlmostEqual(response.data['statistics']['mean'], 74.0 / 3)
+
+    def test_aggregated_data_empty_limit_with_archive(self):
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+
+        response = self.client.get(f'/api/devices/{self.device.id}/aggregated-data/', {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+        self.assertIsNone(response.data['statistics']['mean'])
+
+    def test_aggregated_data_skips_cold_tier_for_recent_period(self):
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+
+        response = self.client.get(f'/api/devices/{self.device.id}/aggregated-data/', {'period': 'last_24h'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_archive_records_device_ranges(self):
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+        ranges = {r.device_id: r for r in MeasurementArchiveRange.objects.all()}
+        self.assertEqual(set(ranges), {self.device.id, self.other.id})
+        self.assertEqual(ranges[self.device.id].row_count, 4)
+        self.assertEqual(ranges[self.device.id].first_timestamp, self.old_day)
+        self.assertEqual(ranges[self.device.id].last_timestamp, self.old_day + timedelta(hours=5))
+
+    def test_cold_reads_only_open_files_of_the_device(self):
+        next_day = self.old_day + timedelta(days=1)
+        Measurement.objects.create(
+            device=self.other, metric='temperature', value=Decimal('98.0'),
+            unit='°C', timestamp=next_day + timedelta(hours=1)
+        )
+        archive_range(self.old_day, next_day + timedelta(days=1))
+        self.assertEqual(MeasurementArchive.objects.count(), 2)
+
+        import pyarrow.parquet
+        with mock.patch.object(pyarrow.parquet, 'read_table', wraps=pyarrow.parquet.read_table) as read_table:
+            rows = read_archived_measurements(self.device, limit=10)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(read_table.call_count, 1)
+
+        idle = Device.objects.create(name='Sensor Idle', status=Device.Status.ACTIVE)
+        with mock.patch.object(pyarrow.parquet, 'read_table') as read_table:
+            self.assertEqual(read_archived_measurements(idle), [])
+        read_table.assert_not_called()
+
+    def test_archive_removes_samples_from_the_catalog(self):
+        rebuild_metric_catalog()
+        archive_day(self.old_day, self.old_day + timedelta(days=1))
+        entries = {(e.device_id, e.metric): e for e in DeviceMetric.objects.all()}
+        # Only the recent temperature sample of the device is left in the database
+        self.assertEqual(list(entries), [(self.device.id, 'temperature')])
+        entry = entries[(self.device.id, 'temperature')]
+        self.assertEqual(entry.sample_count, 1)
+        self.assertEqual(entry.first_seen, self.now - timedelta(hours=1))
+
+    def test_command_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('archive_measurements', '--dry-run', stdout=out)
+        self.assertIn('5 medições seriam arquivadas', out.getvalue())
+        self.assertEqual(Measurement.objects.count(), 6)
+
+    def test_command_archives_older_than_retention(self):
+        out = StringIO()
+        call_command('archive_measurements', '--older-than-days', '90', stdout=out)
+        self.assertIn('5 medições arquivadas', out.getvalue())
+        self.assertEqual(Measurement.objects.count(), 1)
+
+
+class MultiplexDeviceConsumerTestCase(TestCase):
+    """Test cases for the multiplexed WebSocket consumer (ws/devices/)."""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Wall')
+        self.first = Device.objects.create(name='Wall A', status=Device.Status.ACTIVE, category=self.category)
+        self.second = Device.objects.create(name='Wall B', status=Device.Status.ACTIVE, category=self.category)
+        self.loose = Device.objects.create(name='Loose', status=Device.Status.ACTIVE)
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/devices/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        welcome = await communicator.receive_json_from()
+        self.assertEqual(welcome['type'], 'connection_established')
+        return communicator
+
+    async def _publish(self, device, value):
+        await get_channel_layer().group_send(device_group_name(device.public_id), {
+            'type': 'measurement_update',
+            'device_id': str(device.public_id),
+            'measurement': {'metric': 'temperature', 'value': value},
+        })
+
+    async def _subscribe_mixed(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'devices': [str(self.loose.public_id), 'not-a-uuid', '00000000-0000-0000-0000-000000000000'],
+            'categories': [self.category.id],
+        })
+        response = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return response
+
+    def test_subscribe_devices_and_categories_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = async_to_sync(self._subscribe_mixed)()
+        self.assertEqual(response['type'], 'subscribed')
+        self.assertEqual(len(response['devices']), 3)
+        self.assertEqual(response['invalid'], ['not-a-uuid', '00000000-0000-0000-0000-000000000000'])
+
+    async def test_updates_are_tagged_by_device(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({'action': 'subscribe', 'categories': [self.category.id]})
+        await communicator.receive_json_from()
+
+        await self._publish(self.second, '1.5')
+        update = await communicator.receive_json_from()
+        self.assertEqual(update['type'], 'measurement_update')
+        self.assertEqual(update['device_id'], str(self.second.public_id))
+        self.assertEqual(update['measurement']['value'], '1.5')
+
+        await self._publish(self.loose, '9.9')
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_unsubscribe_stops_updates(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({'action': 'subscribe', 'devices': [str(self.first.public_id)]})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'unsubscribe', 'devices': [str(self.first.public_id)]})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['devices'], [str(self.first.public_id)])
+
+        await self._publish(self.first, '2.0')
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    @override_settings(WS_MAX_SUBSCRIPTIONS=1)
+    async def test_subscription_limit(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({'action': 'subscribe', 'categories': [self.category.id]})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_unknown_action_returns_error(self):
+        communicator = await self._connect()
+        await communicator.send_to(text_data='{"action": "dance"}')
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_batch_policy_groups_updates(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'categories': [self.category.id],
+            'policy': {'mode': 'batch', 'interval_ms': 50},
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['policy'], {'mode': 'batch', 'interval_ms': 50})
+
+        for value in ('1', '2', '3'):
+            await self._publish(self.first, value)
+        await self._publish(self.second, '4')
+        values = []
+        while len(values) < 4:
+            batch = await communicator.receive_json_from(timeout=2)
+            self.assertEqual(batch['type'], 'measurement_batch')
+            values.extend(u['measurement']['value'] for u in batch['updates'])
+        self.assertEqual(sorted(values), ['1', '2', '3', '4'])
+        await communicator.disconnect()
+
+    async def test_subscribe_with_snapshot(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({
+            'action': 'subscribe', 'categories': [self.category.id], 'snapshot': True, 'history': 5,
+        })
+        self.assertEqual((await communicator.receive_json_from())['type'], 'subscribed')
+        snapshots = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual({frame['type'] for frame in snapshots}, {'snapshot'})
+        self.assertEqual(
+            {frame['device_id'] for frame in snapshots},
+            {str(self.first.public_id), str(self.second.public_id)},
+        )
+        self.assertEqual(snapshots[0]['recent'], [])
+        await communicator.disconnect()
+
+    async def test_invalid_policy_is_rejected(self):
+        communicator = await self._connect()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'devices': [str(self.first.public_id)],
+            'policy': {'mode': 'batch', 'interval_ms': 1},
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
+
+
+class DeliverySchedulerTestCase(TestCase):
+    """Test cases for WebSocket delivery policies."""
+
+    def test_policy_parsing(self):
+        self.assertEqual(DeliveryPolicy.from_dict(None).mode, 'immediate')
+        self.assertEqual(DeliveryPolicy.from_dict({'max_fps': '2'}).interval, 0.5)
+        self.assertEqual(DeliveryPolicy.from_dict({'mode': 'latest'}).interval_ms, 500)
+        for invalid in ({'mode': 'turbo'}, {'max_fps': 0}, {'mode': 'batch', 'interval_ms': 'x'}):
+            with self.assertRaises(ValueError):
+                DeliveryPolicy.from_dict(invalid)
+
+    def test_immediate_passes_through(self):
+        scheduler = DeliveryScheduler()
+        self.assertEqual(scheduler.offer('d', 'temp', 1, now=0.0), [1])
+        self.assertIsNone(scheduler.next_deadline())
+
+    def test_max_fps_coalesces_to_latest_per_metric(self):
+        scheduler = DeliveryScheduler()
+        scheduler.set_policy('d', DeliveryPolicy(mode='max_fps', max_fps=2))
+        self.assertEqual(scheduler.offer('d', 'temp', 1, now=0.0), [1])
+        self.assertEqual(scheduler.offer('d', 'temp', 2, now=0.1), [])
+        self.assertEqual(scheduler.offer('d', 'temp', 3, now=0.2), [])
+        self.assertEqual(scheduler.offer('d', 'hum', 4, now=0.3), [])
+        self.assertEqual(scheduler.next_deadline(), 0.5)
+        self.assertEqual(scheduler.due(0.4), [])
+        (_, _, items), = scheduler.due(0.5)
+        self.assertEqual(items, [3, 4])
+
+    def test_latest_and_batch_flush_on_interval(self):
+        scheduler = DeliveryScheduler()
+        scheduler.set_policy('a', DeliveryPolicy(mode='latest', interval_ms=100))
+        scheduler.set_policy('b', DeliveryPolicy(mode='batch', interval_ms=200))
+        for now, value in ((0.0, 1), (0.05, 2)):
+            self.assertEqual(scheduler.offer('a', 'temp', value, now=now), [])
+            self.assertEqual(scheduler.offer('b', 'temp', value, now=now), [])
+        self.assertEqual([(sub, items) for sub, _, items in scheduler.due(0.1)], [('a', [2])])
+        self.assertEqual([(sub, items) for sub, _, items in scheduler.due(0.2)], [('b', [1, 2])])
+        self.assertIsNone(scheduler.next_deadline())
+
+
+class DeviceConsumerDeliveryTestCase(TestCase):
+    """Test cases for delivery policies on the single-device consumer."""
+
+    def setUp(self):
+        cache.clear()
+        self.device = Device.objects.create(name='Fast Sensor', status=Device.Status.ACTIVE)
+
+    def _communicator(self, query: str = ''):
+        path = f'/ws/device/{self.device.public_id}/{query}'
+        return WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+
+    async def _publish(self, metric, value):
+        await get_channel_layer().group_send(device_group_name(self.device.public_id), {
+            'type': 'measurement_update',
+            'device_id': str(self.device.public_id),
+            'measurement': {'metric': metric, 'value': value},
+        })
+
+    async def test_invalid_query_policy_closes_connection(self):
+        communicator = self._communicator('?mode=turbo')
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4400)
+
+    async def test_latest_policy_coalesces_per_metric(self):
+        communicator = self._communicator('?mode=latest&interval_ms=50')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+
+        for value in ('1', '2', '3'):
+            await self._publish('temperature', value)
+        latest = {}
+        while latest.get('temperature') != '3':
+            frame = await communicator.receive_json_from(timeout=2)
+            self.assertEqual(frame['type'], 'measurement_update')
+            latest[frame['measurement']['metric']] = frame['measurement']['value']
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await communicator.disconnect()
+
+    async def test_set_policy_message(self):
+        communicator = self._communicator()
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'set_policy', 'policy': {'max_fps': 1}})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {'type': 'policy_updated', 'policy': {'mode': 'max_fps', 'max_fps': 1.0}})
+
+        await self._publish('temperature', '1')
+        await self._publish('temperature', '2')
+        first = await communicator.receive_json_from()
+        self.assertEqual(first['measurement']['value'], '1')
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await communicator.disconnect()
+
+    def test_snapshot_sent_after_welcome(self):
+        for minutes, value in ((2, '20.0'), (1, '21.0')):
+            Measurement.objects.create(
+                device=self.device, metric='temperature', value=Decimal(value), unit='°C',
+                timestamp=timezone.now() - timedelta(minutes=minutes)
+            )
+            record_update(self.device.public_id, {'metric': 'temperature', 'value': value})
+        async_to_sync(self._check_snapshot)()
+
+    async def _check_snapshot(self):
+        communicator = self._communicator('?history=2')
+        await communicator.connect()
+        welcome = await communicator.receive_json_from()
+        self.assertEqual(welcome['type'], 'connection_established')
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'snapshot')
+        self.assertEqual(snapshot['device_id'], str(self.device.public_id))
+        self.assertEqual(snapshot['seq'], 2)
+        self.assertEqual(snapshot['latest']['temperature']['value'], '21.0000000000')
+        self.assertEqual(len(snapshot['recent']), 2)
+
+        await self._publish('temperature', '3')
+        update = await communicator.receive_json_from()
+        self.assertEqual(update['measurement']['value'], '3')
+        await communicator.disconnect()
+
+
+class DeviceSnapshotTestCase(TestCase):
+    """Test cases for cached WebSocket snapshots and sequence numbers."""
+
+    def setUp(self):
+        cache.clear()
+        self.device = Device.objects.create(name='Snapshot Sensor', status=Device.Status.ACTIVE)
+        self.now = timezone.now()
+        for minutes, metric, value in ((3, 'temperature', '20.0'), (2, 'humidity', '50.0'), (1, 'temperature', '21.0')):
+            measurement = Measurement.objects.create(
+                device=self.device, metric=metric, value=Decimal(value), unit='u',
+                timestamp=self.now - timedelta(minutes=minutes)
+            )
+            record_measurement(measurement)
+
+    def test_sequence_numbers_are_monotonic(self):
+        self.assertEqual(record_update(self.device.public_id, {'metric': 'temperature'}), 1)
+        self.assertEqual(record_update(self.device.public_id, {'metric': 'temperature'}), 2)
+
+    def test_snapshot_built_from_database_on_miss(self):
+        snapshot = get_snapshot(self.device.public_id, history=10)
+        self.assertEqual(snapshot['seq'], 0)
+        self.assertEqual(set(snapshot['latest']), {'temperature', 'humidity'})
+        self.assertEqual(snapshot['latest']['temperature']['value'], '21.0000000000')
+        self.assertEqual(len(snapshot['recent']), 3)
+        self.assertNotIn('recent', get_snapshot(self.device.public_id))
+
+    def test_cached_snapshot_served_without_queries(self):
+        get_snapshot(self.device.public_id)
+        seq = record_update(self.device.public_id, {'metric': 'pressure', 'value': '1.0'})
+        with self.assertNumQueries(0):
+            snapshot = get_snapshot(self.device.public_id, history=1)
+        self.assertEqual(snapshot['seq'], seq)
+        self.assertEqual(snapshot['latest']['pressure']['value'], '1.0')
+        self.assertEqual(snapshot['recent'], [{'metric': 'pressure', 'value': '1.0'}])
+
+    def test_late_measurements_never_replace_newer_values(self):
+        get_snapshot(self.device.public_id)
+        late = {'metric': 'temperature', 'value': '19.0', 'timestamp': (self.now - timedelta(minutes=5)).isoformat()}
+        record_update(self.device.public_id, late)
+        snapshot = get_snapshot(self.device.public_id, history=10)
+        self.assertEqual(snapshot['seq'], 1)
+        self.assertEqual(snapshot['latest']['temperature']['value'], '21.0000000000')
+        self.assertEqual(snapshot['recent'][-1]['value'], '19.0')
+
+        # Updates taking the lock out of sequence order are still applied
+        newer = {'metric': 'humidity', 'value': '55.0', 'timestamp': self.now.isoformat()}
+        record_update(self.device.public_id, {**newer, 'value': '56.0'})
+        record_update(self.device.public_id, newer)
+        self.assertEqual(get_snapshot(self.device.public_id)['latest']['humidity']['value'], '55.0')
+
+    @override_settings(WS_SNAPSHOT_POINTS=1)
+    def test_missing_metrics_are_loaded_in_one_query(self):
+        record_measurement(Measurement.objects.create(
+            device=self.device, metric='pressure', value=Decimal('1.0'), unit='bar',
+            timestamp=self.now - timedelta(minutes=10)
+        ))
+        # Recent points, then the newest measurement of every other metric
+        with self.assertNumQueries(2):
+            snapshot = get_snapshot(self.device.public_id)
+        self.assertEqual(set(snapshot['latest']), {'temperature', 'humidity', 'pressure'})
+        self.assertEqual(snapshot['latest']['humidity']['value'], '50.0000000000')
+
+    def test_busy_lock_drops_the_cached_snapshot(self):
+        get_snapshot(self.device.public_id)
+        cache.set(f'device_snapshot_lock:{self.device.public_id}', 'other-worker')
+        with mock.patch('devices.services.snapshot.LOCK_WAIT', 0), self.assertLogs('devices.services.snapshot', 'WARNING'):
+            record_update(self.device.public_id, {'metric': 'temperature', 'value': '22.0'})
+        self.assertIsNone(cache.get(f'device_snapshot:{self.device.public_id}'))
+
+
+class WebSocketEncodingTestCase(TestCase):
+    """Test cases for negotiated WebSocket encodings."""
+
+    measurement = {
+        'id': 7, 'device': 1, 'metric': 'temperature', 'value': '25.5000000000',
+        'unit': '°C', 'timestamp': '2024-01-01T12:00:00Z',
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.device = Device.objects.create(name='Binary Sensor', status=Device.Status.ACTIVE)
+
+    def test_compact_frame_converts_nested_measurements(self):
+        frame = compact_frame({'type': 'measurement_batch', 'updates': [{'measurement': self.measurement}]})
+        compact = frame['updates'][0]['measurement']
+        self.assertEqual(compact['value'], 25.5)
+        self.assertEqual(compact['timestamp'], 1704110400000)
+        self.assertEqual(self.measurement['value'], '25.5000000000')
+
+    def test_negotiation_prefers_client_order_and_defaults_to_json(self):
+        self.assertIsNone(negotiate(['bearer', 'graphql-ws']))
+        self.assertIsNone(negotiate([]))
+        if 'msgpack' in CODECS and 'cbor' in CODECS:
+            self.assertEqual(negotiate(['cbor', 'msgpack']).name, 'cbor')
+
+    def test_codecs_round_trip(self):
+        for codec in CODECS.values():
+            decoded = codec.decode(codec.encode({'type': 'measurement_update', 'measurement': self.measurement}))
+            self.assertEqual(float(decoded['measurement']['value']), 25.5)
+
+    @unittest.skipUnless('msgpack' in CODECS, 'msgpack is not installed')
+    def test_msgpack_subprotocol(self):
+        async_to_sync(self._check_msgpack)()
+
+    async def _check_msgpack(self):
+        codec = CODECS['msgpack']
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), '/ws/devices/', subprotocols=['bearer', 'msgpack']
+        )
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, 'msgpack')
+        self.assertEqual(codec.decode(await communicator.receive_from())['type'], 'connection_established')
+
+        await communicator.send_to(bytes_data=codec.encode({
+            'action': 'subscribe', 'devices': [str(self.device.public_id)],
+        }))
+        self.assertEqual(codec.decode(await communicator.receive_from())['type'], 'subscribed')
+
+        await get_channel_layer().group_send(device_group_name(self.device.public_id), {
+            'type': 'measurement_update',
+            'device_id': str(self.device.public_id),
+            'seq': 1,
+            'measurement': self.measurement,
+        })
+        update = codec.decode(await communicator.receive_from())
+        self.assertEqual(update['measurement']['value'], 25.5)
+        self.assertEqual(update['measurement']['timestamp'], 1704110400000)
+        await communicator.disconnect()
+
+    def test_json_remains_default(self):
+        async_to_sync(self._check_json)()
+
+    async def _check_json(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/devices/')
+        connected, subprotocol = await communicator.connect()
+        self.assertIsNone(subprotocol)
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], 'connection_established')
+        await communicator.disconnect()
+
+
+class SharedEncodingBroadcastTestCase(TestCase):
+    """Test cases for broadcast frames encoded once per codec and process."""
+
+    measurement = {
+        'id': 9, 'device': 1, 'metric': 'humidity', 'value': '61.2500000000',
+        'unit': '%', 'timestamp': '2024-01-01T12:00:00Z',
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.device = Device.objects.create(name='Fan-out Sensor', status=Device.Status.ACTIVE)
+
+    def test_encode_batch_matches_encoding_the_batch_frame(self):
+        for codec in CODECS.values():
+            for count in (1, 20, 300):
+                updates = [
+                    {'type': 'measurement_update', 'seq': seq, 'measurement': self.measurement}
+                    for seq in range(count)
+                ]
+                spliced = codec.encode_batch([codec.encode(update) for update in updates])
+                expected = codec.decode(codec.encode({'type': 'measurement_batch', 'updates': updates}))
+                self.assertEqual(codec.decode(spliced), expected, f'{codec.name} x{count}')
+
+    def test_publish_carries_the_frame_once(self):
+        async_to_sync(self._check_publish)()
+
+    async def _check_publish(self):
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(device_group_name(self.device.public_id), channel)
+        seq = await database_sync_to_async(publish_measurement)(self.device.public_id, self.measurement)
+
+        event = await channel_layer.receive(channel)
+        self.assertEqual(event['metric'], 'humidity')
+        self.assertNotIn('measurement', event)
+        self.assertIn('event_id', event)
+        self.assertEqual(event['frame']['seq'], seq)
+        self.assertEqual(event['frame']['device_id'], str(self.device.public_id))
+        self.assertEqual(event['frame']['measurement'], self.measurement)
+
+    def test_consumers_share_one_encoding_per_codec(self):
+        async_to_sync(self._check_shared)()
+
+    async def _check_shared(self):
+        public_id = str(self.device.public_id)
+        single = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/device/{public_id}/')
+        self.assertTrue((await single.connect())[0])
+        await single.receive_from()
+        await single.receive_from()
+        multiplex = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/devices/')
+        self.assertTrue((await multiplex.connect())[0])
+        await multiplex.receive_from()
+        await multiplex.send_json_to({'action': 'subscribe', 'devices': [public_id]})
+        await multiplex.receive_from()
+
+        # Both connections negotiated JSON: the frame is encoded for the first one only
+        frame = {'type': 'measurement_update', 'device_id': public_id, 'seq': 3, 'measurement': self.measurement}
+        with mock.patch.object(JSON_CODEC, 'encode', wraps=JSON_CODEC.encode) as encode:
+            await get_channel_layer().group_send(
+                device_group_name(public_id),
+                broadcast_event('measurement_update', frame, device_id=public_id, metric='humidity'),
+            )
+            self.assertEqual(json.loads(await single.receive_from()), frame)
+            self.assertEqual(json.loads(await multiplex.receive_from()), frame)
+        self.assertEqual(encode.call_count, 1)
+        await single.disconnect()
+        await multiplex.disconnect()
+
+    def test_batch_policy_splices_encoded_frames(self):
+        async_to_sync(self._check_batch)()
+
+    async def _check_batch(self):
+        public_id = str(self.device.public_id)
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/device/{public_id}/?mode=batch&interval_ms=50'
+        )
+        self.assertTrue((await communicator.connect())[0])
+        await communicator.receive_from()
+        await communicator.receive_from()
+        for seq in (1, 2):
+            frame = {'type': 'measurement_update', 'device_id': public_id, 'seq': seq, 'measurement': self.measurement}
+            await get_channel_layer().group_send(
+                device_group_name(public_id),
+                broadcast_event('measurement_update', frame, device_id=public_id, metric='humidity'),
+            )
+        batch = json.loads(await communicator.receive_from(timeout=2))
+        self.assertEqual(batch['type'], 'measurement_batch')
+        self.assertEqual([update['seq'] for update in batch['updates']], [1, 2])
+        await communicator.disconnect()
+
+
+class FleetEventStreamTestCase(APITestCase):
+    """Test cases for the fleet-wide event stream (ws/fleet/)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='fleet_user',
+            email='fleet@example.com',
+            password='testpass123'
+        )
+        self.user.role = 'admin'
+        self.user.save()
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.token = str(refresh.access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.category = Category.objects.create(name='Fleet Category')
+        self.device = Device.objects.create(
+            name='Fleet Sensor', status=Device.Status.ACTIVE, category=self.category
+        )
+
+    def _alert(self, severity: str) -> Alert:
+        return Alert.objects.create(
+            device=self.device, title='Fleet alert', message='Check it', severity=severity
+        )
+
+    def _communicator(self, query: str, token: Optional[str] = None) -> WebsocketCommunicator:
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        if token:
+            query = f'{query}&token={token}' if query else f'token={token}'
+        return WebsocketCommunicator(application, f'/ws/fleet/?{query}')
+
+    def test_filter_parsing_and_matching(self):
+        filters = FleetFilter.from_dict({'severity': 'high,critical', 'category': [self.category.id]})
+        alert_event = {'event': 'alert_created', 'severity': 'high', 'category_id': self.category.id}
+        self.assertTrue(filters.matches(alert_event))
+        self.assertFalse(filters.matches({**alert_event, 'severity': 'low'}))
+        self.assertFalse(filters.matches({**alert_event, 'category_id': None}))
+        # Status changes carry no severity
+        self.assertTrue(filters.matches({'event': 'device_status_changed', 'category_id': self.category.id}))
+        self.assertFalse(FleetFilter.from_dict({'events': 'alert_created'}).matches(
+            {'event': 'device_status_changed'}
+        ))
+        for invalid in ({'severity': 'urgent'}, {'events': ['deleted']}, {'category': 'abc'}):
+            with self.assertRaises(ValueError):
+                FleetFilter.from_dict(invalid)
+
+    def test_api_changes_are_published(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(FLEET_GROUP, channel)
+        alert = self._alert(Alert.Severity.HIGH)
+
+        # No transition, nothing published
+        response = self.client.patch(f'/api/alerts/{alert.id}/', {'title': 'Renamed alert'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(f'/api/alerts/{alert.id}/', {'status': 'resolved'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['event'], 'alert_resolved')
+        self.assertEqual(event['severity'], 'high')
+        frame = event['frame']
+        self.assertEqual(frame['alert']['id'], alert.id)
+        self.assertEqual(frame['device']['public_id'], str(self.device.public_id))
+
+        response = self.client.patch(f'/api/devices/{self.device.id}/', {'status': 'inactive'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['event'], 'device_status_changed')
+        self.assertEqual(event['category_id'], self.category.id)
+        frame = event['frame']
+        self.assertEqual((frame['previous_status'], frame['status']), ('active', 'inactive'))
+        async_to_sync(channel_layer.group_discard)(FLEET_GROUP, channel)
+
+    def test_consumer_applies_filters(self):
+        async_to_sync(self._check_filters)()
+
+    async def _check_filters(self):
+        communicator = self._communicator('severity=critical', self.token)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        welcome = await communicator.receive_json_from()
+        self.assertEqual(welcome['filters']['severity'], ['critical'])
+
+        high = await database_sync_to_async(self._alert)(Alert.Severity.HIGH)
+        critical = await database_sync_to_async(self._alert)(Alert.Severity.CRITICAL)
+        await database_sync_to_async(publish_alert_event)(high)
+        await database_sync_to_async(publish_alert_event)(critical)
+        frame = await communicator.receive_json_from()
+        self.assertEqual((frame['type'], frame['alert']['id']), ('alert_created', critical.id))
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({'action': 'set_filters', 'filters': {'events': ['device_status_changed']}})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'filters_updated')
+        await database_sync_to_async(publish_alert_event)(critical)
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({'action': 'set_filters', 'filters': {'severity': ['urgent']}})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
+
+    def test_invalid_query_filters_are_rejected(self):
+        async_to_sync(self._check_rejected)()
+
+    async def _check_rejected(self):
+        communicator = self._communicator('category=abc', self.token)
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4400)
+
+    @override_settings(WS_REQUIRE_AUTH=False)
+    def test_anonymous_connections_are_rejected(self):
+        async_to_sync(self._check_anonymous)()
+
+    async def _check_anonymous(self):
+        for token in (None, 'not-a-jwt'):
+            communicator = self._communicator('severity=critical', token)
+            connected, code = await communicator.connect()
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+
+class SendQueueTestCase(TestCase):
+    """Test cases for per-connection send queue accounting."""
+
+    def test_drop_oldest_keeps_the_newest_frames(self):
+        queue = SendQueue(max_frames=2, max_bytes=1024)
+        for value in ('a', 'b', 'c'):
+            self.assertTrue(queue.put(value, ('device', 'temperature')))
+        self.assertEqual([queue.get(), queue.get()], ['b', 'c'])
+        self.assertEqual(queue.stats()['dropped'], 1)
+        self.assertEqual(queue.stats()['max_depth'], 2)
+
+    def test_byte_limit(self):
+        queue = SendQueue(max_frames=10, max_bytes=5)
+        queue.put('abc')
+        queue.put('def')
+        self.assertEqual((len(queue), queue.bytes), (1, 3))
+        self.assertEqual(queue.get(), 'def')
+
+    def test_coalesce_replaces_pending_frame_of_the_same_series(self):
+        queue = SendQueue(max_frames=10, max_bytes=1024, policy=POLICY_COALESCE)
+        queue.put('t1', ('device', 'temperature'))
+        queue.put('h1', ('device', 'humidity'))
+        queue.put('t2', ('device', 'temperature'))
+        queue.put('batch')
+        queue.put('batch')
+        self.assertEqual([queue.get() for _ in range(len(queue))], ['t2', 'h1', 'batch', 'batch'])
+        self.assertEqual(queue.stats()['coalesced'], 1)
+        # Sent frames are no longer coalesced
+        queue.put('t3', ('device', 'temperature'))
+        self.assertEqual(len(queue), 1)
+
+    def test_disconnect_policy_refuses_overflow(self):
+        queue = SendQueue(max_frames=1, max_bytes=1024, policy=POLICY_DISCONNECT)
+        self.assertTrue(queue.put('a'))
+        self.assertFalse(queue.put('b'))
+        self.assertEqual(len(queue), 1)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            SendQueue(max_frames=1, max_bytes=1, policy='block')
+
+
+class SlowConsumerTestCase(TestCase):
+    """Test cases for WebSocket clients that stop reading."""
+
+    def setUp(self):
+        cache.clear()
+        self.device = Device.objects.create(name='Busy Sensor', status=Device.Status.ACTIVE)
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/device/{self.device.public_id}/'
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+        return communicator
+
+    async def _publish(self, values):
+        for value in values:
+            await get_channel_layer().group_send(device_group_name(self.device.public_id), {
+                'type': 'measurement_update',
+                'device_id': str(self.device.public_id),
+                'measurement': {'metric': 'temperature', 'value': value},
+            })
+        await asyncio.sleep(0.1)
+
+    def _stall(self, gate):
+        send_encoded = DeviceConsumer.send_encoded
+
+        async def stalled(consumer, payload):
+            await gate.wait()
+            await send_encoded(consumer, payload)
+        return mock.patch.object(DeviceConsumer, 'send_encoded', stalled)
+
+    @override_settings(WS_SEND_QUEUE_MAX_FRAMES=2)
+    async def test_stalled_client_loses_oldest_updates(self):
+        communicator = await self._connect()
+        dropped = backpressure.metrics()['dropped']
+        gate = asyncio.Event()
+        with self._stall(gate):
+            await self._publish([str(value) for value in range(1, 7)])
+            gate.set()
+            received = []
+            while not received or received[-1] != '6':
+                frame = await communicator.receive_json_from(timeout=2)
+                received.append(frame['measurement']['value'])
+        self.assertEqual(received[-2:], ['5', '6'])
+        self.assertLess(len(received), 6)
+        self.assertEqual(backpressure.metrics()['dropped'] - dropped, 6 - len(received))
+        await communicator.disconnect()
+
+    async def _serve(self, send):
+        """Run the device consumer behind a server-provided ASGI ``send``."""
+        inbox: asyncio.Queue = asyncio.Queue()
+        scope = {
+            'type': 'websocket', 'path': f'/ws/device/{self.device.public_id}/',
+            'query_string': b'', 'headers': [], 'subprotocols': [],
+        }
+        task = asyncio.ensure_future(URLRouter(websocket_urlpatterns)(scope, inbox.get, send))
+        await inbox.put({'type': 'websocket.connect'})
+        return task, inbox
+
+    async def _stop(self, task, inbox):
+        await inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(task, timeout=2)
+
+    @override_settings(WS_SEND_QUEUE_MAX_FRAMES=2)
+    async def test_blocking_server_send_fills_the_queue(self):
+        # A server whose send() waits for the socket to drain, with room for one frame
+        output: asyncio.Queue = asyncio.Queue(maxsize=1)
+        task, inbox = await self._serve(output.put)
+        for expected in ('websocket.accept', 'websocket.send', 'websocket.send'):
+            self.assertEqual((await asyncio.wait_for(output.get(), timeout=2))['type'], expected)
+
+        dropped = backpressure.metrics()['dropped']
+        await self._publish([str(value) for value in range(1, 7)])
+        received = []
+        while not received or received[-1] != '6':
+            message = await asyncio.wait_for(output.get(), timeout=2)
+            received.append(json.loads(message['text'])['measurement']['value'])
+        self.assertEqual(received[-2:], ['5', '6'])
+        self.assertLess(len(received), 6)
+        self.assertEqual(backpressure.metrics()['dropped'] - dropped, 6 - len(received))
+        await self._stop(task, inbox)
+
+    @override_settings(WS_SEND_QUEUE_MAX_FRAMES=2, WS_SEND_QUEUE_TRANSPORT_MAX_BYTES=1024)
+    async def test_daphne_transport_backlog_holds_the_writer(self):
+        # Daphne's send() returns at once; the Twisted transport buffers the frames
+        transport = SimpleNamespace(dataBuffer=b'', offset=0, _tempDataLen=0)
+        sent = []
+
+        async def handle_reply(protocol, message):
+            sent.append(message)
+
+        send = functools.partial(handle_reply, SimpleNamespace(transport=transport))
+        self.assertEqual(backpressure.transport_backlog(send), 0)
+        self.assertIsNone(backpressure.transport_backlog(sent.append))
+
+        task, inbox = await self._serve(send)
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(sent), 3)
+
+        transport._tempDataLen = 4096
+        await self._publish([str(value) for value in range(1, 7)])
+        self.assertEqual(len(sent), 3)
+
+        transport._tempDataLen = 0
+        await asyncio.sleep(0.1)
+        self.assertEqual([json.loads(message['text'])['measurement']['value'] for message in sent[3:]], ['5', '6'])
+        await self._stop(task, inbox)
+
+    @override_settings(WS_SEND_QUEUE_MAX_FRAMES=1, WS_SEND_QUEUE_POLICY=POLICY_DISCONNECT)
+    async def test_stalled_client_is_closed_for_resync(self):
+        communicator = await self._connect()
+        evicted = backpressure.metrics()['evicted']
+        with self._stall(asyncio.Event()):
+            await self._publish(['1', '2', '3', '4'])
+            output = await communicator.receive_output(timeout=1)
+        self.assertEqual(output, {'type': 'websocket.close', 'code': RESYNC_CLOSE_CODE})
+        self.assertEqual(backpressure.metrics()['evicted'] - evicted, 1)
+
+
+@unittest.skipUnless(HAS_NUMPY, 'numpy is not installed')
+class SyntheticFleetTestCase(TestCase):
+    """Test cases for the synthetic fleet generator."""
+
+    def _spec(self, **overrides):
+        from .services.synthetic import FleetSpec
+
+        params = {
+            'devices': 20, 'metrics': ('temperature', 'humidity'), 'days': 2, 'interval': 900,
+            'end': datetime(2024, 3, 1, tzinfo=dt_timezone.utc), 'seed': 3, 'breach_rate': 0.2,
+            'batch_devices': 8,
+        }
+        params.update(overrides)
+        return FleetSpec(**params)
+
+    def _chunks(self, spec):
+        from .services.synthetic import SeriesGenerator
+
+        generator = SeriesGenerator(spec, list(range(1, spec.devices + 1)), [1, 2])
+        return generator, list(generator)
+
+    def test_generation_is_deterministic(self):
+        _, first = self._chunks(self._spec())
+        _, second = self._chunks(self._spec())
+        _, other = self._chunks(self._spec(seed=4))
+        self.assertEqual([chunk.values.tolist() for chunk in first], [chunk.values.tolist() for chunk in second])
+        self.assertNotEqual([chunk.values.tolist() for chunk in first], [chunk.values.tolist() for chunk in other])
+
+    def test_rows_are_in_timestamp_order_with_gaps_and_breaches(self):
+        spec = self._spec(loss_rate=0.05)
+        generator, chunks = self._chunks(spec)
+        rows = sum(len(chunk) for chunk in chunks)
+        self.assertLess(rows, spec.planned_rows)
+        self.assertEqual(rows, int(generator.counts.sum()))
+        for chunk in chunks:
+            self.assertTrue((chunk.timestamps_us[1:] >= chunk.timestamps_us[:-1]).all())
+        self.assertTrue(generator.breaches)
+        humidity = [value for chunk in chunks for value in chunk.values[chunk.definition_ids == 2].tolist()]
+        self.assertTrue(all(0 <= value <= 100 for value in humidity))
+
+    def test_copy_binary_encoding(self):
+        import numpy as np
+        from .services.synthetic import Chunk, encode_copy_binary
+
+        chunk = Chunk(
+            device_ids=np.array([7, 8], dtype=np.int64),
+            definition_ids=np.array([1, 2], dtype=np.int32),
+            values=np.array([1013.2501, -12.5]),
+            timestamps_us=np.array([946684800 * 1_000_000 + 5, 946684800 * 1_000_000 + 6], dtype=np.int64),
+        )
+        payload = encode_copy_binary(chunk, float_storage=False)
+        self.assertTrue(payload.startswith(b'PGCOPY\n\xff\r\n\x00'))
+        self.assertTrue(payload.endswith(b'\xff\xff'))
+        rows = np.frombuffer(payload[19:-2], dtype=np.dtype([
+            ('count', '>i2'), ('device_len', '>i4'), ('device', '>i8'), ('definition_len', '>i4'),
+            ('definition', '>i4'), ('value_len', '>i4'), ('ndigits', '>i2'), ('weight', '>i2'),
+            ('sign', '>u2'), ('dscale', '>i2'), ('digits', '>i2', 3), ('timestamp_len', '>i4'), ('timestamp', '>i8'),
+        ]))
+        self.assertEqual(rows['device'].tolist(), [7, 8])
+        self.assertEqual(rows['digits'].tolist(), [[0, 1013, 2501], [0, 12, 5000]])
+        self.assertEqual(rows['sign'].tolist(), [0, 0x4000])
+        self.assertEqual(rows['timestamp'].tolist(), [5, 6])
+        self.assertEqual(len(encode_copy_binary(chunk, float_storage=True)), 19 + 2 * 46 + 2)
+
+    def test_copy_layout_matches_migrated_keys(self):
+        import numpy as np
+        from django.db.migrations.loader import MigrationLoader
+        from .services.synthetic import Chunk, encode_copy_binary, key_width
+
+        apps = MigrationLoader(connection).project_state().apps
+        device_width = key_width(apps.get_model('devices', 'Device'))
+        definition_width = key_width(apps.get_model('devices', 'MetricDefinition'))
+        chunk = Chunk(
+            device_ids=np.array([7], dtype=np.int64), definition_ids=np.array([1], dtype=np.int64),
+            values=np.array([1.0]), timestamps_us=np.array([5], dtype=np.int64),
+        )
+        row = encode_copy_binary(chunk, float_storage=True)[19:-2]
+        self.assertEqual(int.from_bytes(row[2:6], 'big'), device_width)
+        self.assertEqual(int.from_bytes(row[6 + device_width:10 + device_width], 'big'), definition_width)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_name = 'measurements' AND column_name IN ('device_id', 'definition_id')"
+                )
+                columns = dict(cursor.fetchall())
+            widths = {'smallint': 2, 'integer': 4, 'bigint': 8}
+            self.assertEqual(widths[columns['device_id']], device_width)
+            self.assertEqual(widths[columns['definition_id']], definition_width)
+
+    def test_command_creates_fleet(self):
+        out = StringIO()
+        options = {
+            'devices': 12, 'metrics': 'temperature,co2', 'days': 2, 'interval': 3600,
+            'end': '2024-03-01', 'breach_rate': 0.3, 'stdout': out,
+        }
+        call_command('generate_fleet', **options)
+        devices = Device.objects.filter(name__startswith='Synthetic ')
+        self.assertEqual(devices.count(), 12)
+        self.assertEqual(MeasurementThreshold.objects.filter(device__in=devices).count(), 24)
+        measurements = Measurement.objects.filter(device__in=devices)
+        self.assertEqual(
+            measurements.count(),
+            sum(DeviceMetric.objects.filter(device__in=devices).values_list('sample_count', flat=True)),
+        )
+        self.assertEqual(set(measurements.values_list('definition__name', flat=True)), {'temperature', 'co2'})
+        alert = Alert.objects.filter(device__in=devices).order_by('created_at').first()
+        self.assertIsNotNone(alert)
+        self.assertLess(alert.created_at, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+
+        public_ids = list(devices.order_by('name').values_list('public_id', flat=True))
+        with self.assertRaises(CommandError):
+            call_command('generate_fleet', **options)
+        call_command('generate_fleet', replace=True, **options)
+        self.assertEqual(list(devices.order_by('name').values_list('public_id', flat=True)), public_ids)
+
+
+class HotEndpointQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Query budgets of the hot endpoints (fail on N+1 or repeated lookups)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='budget', email='budget@example.com', password='testpass123', role='admin'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        category = Category.objects.create(name='Budget')
+        self.devices = [
+            Device.objects.create(name=f'Budget {index}', category=category, status=Device.Status.ACTIVE)
+            for index in range(10)
+        ]
+        self.device = self.devices[0]
+        MeasurementThreshold.objects.create(device=self.device, metric_name='temperature', min_limit=0, max_limit=100)
+        for device in self.devices:
+            Alert.objects.create(device=device, title='Budget', message='Threshold violation')
+        self.reading = {'metric': 'temperature', 'value': '25.5', 'unit': '°C', 'timestamp': timezone.now().isoformat()}
+        self.client.post(f'/api/devices/{self.device.id}/measurements/', self.reading, format='json')
+
+    def test_ingestion(self):
+        with self.assertQueryBudget(6):
+            response = self.client.post(f'/api/devices/{self.device.id}/measurements/', self.reading, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['device'], self.device.id)
+
+    def test_aggregated_data(self):
+        with self.assertQueryBudget(5):
+            response = self.client.get(f'/api/devices/{self.device.id}/aggregated-data/?metric=temperature')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_device_metrics(self):
+        with self.assertQueryBudget(3):
+            response = self.client.get(f'/api/devices/{self.device.id}/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_device_list_and_detail(self):
+        with self.assertQueryBudget(3):
+            response = self.client.get('/api/devices/')
+        self.assertEqual(response.data['count'], 10)
+        with self.assertQueryBudget(2):
+            self.client.get(f'/api/devices/{self.device.id}/')
+
+    def test_alert_list(self):
+        for query in ('', '?device_status=active', '?status=pending&severity=medium'):
+            with self.subTest(query=query), self.assertQueryBudget(3):
+                response = self.client.get(f'/api/alerts/{query}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_threshold_list(self):
+        with self.assertQueryBudget(4):
+            response = self.client.get(f'/api/devices/{self.device.public_id}/thresholds/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_budget_failure_lists_statements(self):
+        with self.assertRaisesMessage(AssertionError, '2 queries executed, budget is 1'):
+            with self.assertQueryBudget(1, max_duplicates=1):
+                list(Device.objects.filter(pk=self.device.pk))
+                list(Device.objects.filter(pk=self.device.pk))
+        with self.assertRaisesMessage(AssertionError, '1 duplicated queries, budget is 0'):
+            with self.assertQueryBudget(5):
+                list(Device.objects.filter(pk=self.device.pk))
+                list(Device.objects.filter(pk=self.devices[1].pk))
+
+    @override_settings(QUERY_INSTRUMENTATION=True)
+    async def test_websocket_event_queries_are_logged(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/device/{self.device.public_id}/')
+        with self.assertLogs('core.instrumentation', level='INFO') as logs:
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            # The event is logged once its handler returns
+            await communicator.disconnect()
+        payload = logs.records[0].query_stats
+        self.assertEqual(payload['type'], 'websocket')
+        self.assertEqual(payload['consumer'], 'DeviceConsumer')
+        self.assertEqual(payload['event'], 'websocket.connect')
+        self.assertGreaterEqual(payload['queries'], 1)
+
+
+class RuntimeMetricsTestCase(APITestCase):
+    """Test cases for the ingestion, alerting and WebSocket metrics."""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='metrics', email='metrics@example.com', password='testpass123', role='operator')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.device = Device.objects.create(name='Metered Sensor', status=Device.Status.ACTIVE)
+        MeasurementThreshold.objects.create(device=self.device, metric_name='temperature', min_limit=0, max_limit=50)
+
+    def _post(self, value):
+        return self.client.post(f'/api/devices/{self.device.id}/measurements/', {
+            'metric': 'temperature', 'value': value, 'unit': '°C', 'timestamp': timezone.now().isoformat(),
+        }, format='json')
+
+    def test_ingestion_and_alerting(self):
+        created = metrics.MEASUREMENTS_INGESTED.value(result='created') or 0
+        invalid = metrics.MEASUREMENTS_INGESTED.value(result='invalid') or 0
+        requests = (metrics.INGEST_SECONDS.value() or [0])[-1]
+        checks = (metrics.ALERT_CHECK_SECONDS.value() or [0])[-1]
+        violations = metrics.THRESHOLD_VIOLATIONS.value() or 0
+        self._post('25.0')
+        self._post('75.0')
+        self._post('')
+        self.assertEqual(metrics.MEASUREMENTS_INGESTED.value(result='created') - created, 2)
+        self.assertEqual(metrics.MEASUREMENTS_INGESTED.value(result='invalid') - invalid, 1)
+        self.assertEqual(metrics.INGEST_SECONDS.value()[-1] - requests, 3)
+        self.assertEqual(metrics.ALERT_CHECK_SECONDS.value()[-1] - checks, 2)
+        self.assertEqual(metrics.THRESHOLD_VIOLATIONS.value() - violations, 1)
+
+    @override_settings(METRICS_WS_GROUP_LABELS=True)
+    async def test_websocket_connections_and_delivery(self):
+        group = device_group_name(self.device.public_id)
+        connections = metrics.WS_CONNECTIONS.value(consumer='DeviceConsumer') or 0
+        frames = metrics.WS_FRAMES_SENT.value(consumer='DeviceConsumer') or 0
+        deliveries = (metrics.DELIVERY_SECONDS.value() or [0])[-1]
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/device/{self.device.public_id}/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(metrics.WS_CONNECTIONS.value(consumer='DeviceConsumer') - connections, 1)
+        self.assertEqual(metrics.WS_GROUP_SUBSCRIBERS.value(group=group), 1)
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+
+        await database_sync_to_async(publish_measurement)(self.device.public_id, {'metric': 'temperature', 'value': '20.0'})
+        await communicator.receive_json_from()
+        self.assertEqual(metrics.DELIVERY_SECONDS.value()[-1] - deliveries, 1)
+        self.assertEqual(metrics.WS_FRAMES_SENT.value(consumer='DeviceConsumer') - frames, 3)
+
+        await communicator.disconnect()
+        self.assertEqual(metrics.WS_CONNECTIONS.value(consumer='DeviceConsumer'), connections)
+        self.assertIsNone(metrics.WS_GROUP_SUBSCRIBERS.value(group=group))
+        self.assertGreaterEqual(metrics.WS_DISCONNECTS.value(consumer='DeviceConsumer', code=1000), 1)
@@ -10,18 +10,22 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsAdminUserRole, IsOperatorOrAdminCanWriteElseReadOnly, IsAdminOrReadOnly
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Max, Min, DecimalField
-from django.utils import timezone
-from datetime import timedelta
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import logging
 
-from .models import Category, Device, Measurement, Alert, MeasurementThreshold
-from .serializers import CategorySerializer, DeviceSerializer, MeasurementSerializer, AlertSerializer, ThresholdSerializer
+from .models import Category, Device, Alert, MeasurementThreshold
+from .serializers import CategorySerializer, DeviceSerializer, MeasurementSerializer, AlertSerializer, ThresholdSerializer, DeviceMetricSerializer
 from .filters import DeviceFilter, AlertFilter
+from .metrics import INGEST_SECONDS, MEASUREMENTS_INGESTED
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .services.alert_service import check_for_alert
+from .services.metric_catalog import record_measurement, get_device_metrics
+from .services.aggregation import aggregated_window
+from .services.realtime import (
+    publish_alert_event,
+    publish_alert_status_change,
+    publish_device_status_change,
+    publish_measurement,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -79,6 +83,12 @@ class DeviceViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def perform_update(self, serializer: DeviceSerializer) -> None:
+        """Save the device and broadcast status transitions to the fleet event stream."""
+        previous_status = serializer.instance.status
+        device = serializer.save()
+        publish_device_status_change(device, previous_status)
+
     def destroy(self, request, *args, **kwargs):
         """Restrict delete: only admins can delete devices."""
         user = request.user
@@ -107,6 +117,7 @@ class MeasurementIngestionView(APIView):
     """
     permission_classes: list = [IsOperatorOrAdminCanWriteElseReadOnly]
     
+    @INGEST_SECONDS.time()
     def post(self, request, device_id: int) -> Response:
         """
         Create a new measurement for the specified device.
@@ -121,17 +132,24 @@ class MeasurementIngestionView(APIView):
         # Get device or return 404
         device = get_object_or_404(Device, id=device_id)
         
-        # Prepare data with device_id
-        data = request.data.copy()
-        data['device'] = device.id
-        
-        # Validate and create measurement
-        serializer = MeasurementSerializer(data=data)
+        # Validate and create measurement (the device comes from the URL, not the body)
+        serializer = MeasurementSerializer(data=request.data, context={'device': device})
         
         if serializer.is_valid():
-            measurement = serializer.save()
+            measurement = serializer.save(device=device)
+            MEASUREMENTS_INGESTED.inc(result='created')
             measurement_data = MeasurementSerializer(measurement).data
             
+            # Keep the per-device metric catalog current
+            try:
+                record_measurement(measurement)
+            except Exception as e:
+                # Log and continue; the catalog can be rebuilt from measurements
+                logger.error(
+                    f"Error updating metric catalog for device {device.id}: {str(e)}",
+                    exc_info=True,
+                )
+            
             # Send real-time update via WebSocket
             self._send_measurement_update(device.public_id, measurement_data)
             
@@ -139,13 +157,14 @@ class MeasurementIngestionView(APIView):
             try:
                 violated, message = check_for_alert(measurement)
                 if violated and message:
-                    Alert.objects.create(
+                    alert = Alert.objects.create(
                         device=device,
                         title=f"Threshold Violation: {measurement.metric}",
                         message=message,
                         severity=Alert.Severity.HIGH,
                         status=Alert.Status.PENDING,
                     )
+                    publish_alert_event(alert)
             except Exception as e:
                 # Log and continue; ingestion should not fail due to alert creation issues
                 logger.error(
@@ -158,6 +177,7 @@ class MeasurementIngestionView(APIView):
                 status=status.HTTP_201_CREATED
             )
         
+        MEASUREMENTS_INGESTED.inc(result='invalid')
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def _send_measurement_update(self, device_public_id, measurement_data):
@@ -169,22 +189,8 @@ class MeasurementIngestionView(APIView):
             measurement_data: Serialized measurement data dictionary
         """
         try:
-            channel_layer = get_channel_layer()
-            if channel_layer is None:
-                logger.warning("Channel layer is not configured. WebSocket update skipped.")
-                return
-            
-            # Group name for device broadcasting
-            group_name = f'device_{device_public_id}'
-            
-            # Send message to device group
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    'type': 'measurement_update',
-                    'measurement': measurement_data
-                }
-            )
+            # Stamps the sequence number, updates the snapshot and broadcasts to the device group
+            publish_measurement(device_public_id, measurement_data)
             
             logger.info(f"Sent measurement update via WebSocket for device {device_public_id}")
             
@@ -227,6 +233,16 @@ class AlertViewSet(viewsets.ModelViewSet):
         # Ordering is handled by OrderingFilter
         
         return queryset
+    
+    def perform_create(self, serializer: AlertSerializer) -> None:
+        """Save the alert and broadcast it to the fleet event stream."""
+        publish_alert_event(serializer.save())
+    
+    def perform_update(self, serializer: AlertSerializer) -> None:
+        """Save the alert and broadcast resolve/reopen transitions."""
+        previous_status = serializer.instance.status
+        alert = serializer.save()
+        publish_alert_status_change(alert, previous_status)
 
 
 class DeviceAggregatedDataView(APIView):
@@ -262,53 +278,11 @@ class DeviceAggregatedDataView(APIView):
         metric = request.query_params.get('metric', None)
         limit = int(request.query_params.get('limit', 100))
         
-        # Base queryset
-        measurements_qs = Measurement.objects.filter(device=device)
-        
-        # Filter by metric if provided
-        if metric:
-            measurements_qs = measurements_qs.filter(metric__iexact=metric)
-        
-        # Filter by time period
-        now = timezone.now()
-        if period == 'last_24h':
-            start_time = now - timedelta(hours=24)
-            measurements_qs = measurements_qs.filter(timestamp__gte=start_time)
-        elif period == 'last_7d':
-            start_time = now - timedelta(days=7)
-            measurements_qs = measurements_qs.filter(timestamp__gte=start_time)
-        elif period == 'last_30d':
-            start_time = now - timedelta(days=30)
-            measurements_qs = measurements_qs.filter(timestamp__gte=start_time)
-        # 'all' doesn't filter by time
-        
-        # Order by timestamp (newest first) and limit
-        measurements_qs = measurements_qs.order_by('-timestamp')[:limit]
-        
-        # Calculate aggregated statistics first (before evaluating the QuerySet)
-        aggregates = measurements_qs.aggregate(
-            avg_value=Avg('value', output_field=DecimalField()),
-            max_value=Max('value'),
-            min_value=Min('value')
-        )
-        
-        # Prepare statistics dictionary
-        if aggregates['avg_value'] is not None:
-            statistics = {
-                'mean': float(aggregates['avg_value']),
-                'max': float(aggregates['max_value']) if aggregates['max_value'] is not None else None,
-                'min': float(aggregates['min_value']) if aggregates['min_value'] is not None else None,
-            }
-        else:
-            # No measurements found
-            statistics = {
-                'mean': None,
-                'max': None,
-                'min': None,
-            }
+        # Newest measurements of the period and their statistics (merges the cold tier if needed)
+        measurements, statistics = aggregated_window(device, period=period, metric=metric, limit=limit)
         
         # Serialize measurements
-        measurement_data = MeasurementSerializer(measurements_qs, many=True).data
+        measurement_data = MeasurementSerializer(measurements, many=True).data
         
         # Prepare response data
         response_data = {
@@ -325,7 +299,8 @@ class DeviceMetricsView(APIView):
     APIView for retrieving available metrics for a device.
     
     Endpoint: GET /api/devices/{device_id}/metrics/
-    Returns list of unique metric names available for the device.
+    Returns list of unique metric names available for the device, answered
+    from the per-device metric catalog (unit, first/last seen, sample count).
     """
     permission_classes: list = [IsAuthenticated]
     
@@ -343,10 +318,16 @@ class DeviceMetricsView(APIView):
         # Get device or return 404
         device = get_object_or_404(Device, id=device_id)
         
-        # Get distinct metrics for this device
-        metrics = Measurement.objects.filter(device=device).values_list('metric', flat=True).distinct().order_by('metric')
+        # Read the catalog instead of scanning measurements for distinct metrics
+        catalog = list(get_device_metrics(device))
         
-        return Response({'metrics': list(metrics)}, status=status.HTTP_200_OK)
+        return Response(
+            {
+                'metrics': [entry.metric for entry in catalog],
+                'catalog': DeviceMetricSerializer(catalog, many=True).data,
+            },
+            status=status.HTTP_200_OK
+        )
 
 
 class ThresholdViewSet(viewsets.ModelViewSet):
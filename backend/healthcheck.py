@@ -2,16 +2,20 @@
 """
 Healthcheck script for Docker.
 Returns 0 if server is healthy, 1 otherwise.
+
+Probes /readyz (database, cache and Redis reachable) by default, or
+/healthz (process alive only) with --live. Both are answered by
+core.health.HealthCheckMiddleware without authentication.
 """
 import sys
 import urllib.request
 import urllib.error
 
 
-def check_health():
-    """Check if the Django server is responding."""
-    url = 'http://localhost:8000/api/'
-    
+def check_health(path='/readyz'):
+    """Check if the Django server (and, for /readyz, its dependencies) is healthy."""
+    url = f'http://localhost:8000{path}'
+
     try:
         req = urllib.request.Request(url)
         req.add_header('User-Agent', 'Docker-HealthCheck')
@@ -19,12 +23,8 @@ def check_health():
         # If we get here, server responded with 200
         return 0
     except urllib.error.HTTPError as e:
-        # 401 (Unauthorized) means server is running, just needs auth
-        # 403 (Forbidden) also means server is running
-        if e.code in (200, 401, 403):
-            return 0
-        # Other HTTP errors mean server has issues
-        print(f"HTTP Error {e.code}: {e.reason}", file=sys.stderr)
+        # 503 from /readyz carries the failing checks
+        print(f"HTTP Error {e.code}: {e.read().decode(errors='replace')}", file=sys.stderr)
         return 1
     except Exception as e:
         # Connection errors or timeouts mean server is not responding
@@ -33,5 +33,4 @@ def check_health():
 
 
 if __name__ == '__main__':
-    sys.exit(check_health())
-
+    sys.exit(check_health('/healthz' if '--live' in sys.argv[1:] else '/readyz'))
@@ -1,23 +1,56 @@
 """
-Script de teste manual para WebSocket (Tarefa 2.4).
+Script de teste manual e gerador de carga para WebSocket (Tarefa 2.4).
 
-Este script testa o fluxo completo de WebSocket:
+Modo manual (padrão) - testa o fluxo completo de WebSocket:
 1. Conecta ao WebSocket usando public_id de um dispositivo
 2. Escuta mensagens em tempo real
 3. Pode ser usado em paralelo com envio de medições via API REST
 
+Modo carga (``load``) - simula milhares de dispositivos enviando medições
+via API REST em taxa configurável, junto com muitos espectadores WebSocket,
+e reporta:
+- latência da ingestão (p50/p95/p99), medida do envio e do horário planejado
+  (o segundo inclui a espera por conexão, evitando a omissão coordenada);
+- latência ponta a ponta (POST enviado -> frame recebido no WebSocket), a
+  partir do ``timestamp`` da medição, que carrega o horário de envio;
+- taxa de perda: frames recebidos vs. esperados (medições aceitas ×
+  espectadores inscritos no dispositivo), e códigos de fechamento (ex.: 4008).
+
 Uso:
     python test_websocket.py
+    python test_websocket.py --send-measurement 1 --metric humidity --value 65.5
+    python test_websocket.py load --devices 2000 --rate 0.5 --viewers 500 --duration 60
+    python test_websocket.py load --devices 200 --viewers 100 --viewer-mode multiplex \\
+        --devices-per-viewer 20 --viewer-query "mode=latest&interval_ms=500" --output carga.json
+
+Os dispositivos usados são os primeiros retornados por /api/devices/ (crie uma frota
+com ``python manage.py generate_fleet``). O usuário precisa ser admin ou operator.
+Cliente e servidor devem compartilhar o relógio (mesma máquina ou NTP) para a
+latência ponta a ponta.
 
 Requisitos:
     pip install websockets requests
 """
+import argparse
 import asyncio
 import json
+import random
 import sys
-import requests
-from websockets.client import connect
+import time
+from collections import Counter
+from datetime import datetime, timezone
 from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+try:
+    from websockets.asyncio.client import connect
+except ImportError:  # websockets < 13
+    from websockets.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from benchmarks.common import percentiles
 
 # Configuração
 BASE_URL = "http://localhost:8000"
@@ -40,16 +73,21 @@ def get_access_token() -> Optional[str]:
         return None
 
 
-def get_devices(token: str) -> list:
-    """Obter lista de dispositivos."""
+def get_devices(token: str, limit: Optional[int] = None) -> list:
+    """Obter lista de dispositivos (seguindo a paginação até ``limit`` itens)."""
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{BASE_URL}/api/devices/", headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        # DRF pode retornar paginação com 'results'
-        devices = data.get("results", data) if isinstance(data, dict) else data
-        return devices if isinstance(devices, list) else []
+        url = f"{BASE_URL}/api/devices/"
+        devices: list = []
+        while url:
+            response = requests.get(url, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            # DRF pode retornar paginação com 'results'
+            page = data.get("results", data) if isinstance(data, dict) else data
+            devices.extend(page if isinstance(page, list) else [])
+            url = data.get("next") if isinstance(data, dict) and limit and len(devices) < limit else None
+        return devices[:limit] if limit else devices
     except Exception as e:
         print(f"❌ Erro ao obter dispositivos: {e}")
         return []
@@ -83,42 +121,43 @@ def send_test_measurement(token: str, device_id: int, metric: str = "temperature
         return None
 
 
-async def test_websocket_connection(public_id: str):
+async def test_websocket_connection(public_id: str, token: str):
     """
     Testar conexão WebSocket e escutar mensagens.
-    
+
     Args:
         public_id: UUID do dispositivo (public_id)
+        token: Token JWT de acesso (exigido com WS_REQUIRE_AUTH)
     """
     ws_url = f"{WS_URL}/ws/device/{public_id}/"
     print(f"\n🔌 Conectando ao WebSocket: {ws_url}")
-    
+
     try:
-        async with connect(ws_url) as websocket:
+        async with connect(f"{ws_url}?token={token}") as websocket:
             print("✅ Conectado ao WebSocket!")
-            
+
             # Esperar mensagem de boas-vindas
             try:
                 welcome_msg = await asyncio.wait_for(websocket.recv(), timeout=5.0)
                 welcome_data = json.loads(welcome_msg)
                 print(f"\n📨 Mensagem de boas-vindas recebida:")
                 print(json.dumps(welcome_data, indent=2, ensure_ascii=False))
-                
+
                 if welcome_data.get("type") == "connection_established":
                     print(f"   ✅ Dispositivo: {welcome_data.get('device_name')}")
             except asyncio.TimeoutError:
                 print("⚠️  Timeout aguardando mensagem de boas-vindas")
-            
+
             print("\n👂 Escutando mensagens em tempo real...")
             print("   (Pressione Ctrl+C para sair ou envie uma medição via API)\n")
-            
+
             # Escutar mensagens indefinidamente
             try:
                 async for message in websocket:
                     data = json.loads(message)
                     print(f"📨 Mensagem recebida:")
                     print(json.dumps(data, indent=2, ensure_ascii=False))
-                    
+
                     if data.get("type") == "measurement_update":
                         measurement = data.get("measurement", {})
                         print(f"\n   ✅ Atualização de medição recebida em tempo real!")
@@ -127,7 +166,7 @@ async def test_websocket_connection(public_id: str):
                         print()
             except KeyboardInterrupt:
                 print("\n\n👋 Conexão WebSocket encerrada pelo usuário")
-                
+
     except Exception as e:
         print(f"❌ Erro na conexão WebSocket: {e}")
         print(f"   Verifique se:")
@@ -141,7 +180,7 @@ def main():
     print("=" * 60)
     print("🧪 TESTE MANUAL DE WEBSOCKET - Tarefa 2.4")
     print("=" * 60)
-    
+
     # 1. Obter token
     print("\n1️⃣  Obtendo token de autenticação...")
     token = get_access_token()
@@ -149,7 +188,7 @@ def main():
         print("❌ Falha ao obter token. Encerrando.")
         sys.exit(1)
     print("✅ Token obtido com sucesso")
-    
+
     # 2. Obter dispositivos
     print("\n2️⃣  Obtendo lista de dispositivos...")
     devices = get_devices(token)
@@ -165,11 +204,11 @@ def main():
         print("      >>> Device.objects.create(name='Sensor Teste', status='active')")
         print("\n   Após criar, execute este script novamente.")
         sys.exit(1)
-    
+
     print(f"✅ {len(devices)} dispositivo(s) encontrado(s):")
     for i, device in enumerate(devices, 1):
         print(f"   {i}. {device.get('name')} (ID: {device.get('id')}, public_id: {device.get('public_id')})")
-    
+
     # 3. Selecionar dispositivo
     if len(devices) == 1:
         selected_device = devices[0]
@@ -186,15 +225,15 @@ def main():
         except (ValueError, KeyboardInterrupt):
             print("\n❌ Entrada inválida. Usando o primeiro dispositivo.")
             selected_device = devices[0]
-    
+
     public_id = selected_device.get('public_id')
     device_id = selected_device.get('id')
-    
+
     print(f"\n📋 Dispositivo selecionado:")
     print(f"   Nome: {selected_device.get('name')}")
     print(f"   ID: {device_id}")
     print(f"   Public ID: {public_id}")
-    
+
     # 4. Instruções
     print("\n" + "=" * 60)
     print("📝 INSTRUÇÕES:")
@@ -207,10 +246,10 @@ def main():
     print("3. A mensagem deve chegar em tempo real no WebSocket")
     print("4. Pressione Ctrl+C para sair")
     print("=" * 60 + "\n")
-    
+
     # 5. Testar WebSocket
     try:
-        asyncio.run(test_websocket_connection(public_id))
+        asyncio.run(test_websocket_connection(public_id, token))
     except KeyboardInterrupt:
         print("\n\n✅ Teste encerrado pelo usuário")
     except Exception as e:
@@ -218,19 +257,394 @@ def main():
         sys.exit(1)
 
 
+# --- Gerador de carga --------------------------------------------------------
+
+
+class _StaleConnection(ConnectionError):
+    """O servidor fechou a conexão keep-alive antes de receber a requisição."""
+
+
+class HTTPConnection:
+    """Conexão HTTP/1.1 keep-alive mínima sobre asyncio streams (corpos JSON)."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.ssl = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: Optional[dict] = None) -> tuple:
+        """Enviar uma requisição e retornar (status, corpo); reconecta se a conexão expirou."""
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.host, self.port, ssl=True if self.ssl else None
+                )
+            try:
+                return await self._roundtrip(method, path, body, headers or {})
+            except _StaleConnection:
+                await self.close()
+                if attempt:
+                    raise
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                raise
+
+    async def _roundtrip(self, method: str, path: str, body: bytes, headers: dict) -> tuple:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self.writer.write("\r\n".join(lines).encode("latin-1") + b"\r\n\r\n" + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise _StaleConnection()
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            content = b"".join(chunks)
+        else:
+            content = await self.reader.readexactly(int(response_headers.get("content-length", 0)))
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, content
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+
+class LoadStats:
+    """Contadores e amostras de latência de uma execução de carga."""
+
+    def __init__(self, devices: int):
+        self.ingest_ms: list = []
+        self.ingest_scheduled_ms: list = []
+        self.e2e_ms: list = []
+        self.connect_ms: list = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.close_codes: Counter = Counter()
+        self.accepted = [0] * devices
+        self.subscribers = [0] * devices
+        self.frames = 0
+        self.viewers_failed = 0
+        self.sent = 0
+
+    def expected_frames(self) -> int:
+        return sum(accepted * subscribers for accepted, subscribers in zip(self.accepted, self.subscribers))
+
+
+async def _device_loop(index: int, device: dict, args, token: str, pool: asyncio.Queue, stats: LoadStats, deadline: float):
+    """Enviar medições de um dispositivo simulado até ``deadline`` (horário do loop)."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed * 1_000_003 + index)
+    interval = 1.0 / args.rate
+    path = f"/api/devices/{device['id']}/measurements/"
+    headers = {"Authorization": f"Bearer {token}"}
+    # Fase aleatória para que os dispositivos não enviem todos no mesmo instante
+    scheduled = loop.time() + rng.random() * interval
+    while True:
+        scheduled += rng.expovariate(args.rate) if args.poisson else interval
+        if scheduled >= deadline:
+            return
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        connection = await pool.get()
+        try:
+            started = loop.time()
+            body = json.dumps({
+                "metric": args.metric,
+                "value": f"{rng.uniform(20.0, 30.0):.2f}",
+                "unit": "°C",
+                # Horário de envio: o espectador calcula a latência ponta a ponta a partir dele
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }).encode()
+            stats.sent += 1
+            status, _ = await connection.request("POST", path, body, headers)
+            finished = loop.time()
+            stats.statuses[status] += 1
+            stats.ingest_ms.append((finished - started) * 1000)
+            stats.ingest_scheduled_ms.append((finished - scheduled) * 1000)
+            if status == 201:
+                stats.accepted[index] += 1
+        except Exception as exc:
+            stats.errors[type(exc).__name__] += 1
+        finally:
+            pool.put_nowait(connection)
+
+
+def _record_frame(data: dict, stats: LoadStats) -> None:
+    updates = data.get("updates", []) if data.get("type") == "measurement_batch" else [data]
+    now = datetime.now(timezone.utc)
+    for update in updates:
+        if update.get("type", "measurement_update") != "measurement_update":
+            continue
+        stats.frames += 1
+        timestamp = (update.get("measurement") or {}).get("timestamp")
+        if timestamp:
+            try:
+                sent = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            stats.e2e_ms.append((now - sent).total_seconds() * 1000)
+
+
+def _viewer_url(devices: list, targets: list, args, token: str) -> str:
+    extra = args.viewer_query if args.viewer_mode == "device" else ""
+    query = "&".join(part for part in (extra, f"token={token}" if token else "") if part)
+    if args.viewer_mode == "device":
+        path = f"/ws/device/{devices[targets[0]]['public_id']}/"
+    else:
+        path = "/ws/devices/"
+    return f"{args.ws_url}{path}{'?' + query if query else ''}"
+
+
+async def _subscribe(websocket, devices: list, targets: list, args) -> None:
+    """Em ws/devices/, inscrever-se nos dispositivos alvo e aguardar a confirmação."""
+    if args.viewer_mode != "multiplex":
+        return
+    # Em ws/devices/ a política de entrega acompanha a inscrição
+    policy = {key: value for key, value in parse_qsl(args.viewer_query) if key != "token"}
+    await websocket.send(json.dumps({
+        "action": "subscribe",
+        "devices": [devices[target]["public_id"] for target in targets],
+        **({"policy": policy} if policy else {}),
+    }))
+    while json.loads(await websocket.recv()).get("type") != "subscribed":
+        pass
+
+
+async def _receive_until(websocket, stats: LoadStats, stop: asyncio.Event) -> None:
+    """Contar os frames recebidos até o fim da carga."""
+    stop_task = asyncio.ensure_future(stop.wait())
+    try:
+        while not stop.is_set():
+            receive = asyncio.ensure_future(websocket.recv())
+            done, _ = await asyncio.wait({receive, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if receive not in done:
+                receive.cancel()
+                break
+            _record_frame(json.loads(receive.result()), stats)
+    finally:
+        stop_task.cancel()
+
+
+async def _viewer(index: int, devices: list, targets: list, args, token: str, stats: LoadStats, ready: asyncio.Event, stop: asyncio.Event):
+    """Espectador WebSocket: conecta, inscreve-se e conta as atualizações recebidas."""
+    started = time.perf_counter()
+    try:
+        websocket = await connect(
+            _viewer_url(devices, targets, args, token), open_timeout=args.connect_timeout, max_size=None
+        )
+    except Exception as exc:
+        stats.viewers_failed += 1
+        stats.errors[f"ws_connect:{type(exc).__name__}"] += 1
+        ready.set()
+        return
+    try:
+        await _subscribe(websocket, devices, targets, args)
+        stats.connect_ms.append((time.perf_counter() - started) * 1000)
+        for target in targets:
+            stats.subscribers[target] += 1
+        ready.set()
+        await _receive_until(websocket, stats, stop)
+    except ConnectionClosed as exc:
+        code = exc.rcvd.code if getattr(exc, "rcvd", None) is not None else getattr(exc, "code", None)
+        stats.close_codes[str(code)] += 1
+    except Exception as exc:
+        stats.errors[f"ws:{type(exc).__name__}"] += 1
+    finally:
+        ready.set()
+        await websocket.close()
+
+
+async def run_load(args) -> dict:
+    """Executar a carga: conectar espectadores, enviar medições e aguardar a drenagem."""
+    token = get_access_token() if args.username else None
+    if args.username and not token:
+        raise SystemExit("❌ Falha ao obter token")
+    devices = get_devices(token, args.devices)
+    if len(devices) < args.devices:
+        raise SystemExit(
+            f"❌ Apenas {len(devices)} dispositivo(s) disponível(is); crie mais com "
+            f"python manage.py generate_fleet --devices {args.devices}"
+        )
+    stats = LoadStats(len(devices))
+    loop = asyncio.get_running_loop()
+
+    # 1. Espectadores (distribuídos entre os dispositivos, com rampa de conexão)
+    per_viewer = 1 if args.viewer_mode == "device" else min(args.devices_per_viewer, len(devices))
+    stop = asyncio.Event()
+    viewers, readiness = [], []
+    for index in range(args.viewers):
+        targets = [(index * per_viewer + offset) % len(devices) for offset in range(per_viewer)]
+        ready = asyncio.Event()
+        readiness.append(ready)
+        viewers.append(asyncio.create_task(_viewer(index, devices, targets, args, token, stats, ready, stop)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / max(1, args.viewers))
+    await asyncio.gather(*(ready.wait() for ready in readiness))
+    print(f"👀 {args.viewers - stats.viewers_failed}/{args.viewers} espectadores conectados")
+
+    # 2. Dispositivos enviando medições durante --duration segundos
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.connections):
+        pool.put_nowait(HTTPConnection(args.base_url))
+    started = loop.time()
+    deadline = started + args.duration
+    senders = [
+        asyncio.create_task(_device_loop(index, device, args, token, pool, stats, deadline))
+        for index, device in enumerate(devices)
+    ]
+    reporter = asyncio.create_task(_progress(stats, started))
+    await asyncio.gather(*senders)
+    elapsed = loop.time() - started
+    reporter.cancel()
+
+    # 3. Drenagem: frames em trânsito ainda contam
+    await asyncio.sleep(args.drain)
+    stop.set()
+    await asyncio.gather(*viewers, return_exceptions=True)
+    while not pool.empty():
+        await pool.get_nowait().close()
+
+    expected = stats.expected_frames()
+    accepted = sum(stats.accepted)
+    return {
+        "benchmark": "ws_load",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "params": {
+            key: getattr(args, key) for key in (
+                "base_url", "ws_url", "devices", "rate", "poisson", "duration", "connections",
+                "viewers", "viewer_mode", "devices_per_viewer", "viewer_query", "drain", "seed",
+            )
+        },
+        "results": {
+            "ingest": {
+                "offered_per_s": round(len(devices) * args.rate, 1),
+                "sent": stats.sent,
+                "accepted": accepted,
+                "accepted_per_s": round(accepted / elapsed, 1) if elapsed else None,
+                "statuses": dict(stats.statuses),
+                "errors": dict(stats.errors),
+                "latency": percentiles(stats.ingest_ms) if stats.ingest_ms else None,
+                "latency_from_schedule": percentiles(stats.ingest_scheduled_ms) if stats.ingest_scheduled_ms else None,
+            },
+            "websocket": {
+                "viewers": args.viewers,
+                "viewers_failed": stats.viewers_failed,
+                "connect": percentiles(stats.connect_ms) if stats.connect_ms else None,
+                "frames_received": stats.frames,
+                "frames_expected": expected,
+                "drop_rate": round(1 - min(stats.frames, expected) / expected, 4) if expected else None,
+                "close_codes": dict(stats.close_codes),
+                "e2e_latency": percentiles(stats.e2e_ms) if stats.e2e_ms else None,
+            },
+        },
+    }
+
+
+async def _progress(stats: LoadStats, started: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(5)
+        elapsed = loop.time() - started
+        print(
+            f"   {elapsed:5.0f}s  enviadas={stats.sent}  aceitas={sum(stats.accepted)}  "
+            f"erros={sum(stats.errors.values())}  frames={stats.frames}"
+        )
+
+
+def load_cli(args) -> None:
+    """Executar o modo carga e imprimir/gravar o relatório JSON."""
+    global BASE_URL, USERNAME, PASSWORD
+    BASE_URL, USERNAME, PASSWORD = args.base_url, args.username, args.password
+    print("=" * 60)
+    print(
+        f"🚀 CARGA: {args.devices} dispositivos × {args.rate}/s por {args.duration}s, "
+        f"{args.viewers} espectadores ({args.viewer_mode})"
+    )
+    print("=" * 60)
+    report = asyncio.run(run_load(args))
+
+    ingest, websocket = report["results"]["ingest"], report["results"]["websocket"]
+    latency, e2e = ingest["latency"] or {}, websocket["e2e_latency"] or {}
+    print(f"\n📤 Ingestão: {ingest['accepted']}/{ingest['sent']} aceitas ({ingest['accepted_per_s']}/s)")
+    print(f"   p50={latency.get('p50_ms')}ms  p95={latency.get('p95_ms')}ms  p99={latency.get('p99_ms')}ms")
+    print(f"📥 WebSocket: {websocket['frames_received']}/{websocket['frames_expected']} frames "
+          f"(perda {websocket['drop_rate']})")
+    print(f"   ponta a ponta p50={e2e.get('p50_ms')}ms  p95={e2e.get('p95_ms')}ms  p99={e2e.get('p99_ms')}ms")
+
+    payload = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload + "\n")
+        print(f"💾 Relatório: {args.output}")
+    else:
+        print(payload)
+
+
 def send_measurement_cli():
-    """CLI para enviar medição de teste."""
-    import argparse
-    
-    parser = argparse.ArgumentParser(description="Enviar medição de teste")
+    """CLI para enviar medição de teste ou gerar carga."""
+    parser = argparse.ArgumentParser(description="Teste manual e gerador de carga de WebSocket")
     parser.add_argument("--send-measurement", type=int, metavar="DEVICE_ID",
                        help="Enviar medição de teste para o dispositivo")
     parser.add_argument("--metric", default="temperature", help="Nome da métrica")
     parser.add_argument("--value", type=float, default=25.5, help="Valor da medição")
-    
+
+    commands = parser.add_subparsers(dest="command")
+    load = commands.add_parser("load", help="Gerar carga de ingestão e espectadores WebSocket")
+    load.add_argument("--base-url", default=BASE_URL)
+    load.add_argument("--ws-url", default=WS_URL)
+    load.add_argument("--username", default=USERNAME, help="Usuário admin/operator ('' para não autenticar)")
+    load.add_argument("--password", default=PASSWORD)
+    load.add_argument("--devices", type=int, default=100, help="Dispositivos simulados")
+    load.add_argument("--rate", type=float, default=1.0, help="Medições por segundo por dispositivo")
+    load.add_argument("--poisson", action="store_true", help="Intervalos exponenciais em vez de fixos")
+    load.add_argument("--metric", default="temperature")
+    load.add_argument("--duration", type=float, default=30.0, help="Segundos de envio")
+    load.add_argument("--connections", type=int, default=50, help="Conexões HTTP keep-alive simultâneas")
+    load.add_argument("--viewers", type=int, default=100, help="Espectadores WebSocket")
+    load.add_argument("--viewer-mode", choices=("device", "multiplex"), default="device",
+                      help="ws/device/<id>/ (um dispositivo) ou ws/devices/ (vários)")
+    load.add_argument("--devices-per-viewer", type=int, default=10, help="Inscrições por espectador multiplex")
+    load.add_argument("--viewer-query", default="", help="Query string extra (ex.: mode=latest&interval_ms=500)")
+    load.add_argument("--ramp", type=float, default=5.0, help="Segundos para conectar todos os espectadores")
+    load.add_argument("--connect-timeout", type=float, default=10.0)
+    load.add_argument("--drain", type=float, default=3.0, help="Segundos aguardando frames após o envio")
+    load.add_argument("--seed", type=int, default=42)
+    load.add_argument("--output", default=None, help="Gravar o relatório JSON neste arquivo")
+
     args = parser.parse_args()
-    
-    if args.send_measurement:
+
+    if args.command == "load":
+        if args.rate <= 0:
+            parser.error("--rate must be positive")
+        load_cli(args)
+    elif args.send_measurement:
         token = get_access_token()
         if token:
             send_test_measurement(token, args.send_measurement, args.metric, args.value)
@@ -243,4 +657,3 @@ def send_measurement_cli():
 
 if __name__ == "__main__":
     send_measurement_cli()
-
@@ -53,7 +53,10 @@ export class WebSocketService {
     this.connectionStatus$.next(WS_CONNECTION_STATUS.CONNECTING);
     
     try {
-      const url = `${this.wsUrl}/ws/device/${devicePublicId}/`;
+      // O backend exige o token de acesso JWT (WS_REQUIRE_AUTH)
+      const token = this.authService.getToken();
+      const query = token ? `?token=${encodeURIComponent(token)}` : '';
+      const url = `${this.wsUrl}/ws/device/${devicePublicId}/${query}`;
       this.ws = new WebSocket(url);
 
       this.ws.onopen = () => {